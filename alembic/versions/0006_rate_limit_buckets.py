@@ -0,0 +1,34 @@
+"""rate limit buckets
+
+Revision ID: 0006_rate_limit_buckets
+Revises: 0005_user_profiles
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0006_rate_limit_buckets"
+down_revision: Union[str, None] = "0005_user_profiles"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Rows are rewritten on every hit. Leave free space in each page and keep
+    # updated_at unindexed so those updates stay HOT (no index writes).
+    op.create_table(
+        "rate_limit_buckets",
+        sa.Column("key", sa.String(), primary_key=True),
+        sa.Column("tokens", sa.Float(), nullable=False),
+        sa.Column("allowed", sa.Boolean(), server_default=sa.text("true"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        postgresql_with={"fillfactor": 70},
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("rate_limit_buckets")
@@ -0,0 +1,56 @@
+"""auth sessions for refresh token rotation
+
+Revision ID: 0007_auth_sessions
+Revises: 0006_rate_limit_buckets
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+revision: str = "0007_auth_sessions"
+down_revision: Union[str, None] = "0006_rate_limit_buckets"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "auth_sessions",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("jti", UUID(as_uuid=True), nullable=False),
+        sa.Column("family_id", UUID(as_uuid=True), nullable=False),
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.Column("issued_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("rotated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("revoked_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+    )
+    op.create_index("auth_sessions_jti_key", "auth_sessions", ["jti"], unique=True)
+    op.create_index("idx_auth_sessions_family_id", "auth_sessions", ["family_id"])
+    op.create_index(
+        "idx_auth_sessions_user_id_live",
+        "auth_sessions",
+        ["user_id"],
+        postgresql_where=sa.text("revoked_at IS NULL"),
+    )
+    # Workers poll recent revocations to refresh their in-process cache.
+    op.create_index(
+        "idx_auth_sessions_revoked_at",
+        "auth_sessions",
+        ["revoked_at"],
+        postgresql_where=sa.text("revoked_at IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_auth_sessions_revoked_at", table_name="auth_sessions")
+    op.drop_index("idx_auth_sessions_user_id_live", table_name="auth_sessions")
+    op.drop_index("idx_auth_sessions_family_id", table_name="auth_sessions")
+    op.drop_index("auth_sessions_jti_key", table_name="auth_sessions")
+    op.drop_table("auth_sessions")
@@ -0,0 +1,38 @@
+"""enrollment overdue and reminder tracking
+
+Revision ID: 0008_enrollment_deadline_tracking
+Revises: 0007_auth_sessions
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0008_enrollment_deadline_tracking"
+down_revision: Union[str, None] = "0007_auth_sessions"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("course_enrollments", sa.Column("overdue_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("course_enrollments", sa.Column("reminder_sent_at", sa.DateTime(timezone=True), nullable=True))
+    # The overdue and reminder jobs both range-scan deadlines of open,
+    # not-yet-overdue enrollments; everything else stays out of the index.
+    op.create_index(
+        "idx_course_enrollments_open_deadline",
+        "course_enrollments",
+        ["deadline"],
+        postgresql_where=sa.text(
+            "deadline IS NOT NULL AND overdue_at IS NULL AND status IN ('approved', 'assigned')"
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_course_enrollments_open_deadline", table_name="course_enrollments")
+    op.drop_column("course_enrollments", "reminder_sent_at")
+    op.drop_column("course_enrollments", "overdue_at")
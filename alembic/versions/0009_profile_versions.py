@@ -0,0 +1,43 @@
+"""profile versions and changed-fields audit log
+
+Revision ID: 0009_profile_versions
+Revises: 0008_enrollment_deadline_tracking
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+revision: str = "0009_profile_versions"
+down_revision: Union[str, None] = "0008_enrollment_deadline_tracking"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "user_profiles",
+        sa.Column("version", sa.Integer(), server_default=sa.text("1"), nullable=False),
+    )
+    op.create_table(
+        "profile_changes",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("changed_by", sa.Integer(), nullable=True),
+        sa.Column("changed_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("changes", JSONB(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["changed_by"], ["users.id"], ondelete="SET NULL"),
+    )
+    op.create_index("idx_profile_changes_user_id", "profile_changes", ["user_id", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_profile_changes_user_id", table_name="profile_changes")
+    op.drop_table("profile_changes")
+    op.drop_column("user_profiles", "version")
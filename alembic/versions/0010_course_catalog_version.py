@@ -0,0 +1,57 @@
+"""course catalog change counter and NOTIFY trigger
+
+Revision ID: 0010_course_catalog_version
+Revises: 0009_profile_versions
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0010_course_catalog_version"
+down_revision: Union[str, None] = "0009_profile_versions"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "course_catalog_version",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("version", sa.BigInteger(), server_default=sa.text("0"), nullable=False),
+        sa.CheckConstraint("id = 1", name="course_catalog_version_single_row"),
+    )
+    op.execute("INSERT INTO course_catalog_version (id, version) VALUES (1, 0)")
+    # Statement-level, so a bulk import bumps the counter once. The NOTIFY
+    # is delivered on commit; listeners rebuild their catalog snapshot.
+    op.execute(
+        """
+        CREATE FUNCTION bump_course_catalog_version() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            v bigint;
+        BEGIN
+            UPDATE course_catalog_version SET version = version + 1 WHERE id = 1
+            RETURNING version INTO v;
+            PERFORM pg_notify('course_catalog', v::text);
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER courses_catalog_version
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON courses
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_course_catalog_version()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS courses_catalog_version ON courses")
+    op.execute("DROP FUNCTION IF EXISTS bump_course_catalog_version()")
+    op.drop_table("course_catalog_version")
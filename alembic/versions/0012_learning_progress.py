@@ -0,0 +1,53 @@
+"""enrollment progress and the learning_events inbox
+
+Revision ID: 0012_learning_progress
+Revises: 0011_idempotency_keys
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0012_learning_progress"
+down_revision: Union[str, None] = "0011_idempotency_keys"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "course_enrollments",
+        sa.Column("progress_percent", sa.SmallInteger(), server_default=sa.text("0"), nullable=False),
+    )
+    op.add_column("course_enrollments", sa.Column("started_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("course_enrollments", sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("course_enrollments", sa.Column("last_activity_at", sa.DateTime(timezone=True), nullable=True))
+    op.create_check_constraint(
+        "course_enrollments_progress_percent_check",
+        "course_enrollments",
+        "progress_percent BETWEEN 0 AND 100",
+    )
+    # Append-only inbox: no secondary indexes or foreign keys to maintain on
+    # the hot insert path. The fold job reads it in primary-key order.
+    op.create_table(
+        "learning_events",
+        sa.Column("id", sa.BigInteger(), sa.Identity(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("course_id", sa.Integer(), nullable=False),
+        sa.Column("verb", sa.Text(), nullable=False),
+        sa.Column("progress", sa.Float(), nullable=True),
+        sa.Column("occurred_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("received_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("learning_events")
+    op.drop_constraint("course_enrollments_progress_percent_check", "course_enrollments", type_="check")
+    op.drop_column("course_enrollments", "last_activity_at")
+    op.drop_column("course_enrollments", "completed_at")
+    op.drop_column("course_enrollments", "started_at")
+    op.drop_column("course_enrollments", "progress_percent")
@@ -0,0 +1,70 @@
+"""enrollment change tracking and daily analytics rollups
+
+Revision ID: 0013_enrollment_analytics
+Revises: 0012_learning_progress
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0013_enrollment_analytics"
+down_revision: Union[str, None] = "0012_learning_progress"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("course_enrollments", sa.Column("rejected_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column(
+        "course_enrollments",
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+    op.create_index("idx_course_enrollments_updated_at", "course_enrollments", ["updated_at"])
+    # A trigger rather than ORM onupdate: the scheduler jobs and the progress
+    # fold update enrollments with plain SQL.
+    op.execute(
+        """
+        CREATE FUNCTION touch_updated_at() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.updated_at = now();
+            RETURN NEW;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER course_enrollments_touch_updated_at
+        BEFORE UPDATE ON course_enrollments
+        FOR EACH ROW EXECUTE FUNCTION touch_updated_at()
+        """
+    )
+
+    op.create_table(
+        "enrollment_daily_stats",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("course_id", sa.Integer(), nullable=False),
+        sa.Column("manager_id", sa.Integer(), nullable=False),
+        sa.Column("requested", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("approved", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("assigned", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("rejected", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("completed", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("overdue", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("approval_seconds", sa.Float(), server_default=sa.text("0"), nullable=False),
+        sa.PrimaryKeyConstraint("day", "course_id", "manager_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("enrollment_daily_stats")
+    op.execute("DROP TRIGGER IF EXISTS course_enrollments_touch_updated_at ON course_enrollments")
+    op.execute("DROP FUNCTION IF EXISTS touch_updated_at()")
+    op.drop_index("idx_course_enrollments_updated_at", table_name="course_enrollments")
+    op.drop_column("course_enrollments", "updated_at")
+    op.drop_column("course_enrollments", "rejected_at")
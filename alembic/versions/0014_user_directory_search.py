@@ -0,0 +1,44 @@
+"""pg_trgm indexes for the admin user directory
+
+Revision ID: 0014_user_directory_search
+Revises: 0013_enrollment_analytics
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0014_user_directory_search"
+down_revision: Union[str, None] = "0013_enrollment_analytics"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index, table, indexed expression); users.email is CITEXT, which has no
+# trigram operator class, so it is indexed (and queried) as text.
+TRGM_INDEXES = [
+    ("idx_users_email_trgm", "users", "(email::text)"),
+    ("idx_users_name_trgm", "users", "name"),
+    ("idx_user_profiles_first_name_trgm", "user_profiles", "first_name"),
+    ("idx_user_profiles_last_name_trgm", "user_profiles", "last_name"),
+]
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CONCURRENTLY: don't block sign-ups and profile edits while building.
+    with op.get_context().autocommit_block():
+        for name, table, expr in TRGM_INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} USING gin ({expr} gin_trgm_ops)")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_employee_managers_manager_id "
+            "ON employee_managers (manager_id)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_employee_managers_manager_id")
+        for name, _, _ in reversed(TRGM_INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,40 @@
+"""city population and prefix-search indexes
+
+Revision ID: 0015_city_search
+Revises: 0014_user_directory_search
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0015_city_search"
+down_revision: Union[str, None] = "0014_user_directory_search"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("cities", sa.Column("population", sa.BigInteger(), server_default=sa.text("0"), nullable=False))
+    # text_pattern_ops lets `lower(name) LIKE 'ber%'` range-scan the index
+    # whatever the database collation. With a country filter the composite
+    # one narrows to that country's slice of the prefix range.
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cities_name_prefix "
+            "ON cities (lower(name) text_pattern_ops)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cities_country_name_prefix "
+            "ON cities (country_id, lower(name) text_pattern_ops)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_cities_country_name_prefix")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_cities_name_prefix")
+    op.drop_column("cities", "population")
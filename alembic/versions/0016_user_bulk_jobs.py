@@ -0,0 +1,67 @@
+"""bulk user jobs and indexes for chunked user deletion
+
+Revision ID: 0016_user_bulk_jobs
+Revises: 0015_city_search
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+revision: str = "0016_user_bulk_jobs"
+down_revision: Union[str, None] = "0015_city_search"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Columns users/deletion.py clears or deletes by when removing a user; each
+# chunk is an index range scan instead of a pass over the table. Partial
+# where the column is mostly NULL.
+DELETION_INDEXES = [
+    ("idx_course_enrollments_approved_by", "course_enrollments (approved_by) WHERE approved_by IS NOT NULL"),
+    ("idx_courses_assigned_by_manager_id", "courses (assigned_by_manager_id) WHERE assigned_by_manager_id IS NOT NULL"),
+    ("idx_profile_changes_changed_by", "profile_changes (changed_by) WHERE changed_by IS NOT NULL"),
+    ("idx_users_invited_by", "users (invited_by) WHERE invited_by IS NOT NULL"),
+    ("idx_auth_sessions_user_id", "auth_sessions (user_id)"),
+    ("idx_user_personal_emails_user_id", "user_personal_emails (user_id)"),
+    ("idx_user_dependents_user_id", "user_dependents (user_id)"),
+]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_bulk_jobs",
+        sa.Column("id", sa.Integer(), sa.Identity(), primary_key=True),
+        sa.Column("action", sa.Text(), nullable=False),
+        sa.Column("user_ids", JSONB(), nullable=False),
+        sa.Column("position", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("done", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("skipped", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("status", sa.Text(), server_default=sa.text("'queued'"), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_by", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.CheckConstraint("action IN ('deactivate', 'delete')", name="user_bulk_jobs_action_check"),
+    )
+    op.create_index(
+        "idx_user_bulk_jobs_open",
+        "user_bulk_jobs",
+        ["id"],
+        postgresql_where=sa.text("status IN ('queued', 'running')"),
+    )
+    with op.get_context().autocommit_block():
+        for name, definition in DELETION_INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(DELETION_INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    op.drop_index("idx_user_bulk_jobs_open", table_name="user_bulk_jobs")
+    op.drop_table("user_bulk_jobs")
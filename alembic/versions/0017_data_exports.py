@@ -0,0 +1,56 @@
+"""personal-data export jobs
+
+Revision ID: 0017_data_exports
+Revises: 0016_user_bulk_jobs
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+revision: str = "0017_data_exports"
+down_revision: Union[str, None] = "0016_user_bulk_jobs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "data_exports",
+        sa.Column("id", sa.Integer(), sa.Identity(), primary_key=True),
+        sa.Column("user_ids", JSONB(), nullable=False),
+        sa.Column("status", sa.Text(), server_default=sa.text("'queued'"), nullable=False),
+        sa.Column("position", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("file_name", sa.Text(), nullable=False),
+        sa.Column("size_bytes", sa.BigInteger(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_by", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    # The worker polls for open jobs; the purge scans finished ones by expiry.
+    op.create_index(
+        "idx_data_exports_open",
+        "data_exports",
+        ["id"],
+        postgresql_where=sa.text("status IN ('queued', 'running')"),
+    )
+    op.create_index(
+        "idx_data_exports_expires_at",
+        "data_exports",
+        ["expires_at"],
+        postgresql_where=sa.text("status = 'done'"),
+    )
+    op.create_index("idx_data_exports_created_by", "data_exports", ["created_by"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_data_exports_created_by", table_name="data_exports")
+    op.drop_index("idx_data_exports_expires_at", table_name="data_exports")
+    op.drop_index("idx_data_exports_open", table_name="data_exports")
+    op.drop_table("data_exports")
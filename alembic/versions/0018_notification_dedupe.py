@@ -0,0 +1,68 @@
+"""notification dedupe keys and digest columns
+
+Revision ID: 0018_notification_dedupe
+Revises: 0017_data_exports
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0018_notification_dedupe"
+down_revision: Union[str, None] = "0017_data_exports"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("notifications", sa.Column("dedupe_key", sa.Text(), nullable=True))
+    op.add_column(
+        "notifications",
+        sa.Column("event_count", sa.Integer(), server_default=sa.text("1"), nullable=False),
+    )
+    op.add_column("notifications", sa.Column("window_ends_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("notifications", sa.Column("emailed_at", sa.DateTime(timezone=True), nullable=True))
+
+    # Existing rows are keyed by their enrollment; only the oldest of any
+    # duplicates gets the key so the unique index below can be built.
+    op.execute(
+        """
+        UPDATE notifications n
+        SET dedupe_key = 'enrollment:' || d.enrollment_id
+        FROM (
+            SELECT id, metadata->>'enrollment_id' AS enrollment_id,
+                   row_number() OVER (
+                       PARTITION BY user_id, type, metadata->>'enrollment_id' ORDER BY id
+                   ) AS rn
+            FROM notifications
+            WHERE metadata ? 'enrollment_id'
+        ) d
+        WHERE n.id = d.id AND d.rn = 1
+        """
+    )
+
+    # CONCURRENTLY: notifications are written on every enrollment action.
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_notifications_dedupe "
+            "ON notifications (user_id, type, dedupe_key) WHERE dedupe_key IS NOT NULL"
+        )
+        # The digest email job scans closed, not yet mailed windows.
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_notifications_digest_due "
+            "ON notifications (window_ends_at) "
+            "WHERE emailed_at IS NULL AND window_ends_at IS NOT NULL"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_notifications_digest_due")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS uq_notifications_dedupe")
+    op.drop_column("notifications", "emailed_at")
+    op.drop_column("notifications", "window_ends_at")
+    op.drop_column("notifications", "event_count")
+    op.drop_column("notifications", "dedupe_key")
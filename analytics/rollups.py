@@ -0,0 +1,130 @@
+# app/analytics/rollups.py
+"""Daily enrollment rollups (enrollment_daily_stats).
+
+Every enrollment contributes up to six dated events: requested, approved
+(with its latency), assigned, rejected, completed and overdue, taken from
+the row's own timestamps. _ROLLUP unpivots rows into those events with a
+LATERAL VALUES list, buckets them per UTC day, course and team, and adds
+the counts into the rollup table.
+
+refresh_recent() is the incremental path, run by the scheduler: it
+replaces the last ANALYTICS_WINDOW_DAYS days, reading only enrollments
+whose updated_at (kept by a trigger) falls inside the window. An event
+can't be newer than the row's last update, so those rows hold every event
+in the window. The delete and re-insert commit together, so readers never
+see a half-built day.
+
+backfill() rebuilds the days before the window for existing history. It
+walks the table in primary-key chunks of ANALYTICS_BACKFILL_CHUNK rows,
+one short transaction each, into the enrollment_daily_stats_backfill
+staging table; plain MVCC reads take no locks that writers would wait on.
+Only when every chunk is in does one transaction replace the live days
+before the window with the staged ones, so /api/v1/analytics keeps
+serving the old, complete history for the whole run. One backfill at a
+time: a second run would reset the first one's staging table.
+"""
+import logging
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import delete, func, select, text
+from sqlmodel import Session
+
+from models import CourseEnrollment, EnrollmentDailyStat
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_WINDOW_DAYS = int(os.getenv("ANALYTICS_WINDOW_DAYS", "2"))
+ANALYTICS_BACKFILL_CHUNK = int(os.getenv("ANALYTICS_BACKFILL_CHUNK", "20000"))
+
+STAGING_TABLE = "enrollment_daily_stats_backfill"
+
+_ROLLUP = """
+    INSERT INTO {table} AS s
+        (day, course_id, manager_id, requested, approved, assigned, rejected, completed, overdue, approval_seconds)
+    SELECT (ev.at AT TIME ZONE 'UTC')::date, e.course_id, coalesce(em.manager_id, 0),
+           count(*) FILTER (WHERE ev.kind = 'requested'),
+           count(*) FILTER (WHERE ev.kind = 'approved'),
+           count(*) FILTER (WHERE ev.kind = 'assigned'),
+           count(*) FILTER (WHERE ev.kind = 'rejected'),
+           count(*) FILTER (WHERE ev.kind = 'completed'),
+           count(*) FILTER (WHERE ev.kind = 'overdue'),
+           coalesce(sum(ev.seconds) FILTER (WHERE ev.kind = 'approved'), 0)
+    FROM course_enrollments e
+    LEFT JOIN employee_managers em ON em.employee_id = e.employee_id
+    CROSS JOIN LATERAL (VALUES
+        ('requested', e.requested_at, NULL::double precision),
+        -- Manager self-enrollments are approved on creation: not an approval decision.
+        ('approved',
+         CASE WHEN e.status <> 'assigned' AND e.approved_by IS DISTINCT FROM e.employee_id THEN e.approved_at END,
+         EXTRACT(EPOCH FROM e.approved_at - e.requested_at)::double precision),
+        ('assigned', CASE WHEN e.status = 'assigned' THEN e.approved_at END, NULL),
+        ('rejected', e.rejected_at, NULL),
+        ('completed', e.completed_at, NULL),
+        ('overdue', e.overdue_at, NULL)
+    ) AS ev(kind, at, seconds)
+    WHERE {rows} AND ev.at IS NOT NULL AND {window}
+    GROUP BY 1, 2, 3
+    ON CONFLICT (day, course_id, manager_id) DO UPDATE SET
+        requested = s.requested + EXCLUDED.requested,
+        approved = s.approved + EXCLUDED.approved,
+        assigned = s.assigned + EXCLUDED.assigned,
+        rejected = s.rejected + EXCLUDED.rejected,
+        completed = s.completed + EXCLUDED.completed,
+        overdue = s.overdue + EXCLUDED.overdue,
+        approval_seconds = s.approval_seconds + EXCLUDED.approval_seconds
+"""
+
+_RECENT = text(
+    _ROLLUP.format(table="enrollment_daily_stats", rows="e.updated_at >= :start", window="ev.at >= :start")
+)
+_CHUNK = text(_ROLLUP.format(table=STAGING_TABLE, rows="e.id > :lo AND e.id <= :hi", window="ev.at < :until"))
+
+
+def window_start(now: datetime, days: int = ANALYTICS_WINDOW_DAYS) -> date:
+    return now.astimezone(timezone.utc).date() - timedelta(days=days)
+
+
+def _midnight(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+def refresh_recent(session: Session, now: datetime, last_run: Optional[datetime] = None) -> int:
+    """Rebuild the rollups of the recent window; returns rollup rows written."""
+    start = window_start(now)
+    session.execute(delete(EnrollmentDailyStat).where(EnrollmentDailyStat.day >= start))
+    written = session.execute(_RECENT, {"start": _midnight(start)}).rowcount
+    session.commit()
+    return written
+
+
+def backfill(
+    session: Session,
+    until: date,
+    chunk: int = ANALYTICS_BACKFILL_CHUNK,
+    on_chunk: Optional[Callable[[int, int], None]] = None,
+) -> int:
+    """Rebuild every day before `until` from the full history; returns chunks run.
+
+    Pass until=window_start(now) so it meets refresh_recent() without overlap.
+    """
+    max_id = session.execute(select(func.max(CourseEnrollment.id))).scalar() or 0
+    session.execute(text(f"DROP TABLE IF EXISTS {STAGING_TABLE}"))
+    session.execute(text(f"CREATE UNLOGGED TABLE {STAGING_TABLE} (LIKE enrollment_daily_stats INCLUDING ALL)"))
+    session.commit()
+    chunks = 0
+    for lo in range(0, max_id, chunk):
+        hi = min(lo + chunk, max_id)
+        session.execute(_CHUNK, {"lo": lo, "hi": hi, "until": _midnight(until)})
+        session.commit()
+        chunks += 1
+        if on_chunk:
+            on_chunk(hi, max_id)
+
+    session.execute(delete(EnrollmentDailyStat).where(EnrollmentDailyStat.day < until))
+    session.execute(text(f"INSERT INTO enrollment_daily_stats SELECT * FROM {STAGING_TABLE}"))
+    session.execute(text(f"DROP TABLE {STAGING_TABLE}"))
+    session.commit()
+    logger.info("analytics backfill before %s: %d chunks up to enrollment %d", until, chunks, max_id)
+    return chunks
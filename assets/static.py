@@ -0,0 +1,258 @@
+# app/assets/static.py
+"""Static file serving with fingerprints, precompressed variants and a hot cache.
+
+The directory is scanned once at startup. Every file gets a content hash
+and is reachable under two names:
+
+    courses.html              revalidated (no-cache + ETag -> 304)
+    courses.3f2a9c01d4e5.html immutable, cacheable for a year
+
+Files up to STATIC_HOT_MAX_BYTES are held in memory, together with their
+gzip/brotli variants, so serving them touches neither stat() nor open().
+Larger files are streamed from disk with the stat taken at startup.
+Prebuilt `<file>.br` / `<file>.gz` siblings (scripts/build_static.py) are
+preferred; hot files without one are compressed in memory at startup.
+The scan is a snapshot: restart (or redeploy) to pick up changed files.
+Directories in STATIC_EXCLUDE hold user content (legacy avatar uploads),
+not build output; they are skipped and served from disk (main.py).
+"""
+import gzip
+import hashlib
+import logging
+import os
+from dataclasses import dataclass, field
+from mimetypes import guess_type
+from pathlib import Path
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # optional: gzip-only without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_HOT_MAX_BYTES = int(os.getenv("STATIC_HOT_MAX_BYTES", str(256 * 1024)))
+# Top-level directories under static/ that are never scanned.
+STATIC_EXCLUDE = ("uploads",)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, no-cache"
+
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "application/xml", "image/svg+xml")
+# Preference order when the client accepts several.
+ENCODINGS = ("br", "gzip")
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def compressible(media_type: str) -> bool:
+    return media_type.startswith(COMPRESSIBLE)
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def fingerprinted(name: str, digest: str) -> str:
+    stem, dot, ext = name.rpartition(".")
+    if not dot or "/" in ext:
+        return f"{name}.{digest}"
+    return f"{stem}.{digest}.{ext}"
+
+
+@dataclass
+class Variant:
+    size: int
+    body: Optional[bytes] = None
+    path: Optional[str] = None
+    stat: Optional[os.stat_result] = None
+
+
+@dataclass
+class Asset:
+    name: str
+    media_type: str
+    digest: str
+    variants: dict[str, Variant] = field(default_factory=dict)  # "" = identity
+
+    def etag(self, encoding: str) -> str:
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+
+class AssetStore:
+    def __init__(self, directory: str, hot_max_bytes: int = STATIC_HOT_MAX_BYTES, exclude=STATIC_EXCLUDE):
+        self.directory = Path(directory)
+        self.hot_max_bytes = hot_max_bytes
+        self.exclude = set(exclude)
+        self.assets: dict[str, Asset] = {}
+        self.hashed: dict[str, Asset] = {}
+        self.scan()
+
+    def scan(self) -> None:
+        assets, hashed = {}, {}
+        for path in sorted(self.directory.rglob("*")):
+            if not path.is_file() or path.suffix in (".br", ".gz"):
+                continue
+            if path.relative_to(self.directory).parts[0] in self.exclude:
+                continue
+            asset = self._load(path)
+            assets[asset.name] = asset
+            hashed[fingerprinted(asset.name, asset.digest)] = asset
+        self.assets, self.hashed = assets, hashed
+        hot = sum(1 for a in assets.values() if a.variants[""].body is not None)
+        logger.info("static: %d assets from %s (%d in memory)", len(assets), self.directory, hot)
+
+    def _load(self, path: Path) -> Asset:
+        name = path.relative_to(self.directory).as_posix()
+        media_type = guess_type(name)[0] or "application/octet-stream"
+        stat = path.stat()
+        hot = stat.st_size <= self.hot_max_bytes
+
+        sha = hashlib.sha256()
+        body = path.read_bytes() if hot else None
+        if hot:
+            sha.update(body)
+        else:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    sha.update(chunk)
+        asset = Asset(name=name, media_type=media_type, digest=sha.hexdigest()[:12])
+        asset.variants[""] = Variant(size=stat.st_size, body=body, path=str(path), stat=stat)
+
+        for encoding in ENCODINGS:
+            sibling = path.with_name(path.name + SUFFIXES[encoding])
+            if sibling.is_file() and sibling.stat().st_mtime >= stat.st_mtime:
+                s = sibling.stat()
+                data = sibling.read_bytes() if s.st_size <= self.hot_max_bytes else None
+                asset.variants[encoding] = Variant(size=s.st_size, body=data, path=str(sibling), stat=s)
+            elif hot and compressible(media_type) and (encoding != "br" or brotli is not None):
+                data = compress(body, encoding)
+                if len(data) < len(body):
+                    asset.variants[encoding] = Variant(size=len(data), body=data)
+        return asset
+
+    def lookup(self, name: str) -> tuple[Optional[Asset], bool]:
+        """Returns (asset, is_fingerprinted_name)."""
+        if name in self.hashed:
+            return self.hashed[name], True
+        return self.assets.get(name), False
+
+    def url(self, name: str, prefix: str = "/static") -> str:
+        """Immutable URL for `name`; use it wherever an asset is referenced."""
+        asset = self.assets[name]
+        return f"{prefix}/{fingerprinted(name, asset.digest)}"
+
+
+def _accepted(accept_encoding: str) -> set[str]:
+    accepted = set()
+    for item in accept_encoding.split(","):
+        token, _, params = item.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(token.strip().lower())
+    return accepted
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match requires.
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def _single_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """(start, end) inclusive for one satisfiable range; None to ignore the
+    header; raises ValueError when it cannot be satisfied."""
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None  # multi-range: a full 200 is a valid answer
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first:
+            start, end = int(first), int(last) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise ValueError
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def serve(asset: Asset, fingerprinted_name: bool, scope: Scope) -> Response:
+    request_headers = Headers(scope=scope)
+    range_header = request_headers.get("range")
+
+    encoding = ""
+    # Ranges are served from the identity body only.
+    if range_header is None and len(asset.variants) > 1:
+        accepted = _accepted(request_headers.get("accept-encoding", ""))
+        encoding = next((e for e in ENCODINGS if e in accepted and e in asset.variants), "")
+    variant = asset.variants[encoding]
+    etag = asset.etag(encoding)
+
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE if fingerprinted_name else REVALIDATE,
+        "Accept-Ranges": "bytes",
+    }
+    if len(asset.variants) > 1:
+        headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        headers["Content-Encoding"] = encoding
+
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    if variant.body is None:
+        # FileResponse handles Range/If-Range itself and keeps our ETag.
+        return FileResponse(variant.path, headers=headers, media_type=asset.media_type, stat_result=variant.stat)
+
+    body, status = variant.body, 200
+    if_range = request_headers.get("if-range")
+    if range_header and (if_range is None or if_range == etag):
+        try:
+            span = _single_range(range_header, variant.size)
+        except ValueError:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{variant.size}"})
+        if span is not None:
+            start, end = span
+            body, status = body[start : end + 1], 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{variant.size}"
+
+    if scope["method"] == "HEAD":
+        headers["Content-Length"] = str(len(body))
+        body = b""
+    return Response(body, status_code=status, headers=headers, media_type=asset.media_type)
+
+
+class StaticAssets(StaticFiles):
+    """Drop-in for StaticFiles that serves from an AssetStore."""
+
+    def __init__(self, store: AssetStore):
+        super().__init__(directory=store.directory, check_dir=True)
+        self.store = store
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405, headers={"Allow": "GET, HEAD"})
+        asset, is_hashed = self.store.lookup(path.replace(os.sep, "/"))
+        if asset is None:
+            raise HTTPException(status_code=404)
+        return serve(asset, is_hashed, scope)
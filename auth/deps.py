@@ -1,10 +1,12 @@
 # app/auth/deps.py
+import uuid
 from fastapi import Depends, HTTPException
 from jose import jwt, JWTError
 from sqlmodel import Session, select
 from db import get_session
 from models import User
 from security import oauth2_scheme, JWT_SECRET, JWT_ISSUER
+from .sessions import revocations
 
 def get_current_user(
     token: str = Depends(oauth2_scheme),
@@ -13,9 +15,15 @@ def get_current_user(
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"], audience="access", issuer=JWT_ISSUER)
         user_id = int(payload.get("sub"))
+        family = uuid.UUID(payload["fam"]) if payload.get("fam") else None
     except (JWTError, ValueError):
         raise HTTPException(status_code=401, detail="Invalid token")
 
+    if family is not None:
+        revocations.maybe_sync(session)
+        if revocations.is_revoked(family):
+            raise HTTPException(status_code=401, detail="Session revoked")
+
     user = session.exec(select(User).where(User.id == user_id)).first()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
@@ -3,22 +3,27 @@ from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlmodel import Session, select
 from db import get_session
-from schemas import InviteIn, InviteOut, AcceptInviteIn, UserOut, LoginIn, LoginOut
+from schemas import InviteIn, InviteOut, AcceptInviteIn, UserOut, LoginIn, LoginOut, RefreshIn, TokenPairOut
 from .service import invite_user, accept_invite
-from . import repo
+from . import repo, sessions
 from .deps import get_current_user, require_admin_user, require_admin_or_manager
 from models import User
-from security import verify_password, create_access_token, create_refresh_token
+from security import verify_password, create_access_token, create_refresh_token, JWT_SECRET, JWT_ISSUER
 from mailer import build_invite_email, send_email
 import os
+import uuid
 from urllib.parse import quote
+from jose import jwt, JWTError
 from users.status import derive_status
+from observability.metrics import INVITES_SENT
+from observability.timing import TimedRoute
+from ratelimit.deps import rate_limit
 
 
 FRONTEND_ORIGIN = os.getenv("FRONTEND_ORIGIN", "https://front.167.86.97.226.sslip.io")
-router = APIRouter(prefix="/api/v1/auth", tags=["auth"])
+router = APIRouter(prefix="/api/v1/auth", tags=["auth"], route_class=TimedRoute)
 
-@router.post("/login", response_model=LoginOut)
+@router.post("/login", response_model=LoginOut, dependencies=[Depends(rate_limit("login", account_field="username"))])
 def login(
     form: OAuth2PasswordRequestForm = Depends(),
     session: Session = Depends(get_session)
@@ -32,16 +37,11 @@ def login(
     if not user.is_active:
         raise HTTPException(status_code=403, detail="User is inactive")
 
-    # --- ensure status stays truthful ---
-    derived = derive_status(user)
-    if user.status != derived:
-        user.status = derived
-        session.add(user)
-        session.commit()
-        session.refresh(user)
-        
-    access  = create_access_token(user_id=user.id, role=user.role)
-    refresh = create_refresh_token(user_id=user.id, role=user.role)
+    # Status is derived in memory; the scheduler reconciles the stored column.
+    auth_session = sessions.start_family(session, user.id)
+    family = str(auth_session.family_id)
+    access  = create_access_token(user_id=user.id, role=user.role, family=family)
+    refresh = create_refresh_token(user_id=user.id, role=user.role, jti=str(auth_session.jti), family=family)
 
     return LoginOut(
         access_token=access,
@@ -53,11 +53,51 @@ def login(
             name=user.name,
             role=user.role,
             is_active=user.is_active,
-            status=user.status, # <-- now included
+            status=derive_status(user),
         )
     )
 
-@router.post("/invite", response_model=InviteOut, dependencies=[Depends(require_admin_or_manager)])
+def _decode_refresh(token: str) -> dict:
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"], audience="refresh", issuer=JWT_ISSUER)
+        payload["jti"] = uuid.UUID(payload["jti"])
+        payload["fam"] = uuid.UUID(payload["fam"])
+    except (JWTError, KeyError, ValueError):
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    return payload
+
+@router.post("/refresh", response_model=TokenPairOut)
+def refresh(data: RefreshIn, session: Session = Depends(get_session)):
+    payload = _decode_refresh(data.refresh_token)
+    successor = sessions.rotate(session, payload["jti"])
+    if successor is None:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    user = session.get(User, successor.user_id)
+    if not user or not user.is_active:
+        sessions.revoke_family(session, successor.family_id)
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    family = str(successor.family_id)
+    return TokenPairOut(
+        access_token=create_access_token(user_id=user.id, role=user.role, family=family),
+        refresh_token=create_refresh_token(user_id=user.id, role=user.role, jti=str(successor.jti), family=family),
+    )
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(data: RefreshIn, session: Session = Depends(get_session)):
+    payload = _decode_refresh(data.refresh_token)
+    sessions.revoke_family(session, payload["fam"])
+
+@router.post("/sessions/revoke-all", status_code=status.HTTP_204_NO_CONTENT)
+def revoke_all_sessions(current: User = Depends(get_current_user), session: Session = Depends(get_session)):
+    sessions.revoke_user_sessions(session, current.id)
+
+@router.post(
+    "/invite",
+    response_model=InviteOut,
+    dependencies=[Depends(rate_limit("invite", account_field="email")), Depends(require_admin_or_manager)],
+)
 def invite(
     data: InviteIn,
     background: BackgroundTasks,
@@ -81,11 +121,12 @@ def invite(
     # Send email (now passes name + invite_url)
     msg = build_invite_email(to=email, token=token, name=data.name, invite_url=invite_url)
     background.add_task(send_email, msg)
+    INVITES_SENT.inc()
 
     # Return enriched payload for the caller
     return InviteOut(email=email, token=token, name=data.name, invite_url=invite_url)
 
-@router.post("/accept-invite")
+@router.post("/accept-invite", dependencies=[Depends(rate_limit("accept_invite", account_field="email"))])
 def accept(data: AcceptInviteIn, session: Session = Depends(get_session)):
     ok = accept_invite(session, data)
     if not ok:
@@ -93,18 +134,12 @@ def accept(data: AcceptInviteIn, session: Session = Depends(get_session)):
     return {"status": "ok"}
 
 @router.get("/me", response_model=UserOut)
-def me(current: User = Depends(get_current_user), session: Session = Depends(get_session)):
-    derived = derive_status(current)
-    if current.status != derived:
-        current.status = derived
-        session.add(current)
-        session.commit()
-        session.refresh(current)
-    
+def me(current: User = Depends(get_current_user)):
     return UserOut(
         id=current.id,
         email=current.email,
         name=current.name,
         role=current.role,
         is_active=current.is_active,
+        status=derive_status(current),
     )
@@ -4,7 +4,7 @@ from datetime import datetime, timedelta, timezone
 from sqlmodel import Session
 from schemas import InviteIn, AcceptInviteIn
 from . import repo
-from security import hash_password, oauth2_scheme
+from security import hash_password, oauth2_scheme, run_bcrypt
 from passlib.hash import bcrypt
 from users.status import derive_status
 
@@ -12,10 +12,10 @@ INVITE_TTL_HOURS = int(os.getenv("INVITE_TTL_HOURS", "48"))
 
 def _hash_invite_token(raw: str) -> str:
     # Store a bcrypt hash of the token (like a password)
-    return bcrypt.hash(raw)
+    return run_bcrypt(bcrypt.hash, raw)
 
 def _verify_invite_token(raw: str, hashed: str) -> bool:
-    return bcrypt.verify(raw, hashed)
+    return run_bcrypt(bcrypt.verify, raw, hashed)
 
 def invite_user(session: Session, data: InviteIn, actor_user_id: int | None, role: str) -> tuple[str, str]:
     raw_token = os.urandom(16).hex()
@@ -0,0 +1,175 @@
+# app/auth/sessions.py
+"""Server-side refresh-token store (auth_sessions) and revocation cache."""
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import func, update
+from sqlmodel import Session, select
+
+from models import AuthSession
+from security import ACCESS_TTL_MIN, REFRESH_TTL_DAYS
+
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+
+
+class RevocationCache:
+    """Revoked refresh-token families, kept in process.
+
+    Access tokens carry their family id, so get_current_user can reject tokens
+    of a revoked family with a set lookup. Each worker pulls revocations made
+    elsewhere at most every `sync_interval` seconds (one indexed query on
+    auth_sessions.revoked_at); entries only need to outlive ACCESS_TTL_MIN,
+    after which every access token of that family has expired anyway.
+    """
+
+    def __init__(self, retention: timedelta, sync_interval: float, clock=time.monotonic):
+        self.retention = retention
+        self.sync_interval = sync_interval
+        self.clock = clock
+        self._revoked: dict[uuid.UUID, datetime] = {}
+        self._watermark: Optional[datetime] = None
+        self._next_sync = 0.0
+        self._lock = threading.Lock()           # guards _revoked
+        self._sync_lock = threading.Lock()      # one syncing request per worker
+
+    def add(self, family_id: uuid.UUID, revoked_at: datetime) -> None:
+        with self._lock:
+            self._revoked[family_id] = revoked_at
+
+    def is_revoked(self, family_id: uuid.UUID) -> bool:
+        return family_id in self._revoked
+
+    def maybe_sync(self, session: Session) -> None:
+        if self.clock() < self._next_sync or not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sync = self.clock() + self.sync_interval
+            now = datetime.now(timezone.utc)
+            # Small overlap so a revocation committed just behind the watermark isn't missed.
+            since = (self._watermark or now - self.retention) - timedelta(seconds=self.sync_interval)
+            rows = session.exec(
+                select(AuthSession.family_id, func.max(AuthSession.revoked_at))
+                .where(AuthSession.revoked_at > since)
+                .group_by(AuthSession.family_id)
+            ).all()
+            cutoff = now - self.retention
+            with self._lock:
+                for family_id, revoked_at in rows:
+                    self._revoked[family_id] = revoked_at
+                for family_id in [f for f, at in self._revoked.items() if at < cutoff]:
+                    del self._revoked[family_id]
+            for _, revoked_at in rows:
+                if self._watermark is None or revoked_at > self._watermark:
+                    self._watermark = revoked_at
+            if self._watermark is None:
+                self._watermark = now
+        finally:
+            self._sync_lock.release()
+
+
+revocations = RevocationCache(
+    retention=timedelta(minutes=ACCESS_TTL_MIN),
+    sync_interval=REVOCATION_SYNC_SECONDS,
+)
+
+
+def _new_session(user_id: int, family_id: uuid.UUID) -> AuthSession:
+    return AuthSession(
+        jti=uuid.uuid4(),
+        family_id=family_id,
+        user_id=user_id,
+        expires_at=datetime.now(timezone.utc) + timedelta(days=REFRESH_TTL_DAYS),
+    )
+
+
+def start_family(session: Session, user_id: int) -> AuthSession:
+    """Issue the first refresh token of a new family (on login)."""
+    auth_session = _new_session(user_id, uuid.uuid4())
+    session.add(auth_session)
+    session.commit()
+    session.refresh(auth_session)
+    return auth_session
+
+
+def revoke_family(session: Session, family_id: uuid.UUID) -> int:
+    now = datetime.now(timezone.utc)
+    result = session.execute(
+        update(AuthSession)
+        .where(AuthSession.family_id == family_id, AuthSession.revoked_at.is_(None))
+        .values(revoked_at=now)
+    )
+    session.commit()
+    revocations.add(family_id, now)
+    return result.rowcount
+
+
+def revoke_user_sessions(session: Session, user_id: int) -> int:
+    """Revoke every live refresh-token family of `user_id` in one statement."""
+    now = datetime.now(timezone.utc)
+    family_ids = session.execute(
+        update(AuthSession)
+        .where(AuthSession.user_id == user_id, AuthSession.revoked_at.is_(None))
+        .values(revoked_at=now)
+        .returning(AuthSession.family_id)
+    ).scalars().all()
+    session.commit()
+    for family_id in set(family_ids):
+        revocations.add(family_id, now)
+    return len(family_ids)
+
+
+def revoke_users_sessions(session: Session, user_ids: list[int], batch_size: int = 5000) -> int:
+    """revoke_user_sessions() for many users, one statement per `batch_size` ids."""
+    now = datetime.now(timezone.utc)
+    family_ids = set()
+    for i in range(0, len(user_ids), batch_size):
+        family_ids.update(
+            session.execute(
+                update(AuthSession)
+                .where(AuthSession.user_id.in_(user_ids[i:i + batch_size]), AuthSession.revoked_at.is_(None))
+                .values(revoked_at=now)
+                .returning(AuthSession.family_id)
+            ).scalars().all()
+        )
+    session.commit()
+    for family_id in family_ids:
+        revocations.add(family_id, now)
+    return len(family_ids)
+
+
+def rotate(session: Session, jti: uuid.UUID) -> Optional[AuthSession]:
+    """Spend refresh token `jti` and return its successor.
+
+    Returns None when the token is unknown, expired or revoked. Presenting a
+    token that was already rotated means it leaked (or the client raced
+    itself); the whole family is revoked.
+    """
+    now = datetime.now(timezone.utc)
+    spent = session.execute(
+        update(AuthSession)
+        .where(
+            AuthSession.jti == jti,
+            AuthSession.rotated_at.is_(None),
+            AuthSession.revoked_at.is_(None),
+            AuthSession.expires_at > now,
+        )
+        .values(rotated_at=now)
+        .returning(AuthSession.user_id, AuthSession.family_id)
+    ).first()
+
+    if spent is None:
+        session.rollback()
+        existing = session.exec(select(AuthSession).where(AuthSession.jti == jti)).first()
+        if existing and existing.rotated_at is not None and existing.revoked_at is None:
+            revoke_family(session, existing.family_id)
+        return None
+
+    successor = _new_session(spent.user_id, spent.family_id)
+    session.add(successor)
+    session.commit()
+    session.refresh(successor)
+    return successor
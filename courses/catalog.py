@@ -0,0 +1,235 @@
+# app/courses/catalog.py
+"""In-process course catalog snapshot.
+
+The catalog is read on nearly every page and written rarely, so each
+worker keeps an immutable CatalogSnapshot of the courses table with
+lookup indexes, and reads filter it in memory instead of querying.
+
+A statement trigger on courses bumps course_catalog_version and NOTIFYs
+'course_catalog' (migration 0010). The background loop (run_forever)
+LISTENs for that and otherwise polls the counter every `poll` seconds;
+when the version moved it loads the table, builds a new snapshot and
+swaps it in with one attribute assignment. Readers take `catalog.snapshot`
+once per request and never see a half-built one.
+
+Staleness is bounded: if the version hasn't been checked for
+CATALOG_MAX_STALENESS_SECONDS (the loop died, the listener is wedged),
+get() checks it inline before answering. Writes made by this worker call
+invalidate(), so they show up on its next read.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import psycopg
+from sqlalchemy import Engine
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+
+from models import Course, CourseCatalogVersion
+from observability.metrics import (
+    CATALOG_CHECKED,
+    CATALOG_REBUILDS,
+    CATALOG_SNAPSHOT_BYTES,
+    CATALOG_SNAPSHOT_COURSES,
+)
+from schemas import CourseOut
+
+logger = logging.getLogger(__name__)
+
+CATALOG_POLL_SECONDS = float(os.getenv("CATALOG_POLL_SECONDS", "5"))
+CATALOG_MAX_STALENESS_SECONDS = float(os.getenv("CATALOG_MAX_STALENESS_SECONDS", "60"))
+CATALOG_CHANNEL = "course_catalog"
+
+
+def _approx_size(obj, seen: Optional[set] = None) -> int:
+    """sys.getsizeof, following containers and model attributes."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_approx_size(k, seen) + _approx_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_approx_size(v, seen) for v in obj)
+    elif hasattr(obj, "__dict__"):
+        size += _approx_size(vars(obj), seen)
+    return size
+
+
+def _index(pairs: Iterable[tuple[object, int]]) -> dict:
+    index: dict = {}
+    for key, position in pairs:
+        if key is not None:
+            index.setdefault(key, []).append(position)
+    return {key: tuple(positions) for key, positions in index.items()}
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: int
+    built_at: float                         # time.time()
+    courses: tuple[CourseOut, ...]          # ordered by id
+    by_id: dict[int, CourseOut]
+    # key -> positions in `courses`, ascending (so results stay in id order)
+    by_provider: dict[int, tuple[int, ...]]
+    by_classification: dict[int, tuple[int, ...]]
+    by_flag: dict[int, tuple[int, ...]]
+    by_skill: dict[str, tuple[int, ...]]    # lower-cased skill
+    active: tuple[int, ...]
+
+    @classmethod
+    def build(cls, version: int, rows: Iterable) -> "CatalogSnapshot":
+        courses = tuple(sorted((CourseOut.model_validate(r) for r in rows), key=lambda c: c.id))
+        positions = list(enumerate(courses))
+        return cls(
+            version=version,
+            built_at=time.time(),
+            courses=courses,
+            by_id={c.id: c for c in courses},
+            by_provider=_index((c.provider_id, i) for i, c in positions),
+            by_classification=_index((c.classification_id, i) for i, c in positions),
+            by_flag=_index((c.flag_id, i) for i, c in positions),
+            by_skill=_index(
+                (s, i) for i, c in positions for s in sorted({s.strip().lower() for s in c.skills or () if s})
+            ),
+            active=tuple(i for i, c in positions if c.is_active),
+        )
+
+    def filter(
+        self,
+        active: Optional[bool] = None,
+        provider_id: Optional[int] = None,
+        classification_id: Optional[int] = None,
+        flag_id: Optional[int] = None,
+        skill: Optional[str] = None,
+    ) -> list[CourseOut]:
+        """Courses matching every given criterion, in id order."""
+        selected: Optional[set[int]] = None
+        for index, key in (
+            (self.by_provider, provider_id),
+            (self.by_classification, classification_id),
+            (self.by_flag, flag_id),
+            (self.by_skill, skill.strip().lower() if skill else None),
+        ):
+            if key is None:
+                continue
+            hits = index.get(key, ())
+            selected = set(hits) if selected is None else selected.intersection(hits)
+            if not selected:
+                return []
+        if active is not None:
+            flagged = set(self.active)
+            if selected is None:
+                selected = set(range(len(self.courses)))
+            selected = selected & flagged if active else selected - flagged
+        if selected is None:
+            return list(self.courses)
+        return [self.courses[i] for i in sorted(selected)]
+
+
+def current_version(session: Session) -> int:
+    return session.exec(select(CourseCatalogVersion.version).where(CourseCatalogVersion.id == 1)).first() or 0
+
+
+class Catalog:
+    def __init__(self, max_staleness: float = CATALOG_MAX_STALENESS_SECONDS, clock=time.monotonic):
+        self.max_staleness = max_staleness
+        self.clock = clock
+        self.snapshot = CatalogSnapshot.build(-1, [])
+        self._checked_at = float("-inf")
+        self._dirty = True
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        """Rebuild before the next read; call after writing to courses."""
+        self._dirty = True
+
+    def is_fresh(self) -> bool:
+        return not self._dirty and self.clock() - self._checked_at <= self.max_staleness
+
+    def refresh(self, session: Session, reason: str = "poll") -> CatalogSnapshot:
+        with self._lock:
+            return self._refresh_locked(session, reason)
+
+    def get(self, session: Session) -> CatalogSnapshot:
+        if not self.is_fresh():
+            with self._lock:
+                # Re-checked under the lock: a request queued behind a
+                # rebuild doesn't run another one.
+                if not self.is_fresh():
+                    self._refresh_locked(session, "read")
+        return self.snapshot
+
+    def _refresh_locked(self, session: Session, reason: str) -> CatalogSnapshot:
+        version = current_version(session)
+        if self._dirty or version != self.snapshot.version:
+            # Cleared first: an invalidate() racing the load forces one more rebuild.
+            self._dirty = False
+            rows = session.exec(select(Course).order_by(Course.id)).all()
+            snapshot = CatalogSnapshot.build(version, rows)
+            self.snapshot = snapshot
+            CATALOG_REBUILDS.labels(reason=reason).inc()
+            CATALOG_SNAPSHOT_COURSES.set(len(snapshot.courses))
+            CATALOG_SNAPSHOT_BYTES.set(_approx_size(snapshot))
+            logger.info("catalog: version %s, %d courses", version, len(snapshot.courses))
+        self._checked_at = self.clock()
+        CATALOG_CHECKED.set(time.time())
+        return self.snapshot
+
+    async def run_forever(self, engine: Engine, poll: float = CATALOG_POLL_SECONDS) -> None:
+        """Refresh on NOTIFY (Postgres) or every `poll` seconds, until cancelled."""
+        listener = None
+        try:
+            while True:
+                try:
+                    await run_in_threadpool(self._refresh_from, engine)
+                except Exception:
+                    logger.exception("catalog refresh failed")
+                if listener is None and engine.dialect.name == "postgresql":
+                    listener = await _listen(engine)
+                if listener is None:
+                    await asyncio.sleep(poll)
+                    continue
+                try:
+                    async for _ in listener.notifies(timeout=poll, stop_after=1):
+                        pass
+                except Exception:
+                    logger.warning("catalog listener lost; falling back to polling", exc_info=True)
+                    await _close(listener)
+                    listener = None
+                    await asyncio.sleep(poll)
+        finally:
+            if listener is not None:
+                await _close(listener)
+
+    def _refresh_from(self, engine: Engine) -> None:
+        with Session(engine) as session:
+            self.refresh(session)
+
+
+async def _listen(engine: Engine):
+    try:
+        conninfo = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        conn = await psycopg.AsyncConnection.connect(conninfo, autocommit=True)
+        await conn.execute(f"LISTEN {CATALOG_CHANNEL}")
+        return conn
+    except Exception:
+        logger.warning("catalog: LISTEN %s failed; polling instead", CATALOG_CHANNEL, exc_info=True)
+        return None
+
+
+async def _close(conn) -> None:
+    try:
+        await conn.close()
+    except Exception:
+        pass
+
+
+catalog = Catalog()
@@ -0,0 +1,37 @@
+# app/courses/enrollments.py
+"""Enrollment inserts that are safe under double-clicks and retries.
+
+Two concurrent requests for the same (employee, course) used to both pass
+a SELECT and then race to INSERT, the loser hitting the unique
+course_enrollments_employee_course_key index as a 500. Here the insert is
+ON CONFLICT DO NOTHING: exactly one request creates the row, the others
+get None and read the existing one.
+"""
+from typing import Any, Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select
+
+from models import CourseEnrollment
+
+ENROLLMENT_KEY = ["employee_id", "course_id"]
+
+
+def insert_enrollment(session: Session, employee_id: int, course_id: int, **values: Any) -> Optional[CourseEnrollment]:
+    """The new enrollment, or None if the employee is already enrolled. Not committed."""
+    stmt = (
+        insert(CourseEnrollment)
+        .values(employee_id=employee_id, course_id=course_id, **values)
+        .on_conflict_do_nothing(index_elements=ENROLLMENT_KEY)
+        .returning(CourseEnrollment)
+    )
+    return session.scalars(stmt).first()
+
+
+def get_enrollment(session: Session, employee_id: int, course_id: int) -> CourseEnrollment:
+    return session.exec(
+        select(CourseEnrollment).where(
+            CourseEnrollment.employee_id == employee_id,
+            CourseEnrollment.course_id == course_id,
+        )
+    ).one()
@@ -0,0 +1,92 @@
+# app/courses/progress.py
+"""Enrollment progress from learning events.
+
+Clients post statements (started / progressed n% / completed) in batches;
+record_events() appends them to learning_events with one multi-row INSERT
+and touches nothing else. The fold_learning_events job then drains the
+inbox a batch at a time: one statement deletes the claimed events, folds
+them per (user, course) and applies the result to course_enrollments, so
+thousands of events become at most one UPDATE per enrollment per batch.
+
+A statement that reaches 100% counts as completion whatever its verb.
+The fold is monotonic (progress only grows, started_at/completed_at keep
+the earliest value, last_activity_at the latest), so late, duplicated or
+reordered events cannot move an enrollment backwards. Events for courses
+the user has no approved/assigned enrollment in are dropped.
+"""
+import os
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import insert, text
+from sqlmodel import Session
+
+from models import LearningEvent
+from observability.metrics import LEARNING_EVENTS
+from schemas import LearningStatementIn
+
+PROGRESS_FOLD_BATCH = int(os.getenv("PROGRESS_FOLD_BATCH", "10000"))
+
+_FOLD = text(
+    """
+    WITH claimed AS (
+        DELETE FROM learning_events
+        WHERE id IN (
+            SELECT id FROM learning_events ORDER BY id LIMIT :limit FOR UPDATE SKIP LOCKED
+        )
+        RETURNING user_id, course_id, verb, progress, occurred_at
+    ), folded AS (
+        SELECT user_id, course_id,
+               max(CASE WHEN verb = 'completed' THEN 100 ELSE floor(progress) END)::smallint AS progress,
+               min(occurred_at) AS first_at,
+               min(occurred_at) FILTER (WHERE verb = 'completed' OR floor(progress) >= 100) AS completed_at,
+               max(occurred_at) AS last_at
+        FROM claimed
+        GROUP BY user_id, course_id
+    ), updated AS (
+        UPDATE course_enrollments e SET
+            progress_percent = GREATEST(e.progress_percent, f.progress),
+            started_at = LEAST(e.started_at, f.first_at),
+            completed_at = LEAST(e.completed_at, f.completed_at),
+            last_activity_at = GREATEST(e.last_activity_at, f.last_at)
+        FROM folded f
+        WHERE e.employee_id = f.user_id
+          AND e.course_id = f.course_id
+          AND e.status IN ('approved', 'assigned')
+        RETURNING e.id
+    )
+    SELECT (SELECT count(*) FROM claimed) AS events, (SELECT count(*) FROM updated) AS enrollments
+    """
+)
+
+
+def record_events(session: Session, user_id: int, statements: Iterable[LearningStatementIn]) -> int:
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "user_id": user_id,
+            "course_id": s.course_id,
+            "verb": s.verb,
+            "progress": s.progress,
+            # Client clocks run ahead; an event can't have happened after we got it.
+            "occurred_at": min(s.timestamp, now) if s.timestamp else now,
+        }
+        for s in statements
+    ]
+    if rows:
+        session.execute(insert(LearningEvent), rows)
+        session.commit()
+        LEARNING_EVENTS.labels(stage="received").inc(len(rows))
+    return len(rows)
+
+
+def fold_learning_events(session: Session, now: datetime, last_run: Optional[datetime] = None) -> int:
+    """Drain learning_events into course_enrollments; returns events consumed."""
+    consumed = 0
+    while True:
+        events = session.execute(_FOLD, {"limit": PROGRESS_FOLD_BATCH}).one().events
+        session.commit()
+        LEARNING_EVENTS.labels(stage="folded").inc(events)
+        consumed += events
+        if events < PROGRESS_FOLD_BATCH:
+            return consumed
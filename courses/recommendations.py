@@ -0,0 +1,283 @@
+# app/courses/recommendations.py
+"""Course recommendations from skill/competency overlap.
+
+Each active course is a sparse, L2-normalised vector over the skill and
+competency vocabulary (idf-weighted, so ubiquitous tags count for less),
+stored CSR-style in three NumPy arrays. A user's interest vector is the sum
+of the vectors of courses they enrolled in, plus PEER_WEIGHT times those
+of their team (same manager, or their direct reports). Scoring every
+course is then one sparse mat-vec; the answer is a top-k over it.
+
+The index lives in process and is kept up to date by a background loop
+(run_forever, started from main.py like the catalog's) every
+RECOMMENDATION_REFRESH_SECONDS: new enrollments are pulled by id
+watermark, RECOMMENDATION_LOAD_BATCH rows per query so the first load of
+a large table doesn't arrive as one result set, and the course matrix is
+rebuilt only when the catalog snapshot (courses.catalog) was swapped.
+Requests never load it; until the first build lands they get no
+recommendations. Enrollment endpoints also call note_enrollment() /
+forget_enrollment() so a user's own change shows up immediately. Every
+enrollment counts as interest unless it was rejected; rejections made
+elsewhere are pulled by rejected_at.
+"""
+import asyncio
+import logging
+import math
+import os
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+import numpy as np
+from sqlalchemy import Engine, or_
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+
+from models import CourseEnrollment, EmployeeManager
+
+from .catalog import Catalog, CatalogSnapshot, catalog
+
+logger = logging.getLogger(__name__)
+
+RECOMMENDATION_REFRESH_SECONDS = float(os.getenv("RECOMMENDATION_REFRESH_SECONDS", "30"))
+RECOMMENDATION_LOAD_BATCH = int(os.getenv("RECOMMENDATION_LOAD_BATCH", "50000"))
+PEER_WEIGHT = float(os.getenv("RECOMMENDATION_PEER_WEIGHT", "0.5"))
+# Popularity only breaks ties and ranks cold-start users.
+POPULARITY_WEIGHT = 1e-3
+# Enrollment ids are re-read this far behind the watermark: a transaction
+# holding a lower id can commit after a higher one was already seen.
+WATERMARK_OVERLAP = 1000
+# Same for rejections, by rejected_at.
+REJECTION_OVERLAP = timedelta(minutes=5)
+
+
+def course_terms(skills: Optional[list], competencies: Optional[list]) -> set[str]:
+    terms = {f"skill:{s.strip().lower()}" for s in skills or () if s and s.strip()}
+    terms |= {f"competency:{c.strip().lower()}" for c in competencies or () if c and c.strip()}
+    return terms
+
+
+@dataclass(frozen=True)
+class CourseVectors:
+    ids: np.ndarray               # row -> course id
+    rows: dict[int, int]          # course id -> row
+    terms: list[str]              # column -> term
+    indptr: np.ndarray
+    indices: np.ndarray
+    data: np.ndarray
+
+    @classmethod
+    def build(cls, courses: Iterable[tuple[int, Optional[list], Optional[list]]]) -> "CourseVectors":
+        course_ids, term_sets = [], []
+        for course_id, skills, competencies in courses:
+            course_ids.append(course_id)
+            term_sets.append(course_terms(skills, competencies))
+
+        df = Counter(t for terms in term_sets for t in terms)
+        vocab = {t: i for i, t in enumerate(sorted(df))}
+        n = len(course_ids)
+        idf = {t: math.log((1 + n) / (1 + count)) + 1 for t, count in df.items()}
+
+        indptr = [0]
+        indices: list[int] = []
+        data: list[float] = []
+        for terms in term_sets:
+            ordered = sorted(terms, key=vocab.__getitem__)
+            weights = np.array([idf[t] for t in ordered], dtype=np.float32)
+            norm = float(np.linalg.norm(weights)) or 1.0
+            indices.extend(vocab[t] for t in ordered)
+            data.extend((weights / norm).tolist())
+            indptr.append(len(indices))
+
+        return cls(
+            ids=np.array(course_ids, dtype=np.int64),
+            rows={cid: i for i, cid in enumerate(course_ids)},
+            terms=list(vocab),
+            indptr=np.array(indptr, dtype=np.int64),
+            indices=np.array(indices, dtype=np.int64),
+            data=np.array(data, dtype=np.float32),
+        )
+
+    def add_row(self, out: np.ndarray, row: int, weight: float) -> None:
+        start, end = self.indptr[row], self.indptr[row + 1]
+        np.add.at(out, self.indices[start:end], self.data[start:end] * weight)
+
+    def matvec(self, vector: np.ndarray) -> np.ndarray:
+        """scores[row] = <course row, vector>, empty rows included."""
+        products = self.data * vector[self.indices]
+        cumulative = np.concatenate(([0.0], np.cumsum(products, dtype=np.float64)))
+        return cumulative[self.indptr[1:]] - cumulative[self.indptr[:-1]]
+
+
+@dataclass
+class Recommendation:
+    course_id: int
+    score: float
+    matched: list[str] = field(default_factory=list)
+
+
+class RecommendationIndex:
+    def __init__(self, catalog: Catalog = catalog):
+        self.catalog = catalog
+        self.vectors = CourseVectors.build([])
+        self.ready = False
+        self._enrolled: dict[int, set[int]] = {}
+        self._counts: Counter = Counter()
+        self._popularity = np.zeros(0, dtype=np.float64)
+        self._enrollment_watermark = 0
+        self._rejection_watermark: Optional[datetime] = None
+        self._catalog: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()           # guards _enrolled, _counts, _popularity
+        self._refresh_lock = threading.Lock()   # one refresh at a time
+
+    # --- maintenance -----------------------------------------------------
+
+    def note_enrollment(self, user_id: int, course_id: int) -> None:
+        with self._lock:
+            self._note_locked(user_id, course_id, 1)
+
+    def forget_enrollment(self, user_id: int, course_id: int) -> None:
+        with self._lock:
+            self._note_locked(user_id, course_id, -1)
+
+    def _note_locked(self, user_id: int, course_id: int, delta: int) -> None:
+        courses = self._enrolled.setdefault(user_id, set())
+        if (course_id in courses) == (delta > 0):
+            return
+        if delta > 0:
+            courses.add(course_id)
+        else:
+            courses.discard(course_id)
+        self._counts[course_id] += delta
+        row = self.vectors.rows.get(course_id)
+        if row is not None:
+            self._popularity[row] += delta
+
+    def _rebuild_popularity_locked(self) -> None:
+        popularity = np.zeros(len(self.vectors.ids), dtype=np.float64)
+        for course_id, count in self._counts.items():
+            row = self.vectors.rows.get(course_id)
+            if row is not None:
+                popularity[row] = count
+        self._popularity = popularity
+
+    def refresh(self, session: Session) -> None:
+        with self._refresh_lock:
+            self._refresh_courses(session)
+            self._load_enrollments(session)
+            self._load_rejections(session)
+            self.ready = True
+
+    def _refresh_courses(self, session: Session) -> None:
+        snapshot = self.catalog.get(session)
+        if snapshot is self._catalog:
+            return
+        active = (snapshot.courses[i] for i in snapshot.active)
+        vectors = CourseVectors.build((c.id, c.skills, c.competencies) for c in active)
+        with self._lock:
+            self.vectors = vectors
+            self._rebuild_popularity_locked()
+        self._catalog = snapshot
+
+    def _load_enrollments(self, session: Session) -> None:
+        after = self._enrollment_watermark - WATERMARK_OVERLAP
+        while True:
+            rows = session.exec(
+                select(CourseEnrollment.id, CourseEnrollment.employee_id, CourseEnrollment.course_id)
+                .where(CourseEnrollment.id > after, CourseEnrollment.status != "rejected")
+                .order_by(CourseEnrollment.id)
+                .limit(RECOMMENDATION_LOAD_BATCH)
+            ).all()
+            if not rows:
+                return
+            with self._lock:
+                for _, user_id, course_id in rows:
+                    self._note_locked(user_id, course_id, 1)
+            after = rows[-1][0]
+            self._enrollment_watermark = max(self._enrollment_watermark, after)
+            if len(rows) < RECOMMENDATION_LOAD_BATCH:
+                return
+
+    def _load_rejections(self, session: Session) -> None:
+        now = datetime.now(timezone.utc)
+        if self._rejection_watermark is None:
+            # The first load skipped rejected rows already.
+            self._rejection_watermark = now
+            return
+        rows = session.exec(
+            select(CourseEnrollment.employee_id, CourseEnrollment.course_id).where(
+                CourseEnrollment.status == "rejected",
+                CourseEnrollment.rejected_at > self._rejection_watermark - REJECTION_OVERLAP,
+            )
+        ).all()
+        with self._lock:
+            for user_id, course_id in rows:
+                self._note_locked(user_id, course_id, -1)
+        self._rejection_watermark = now
+
+    async def run_forever(self, engine: Engine, poll: float = RECOMMENDATION_REFRESH_SECONDS) -> None:
+        """Refresh every `poll` seconds, until cancelled."""
+        while True:
+            try:
+                await run_in_threadpool(self._refresh_from, engine)
+            except Exception:
+                logger.exception("recommendation refresh failed")
+            await asyncio.sleep(poll)
+
+    def _refresh_from(self, engine: Engine) -> None:
+        with Session(engine) as session:
+            self.refresh(session)
+
+    # --- queries -----------------------------------------------------------
+
+    def interest_vector(self, user_id: int, peer_ids: Iterable[int]) -> np.ndarray:
+        vectors = self.vectors
+        interest = np.zeros(len(vectors.terms), dtype=np.float32)
+        for weight, users in ((1.0, (user_id,)), (PEER_WEIGHT, peer_ids)):
+            for uid in users:
+                for course_id in list(self._enrolled.get(uid, ())):
+                    row = vectors.rows.get(course_id)
+                    if row is not None:
+                        vectors.add_row(interest, row, weight)
+        return interest
+
+    def recommend(self, user_id: int, peer_ids: Iterable[int], k: int = 10) -> list[Recommendation]:
+        vectors, popularity = self.vectors, self._popularity
+        if not len(vectors.ids):
+            return []
+        interest = self.interest_vector(user_id, peer_ids)
+        scores = vectors.matvec(interest)
+        if len(popularity) == len(scores) and popularity.max(initial=0) > 0:
+            scores = scores + POPULARITY_WEIGHT * popularity / popularity.max()
+
+        own = [vectors.rows[c] for c in list(self._enrolled.get(user_id, ())) if c in vectors.rows]
+        scores[own] = -np.inf
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        out = []
+        for row in top:
+            start, end = vectors.indptr[row], vectors.indptr[row + 1]
+            cols = vectors.indices[start:end]
+            matched = [vectors.terms[c] for c in cols[interest[cols] > 0]]
+            out.append(Recommendation(course_id=int(vectors.ids[row]), score=round(float(scores[row]), 4), matched=matched))
+        return out
+
+
+def team_of(session: Session, user_id: int) -> list[int]:
+    """Colleagues under the same manager, plus the user's own direct reports."""
+    my_managers = select(EmployeeManager.manager_id).where(EmployeeManager.employee_id == user_id)
+    ids = session.exec(
+        select(EmployeeManager.employee_id).where(
+            or_(EmployeeManager.manager_id.in_(my_managers), EmployeeManager.manager_id == user_id)
+        )
+    ).all()
+    return [i for i in ids if i != user_id]
+
+
+index = RecommendationIndex()
@@ -0,0 +1,168 @@
+# app/idempotency/middleware.py
+"""Idempotency-Key support for mutating requests.
+
+A client that may retry a POST/PUT/PATCH/DELETE (double-click, timeout,
+flaky mobile link) sends `Idempotency-Key: <unique string>`. The first
+request with a given key runs normally and its response is stored; a retry
+with the same key and the same request gets that response replayed, with
+`Idempotent-Replayed: true`, without running the endpoint again. A key
+reused for a different request is a 422; a retry arriving while the first
+one is still running is a 409.
+
+Keys are scoped to the authenticated user, so requests without a valid
+access token pass through untouched. 5xx and 429 responses are not stored:
+retrying those should run the request again. Request and stored response
+bodies are capped at IDEMPOTENCY_MAX_BODY_BYTES.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Optional
+
+from jose import jwt, JWTError
+from starlette.concurrency import run_in_threadpool
+
+from observability.metrics import IDEMPOTENCY_REQUESTS
+from security import JWT_SECRET, JWT_ISSUER
+from .store import IdempotencyStore, StoredResponse
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_MAX_BODY_BYTES = int(os.getenv("IDEMPOTENCY_MAX_BODY_BYTES", str(1024 * 1024)))
+MAX_KEY_LENGTH = 255
+
+MUTATING = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+# Per-response headers that must not be replayed.
+SKIP_HEADERS = frozenset({b"content-length", b"date", b"server-timing", b"set-cookie"})
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _user_id(scope) -> Optional[int]:
+    scheme, _, token = (_header(scope, b"authorization") or "").partition(" ")
+    if scheme.lower() != "bearer":
+        return None
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"], audience="access", issuer=JWT_ISSUER)
+        return int(payload["sub"])
+    except (JWTError, KeyError, ValueError):
+        return None
+
+
+def fingerprint(scope, body: bytes) -> bytes:
+    sha = hashlib.sha256()
+    for part in (scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body):
+        sha.update(len(part).to_bytes(8, "big"))
+        sha.update(part)
+    return sha.digest()
+
+
+async def _send_json(send, status: int, detail: str, headers: Optional[list] = None) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        + (headers or []),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app, store: IdempotencyStore, max_body: int = IDEMPOTENCY_MAX_BODY_BYTES):
+        self.app = app
+        self.store = store
+        self.max_body = max_body
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in MUTATING:
+            await self.app(scope, receive, send)
+            return
+        key = _header(scope, b"idempotency-key")
+        user_id = _user_id(scope) if key is not None else None
+        if user_id is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+            return
+
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_body:
+                await _send_json(send, 413, "Request body too large for an Idempotency-Key")
+                return
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+        digest = fingerprint(scope, body)
+
+        claim = await run_in_threadpool(self.store.claim, user_id, key, digest)
+        IDEMPOTENCY_REQUESTS.labels(outcome=claim.outcome).inc()
+        if claim.outcome == "mismatch":
+            await _send_json(send, 422, "Idempotency-Key was already used for a different request")
+            return
+        if claim.outcome == "in_flight":
+            await _send_json(send, 409, "A request with this Idempotency-Key is in progress", [(b"retry-after", b"1")])
+            return
+        if claim.outcome == "replay":
+            await self._replay(claim.response, send)
+            return
+
+        replayed_body = False
+
+        async def receive_buffered():
+            nonlocal replayed_body
+            if not replayed_body:
+                replayed_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status, headers, out, storable = 500, [], [], True
+
+        async def send_capturing(message):
+            nonlocal status, headers, storable
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = [
+                    (k.decode("latin-1"), v.decode("latin-1"))
+                    for k, v in message.get("headers", []) if k.lower() not in SKIP_HEADERS
+                ]
+            elif message["type"] == "http.response.body" and storable:
+                out.append(message.get("body", b""))
+                if sum(map(len, out)) > self.max_body:
+                    storable, out[:] = False, []
+            await send(message)
+
+        completed = False
+        try:
+            await self.app(scope, receive_buffered, send_capturing)
+            if storable and status < 500 and status != 429:
+                response = StoredResponse(status, headers, b"".join(out))
+                await run_in_threadpool(self.store.complete, user_id, key, digest, response)
+                completed = True
+        finally:
+            if not completed:
+                try:
+                    await run_in_threadpool(self.store.release, user_id, key, digest)
+                except Exception:
+                    logger.exception("releasing idempotency key failed")
+
+    @staticmethod
+    async def _replay(response: StoredResponse, send) -> None:
+        headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in response.headers]
+        headers += [(b"content-length", str(len(response.body)).encode()), (b"idempotent-replayed", b"true")]
+        await send({"type": "http.response.start", "status": response.status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": response.body})
@@ -0,0 +1,102 @@
+# app/idempotency/store.py
+import json
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+# A claim whose request never finished (worker died) can be taken over after this.
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+
+
+@dataclass
+class StoredResponse:
+    status_code: int
+    headers: list[tuple[str, str]]
+    body: bytes
+
+
+@dataclass
+class Claim:
+    outcome: str                      # "new" | "replay" | "mismatch" | "in_flight"
+    response: Optional[StoredResponse] = None
+
+
+class IdempotencyStore:
+    """Idempotency keys in Postgres (idempotency_keys), one row per (user, key).
+
+    claim() is a single INSERT ... ON CONFLICT: it either takes the key (new,
+    expired, or abandoned mid-request) or leaves the existing row alone, in
+    which case that row says what to answer.
+    """
+
+    _CLAIM = text(
+        """
+        INSERT INTO idempotency_keys AS k (user_id, key, fingerprint, created_at, expires_at)
+        VALUES (:user_id, :key, :fingerprint, now(), now() + make_interval(secs => :ttl))
+        ON CONFLICT (user_id, key) DO UPDATE SET
+            fingerprint = EXCLUDED.fingerprint,
+            status_code = NULL,
+            headers = NULL,
+            body = NULL,
+            created_at = EXCLUDED.created_at,
+            expires_at = EXCLUDED.expires_at
+        WHERE k.expires_at < now()
+           OR (k.status_code IS NULL AND k.created_at < now() - make_interval(secs => :lock))
+        RETURNING 1
+        """
+    )
+    _GET = text(
+        "SELECT fingerprint, status_code, headers, body FROM idempotency_keys WHERE user_id = :user_id AND key = :key"
+    )
+    _COMPLETE = text(
+        """
+        UPDATE idempotency_keys SET status_code = :status_code, headers = CAST(:headers AS jsonb), body = :body
+        WHERE user_id = :user_id AND key = :key AND fingerprint = :fingerprint
+        """
+    )
+    _RELEASE = text(
+        """
+        DELETE FROM idempotency_keys
+        WHERE user_id = :user_id AND key = :key AND fingerprint = :fingerprint AND status_code IS NULL
+        """
+    )
+
+    def __init__(self, engine: Engine, ttl: int = IDEMPOTENCY_TTL_SECONDS, lock: int = IDEMPOTENCY_LOCK_SECONDS):
+        self.engine = engine
+        self.ttl = ttl
+        self.lock = lock
+
+    def claim(self, user_id: int, key: str, fingerprint: bytes) -> Claim:
+        params = {"user_id": user_id, "key": key, "fingerprint": fingerprint}
+        # Twice at most: the row we collided with may be released in between.
+        for _ in range(2):
+            with self.engine.begin() as conn:
+                if conn.execute(self._CLAIM, {**params, "ttl": self.ttl, "lock": self.lock}).first():
+                    return Claim("new")
+                row = conn.execute(self._GET, params).first()
+            if row is None:
+                continue
+            if bytes(row.fingerprint) != fingerprint:
+                return Claim("mismatch")
+            if row.status_code is None:
+                return Claim("in_flight")
+            return Claim("replay", StoredResponse(row.status_code, [tuple(h) for h in row.headers or ()], bytes(row.body or b"")))
+        return Claim("in_flight")
+
+    def complete(self, user_id: int, key: str, fingerprint: bytes, response: StoredResponse) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(self._COMPLETE, {
+                "user_id": user_id, "key": key, "fingerprint": fingerprint,
+                "status_code": response.status_code,
+                "headers": json.dumps(response.headers),
+                "body": response.body,
+            })
+
+    def release(self, user_id: int, key: str, fingerprint: bytes) -> None:
+        """Forget an unfinished claim so a retry runs the request again."""
+        with self.engine.begin() as conn:
+            conn.execute(self._RELEASE, {"user_id": user_id, "key": key, "fingerprint": fingerprint})
@@ -1,7 +1,11 @@
 # app/mailer.py
+import logging
 import os
 import smtplib
 from email.message import EmailMessage
+from html import escape
+
+from observability.metrics import EMAIL_SEND_FAILURES
 
 SMTP_HOST = os.getenv("SMTP_HOST", "")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
@@ -10,6 +14,8 @@ SMTP_PASS = os.getenv("SMTP_PASS", "")
 SMTP_FROM = os.getenv("SMTP_FROM", "no-reply@example.com")
 FRONTEND_BASE_URL = os.getenv("FRONTEND_BASE_URL", "https://example.com")
 
+logger = logging.getLogger(__name__)
+
 
 def build_invite_email(to: str, token: str, name: str | None = None, invite_url: str | None = None):
     """
@@ -57,9 +63,42 @@ Open this link to accept (expires in 48h):
 def send_email(msg: EmailMessage):
     if not (SMTP_HOST and SMTP_PORT and SMTP_USER and SMTP_PASS):
         # Don’t crash the app if SMTP is not configured
-        print("WARN: SMTP not configured; skipping send.")
+        logger.warning("SMTP not configured; skipping send.")
         return
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as s:
-        s.starttls()
-        s.login(SMTP_USER, SMTP_PASS)
-        s.send_message(msg)
+    try:
+        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as s:
+            s.starttls()
+            s.login(SMTP_USER, SMTP_PASS)
+            s.send_message(msg)
+    except Exception:
+        EMAIL_SEND_FAILURES.inc()
+        raise
+
+def build_digest_email(to: str, name: str | None, digests: list[tuple[str, str]]):
+    """One email summarising a recipient's closed notification digests ((title, body) pairs)."""
+    display_name = name or to.split("@")[0].replace(".", " ").title()
+    url = f"{FRONTEND_BASE_URL.rstrip('/')}/notifications"
+    subject = digests[0][0] if len(digests) == 1 else f"{len(digests)} updates waiting for you"
+    items_html = "".join(f"<li><strong>{escape(t)}</strong><br>{escape(b)}</li>" for t, b in digests)
+    items_text = "\n".join(f"- {t}: {b}" for t, b in digests)
+    html = f"""
+    <p>Hi {escape(display_name)},</p>
+    <p>Here is what happened since your last update:</p>
+    <ul>{items_html}</ul>
+    <p><a href="{url}">Open your notifications</a></p>
+    """
+    text = f"""Hi {display_name},
+
+Here is what happened since your last update:
+{items_text}
+
+{url}
+"""
+
+    msg = EmailMessage()
+    msg["From"] = SMTP_FROM
+    msg["To"] = to
+    msg["Subject"] = subject
+    msg.set_content(text)
+    msg.add_alternative(html, subtype="html")
+    return msg
@@ -1,16 +1,66 @@
 # app/main.py
+import asyncio
+import logging
 import os
-from fastapi import FastAPI
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
+from sqlmodel import Session
 from auth.routes import router as auth_router
 from routers.courses import router as courses_router
 from routers.enrollments import router as enrollments_router
 from routers.users import router as users_router
 from routers.profiles import router as profiles_router
+from routers.health import router as health_router
+from routers.media import router as media_router
+from routers.dashboard import router as dashboard_router
+from routers.progress import router as progress_router
+from routers.analytics import router as analytics_router
+from routers.exports import router as exports_router
+from routers.webhooks import router as webhooks_router
+from idempotency.middleware import IdempotencyMiddleware
+from idempotency.store import IdempotencyStore
+from assets.static import AssetStore, StaticAssets, serve
+from observability import metrics
+from observability.middleware import RequestTimingMiddleware
+from observability.timing import TimedRoute
+from scheduler.jobs import SCHEDULER_POLL_SECONDS, build_scheduler
+from courses.catalog import CATALOG_POLL_SECONDS, catalog
+from courses.recommendations import RECOMMENDATION_REFRESH_SECONDS, index as recommendations
+from webhooks.worker import WEBHOOK_POLL_SECONDS, WebhookWorker
+import db
 
-app = FastAPI(title="L&D SaaS Backend", version="0.1.0")
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    format="%(asctime)s %(levelname)s [%(name)s] %(message)s",
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = []
+    if SCHEDULER_POLL_SECONDS > 0:
+        tasks.append(asyncio.create_task(build_scheduler().run_forever(SCHEDULER_POLL_SECONDS)))
+    if CATALOG_POLL_SECONDS > 0:
+        tasks.append(asyncio.create_task(catalog.run_forever(db.engine, CATALOG_POLL_SECONDS)))
+    if RECOMMENDATION_REFRESH_SECONDS > 0:
+        tasks.append(asyncio.create_task(recommendations.run_forever(db.engine, RECOMMENDATION_REFRESH_SECONDS)))
+    if WEBHOOK_POLL_SECONDS > 0:
+        worker = WebhookWorker(session_factory=lambda: Session(db.engine))
+        tasks.append(asyncio.create_task(worker.run_forever(WEBHOOK_POLL_SECONDS)))
+    yield
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    metrics.mark_process_dead()
+
+app = FastAPI(title="L&D SaaS Backend", version="0.1.0", lifespan=lifespan)
+app.router.route_class = TimedRoute
+
+# Replays stored responses for retried requests that carry an Idempotency-Key;
+# inside CORS so replays get CORS headers too. See idempotency/middleware.py
+app.add_middleware(IdempotencyMiddleware, store=IdempotencyStore(db.engine))
 
 # CORS
 origins = os.getenv("CORS_ORIGINS", "*").split(",")
@@ -20,22 +70,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "Idempotent-Replayed"],
 )
 
+# Per-request timing: Server-Timing header, JSON request log, admin profiling
+app.add_middleware(RequestTimingMiddleware)
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
-app.mount("/api/static", StaticFiles(directory="static"), name="static")
+app.include_router(health_router)
+
+# Avatars uploaded before media/ existed; their URLs live on in user_profiles.
+# Read from disk per request, never scanned into every worker's memory.
+legacy_uploads = StaticFiles(directory="static/uploads", check_dir=False)
+app.mount("/static/uploads", legacy_uploads, name="legacy_uploads")
+app.mount("/api/static/uploads", legacy_uploads, name="api_legacy_uploads")
+
+# Fingerprinted, precompressed and (for small files) memory-resident; see assets/static.py
+static_assets = AssetStore("static")
+app.mount("/static", StaticAssets(static_assets), name="static")
+app.mount("/api/static", StaticAssets(static_assets), name="api_static")
 
 @app.get("/courses", include_in_schema=False)
-def courses_page():
-    return FileResponse("static/courses.html")
+def courses_page(request: Request):
+    asset, _ = static_assets.lookup("courses.html")
+    return serve(asset, False, request.scope)
 
 # mount auth
+app.include_router(metrics.router)
 app.include_router(auth_router)
 app.include_router(users_router)
 app.include_router(courses_router)
 app.include_router(enrollments_router)
 app.include_router(profiles_router)
+app.include_router(media_router)
+app.include_router(dashboard_router)
+app.include_router(progress_router)
+app.include_router(analytics_router)
+app.include_router(exports_router)
+app.include_router(webhooks_router)
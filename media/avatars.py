@@ -0,0 +1,121 @@
+# app/media/avatars.py
+"""Avatar storage and thumbnailing.
+
+Originals are stored under their SHA-256, so re-uploading the same image
+costs a hash and a stat. Thumbnails are derived from the original's hash
+and size, so they are immutable too. They are rendered in a small thread
+pool after the upload request has returned; the caller's on_done hook
+(routers.profiles) then swaps them into the profile.
+"""
+import io
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from fastapi import HTTPException, status
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .storage import Storage
+from .upload import StagedFile
+
+logger = logging.getLogger(__name__)
+
+AVATAR_MAX_BYTES = int(os.getenv("AVATAR_MAX_BYTES", str(5 * 1024 * 1024)))
+AVATAR_MAX_PIXELS = int(os.getenv("AVATAR_MAX_PIXELS", str(40_000_000)))
+# Square bounding boxes; the largest one becomes profile_picture_url.
+AVATAR_THUMB_SIZES = tuple(int(s) for s in os.getenv("AVATAR_THUMB_SIZES", "64,256").split(","))
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", "2"))
+
+_FORMATS = {"JPEG": "jpg", "PNG": "png", "GIF": "gif", "WEBP": "webp"}
+
+_thumb_pool = ThreadPoolExecutor(max_workers=MEDIA_WORKERS, thread_name_prefix="thumbnail")
+
+
+def original_key(sha256: str, ext: str) -> str:
+    return f"avatars/{sha256[:2]}/{sha256}.{ext}"
+
+
+def thumb_key(sha256: str, size: int) -> str:
+    return f"avatars/{sha256[:2]}/{sha256}_{size}.webp"
+
+
+def store_original(storage: Storage, staged: StagedFile) -> str:
+    """Validate the staged upload as an image and store it; returns its key.
+
+    Only the header is parsed here (Image.open is lazy), which is enough to
+    reject non-images and decompression bombs before anything is kept.
+    """
+    try:
+        try:
+            with Image.open(staged.path) as im:
+                fmt, (width, height) = im.format, im.size
+        except (UnidentifiedImageError, OSError):
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Upload must be a JPEG, PNG, GIF or WebP image",
+            )
+        if fmt not in _FORMATS:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Upload must be a JPEG, PNG, GIF or WebP image",
+            )
+        if width * height > AVATAR_MAX_PIXELS:
+            raise HTTPException(
+                status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+                detail="Image dimensions too large",
+            )
+
+        key = original_key(staged.sha256, _FORMATS[fmt])
+        if not storage.exists(key):
+            storage.put_file(key, staged.path)
+        return key
+    finally:
+        if os.path.exists(staged.path):
+            os.unlink(staged.path)
+
+
+def avatar_url(storage: Storage, sha256: str, key: str) -> str:
+    """Largest thumbnail if it is already rendered, else the original."""
+    largest = thumb_key(sha256, max(AVATAR_THUMB_SIZES))
+    return storage.url(largest if storage.exists(largest) else key)
+
+
+def render_thumbnails(storage: Storage, sha256: str, key: str) -> list[str]:
+    missing = [size for size in AVATAR_THUMB_SIZES if not storage.exists(thumb_key(sha256, size))]
+    if not missing:
+        return []
+    path = storage.local_path(key)
+    if path is None:
+        raise RuntimeError(f"{type(storage).__name__} cannot read back {key}")
+    written = []
+    with Image.open(path) as im:
+        # For JPEG, draft() lets the decoder downscale by up to 8x while
+        # decoding, which is most of the cost for camera-sized photos.
+        im.draft("RGB", (max(missing), max(missing)))
+        im = ImageOps.exif_transpose(im)
+        im = im.convert("RGBA" if "A" in im.getbands() else "RGB")
+        for size in sorted(missing, reverse=True):
+            im.thumbnail((size, size), Image.Resampling.LANCZOS)
+            buf = io.BytesIO()
+            im.save(buf, "WEBP", quality=85, method=4)
+            storage.put_bytes(thumb_key(sha256, size), buf.getvalue())
+            written.append(thumb_key(sha256, size))
+    return written
+
+
+def _thumbnail_job(storage: Storage, sha256: str, key: str, on_done: Callable[[], None]) -> None:
+    try:
+        render_thumbnails(storage, sha256, key)
+        on_done()
+    except Exception:
+        logger.exception("thumbnailing %s failed", key)
+
+
+def schedule_thumbnails(
+    storage: Storage, sha256: str, key: str, on_done: Callable[[], None]
+) -> Optional[Future]:
+    """Render missing thumbnails in the pool, then call `on_done` there."""
+    if all(storage.exists(thumb_key(sha256, size)) for size in AVATAR_THUMB_SIZES):
+        return None
+    return _thumb_pool.submit(_thumbnail_job, storage, sha256, key, on_done)
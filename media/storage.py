@@ -0,0 +1,105 @@
+# app/media/storage.py
+"""Blob storage for user media.
+
+Keys are content-addressed (derived from the SHA-256 of the bytes), so a
+stored object never changes: writing an existing key is a no-op and every
+URL can be cached forever. Backends implement the small Storage interface;
+MEDIA_STORAGE picks one (only "local" ships here).
+"""
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional
+
+MEDIA_STORAGE = os.getenv("MEDIA_STORAGE", "local")
+MEDIA_ROOT = os.getenv("MEDIA_ROOT", "var/media")
+MEDIA_URL_PREFIX = os.getenv("MEDIA_URL_PREFIX", "/api/v1/media")
+
+
+class Storage(ABC):
+    @abstractmethod
+    def exists(self, key: str) -> bool: ...
+
+    @abstractmethod
+    def put_file(self, key: str, src: str) -> None:
+        """Move the local file `src` to `key`; `src` is consumed."""
+
+    @abstractmethod
+    def put_bytes(self, key: str, data: bytes) -> None: ...
+
+    @abstractmethod
+    def url(self, key: str) -> str: ...
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Filesystem path for backends served by this app, else None."""
+        return None
+
+    def staging_dir(self) -> Optional[str]:
+        """Where uploads are spooled before put_file (None: system tmp)."""
+        return None
+
+
+class LocalStorage(Storage):
+    def __init__(self, root: str = MEDIA_ROOT, url_prefix: str = MEDIA_URL_PREFIX):
+        self.root = Path(root)
+        self.url_prefix = url_prefix.rstrip("/")
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def put_file(self, key: str, src: str) -> None:
+        dest = self._path(key)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        # os.replace is atomic within a filesystem, so readers never see a
+        # half-written object; the copy fallback covers tmp on another mount.
+        try:
+            os.replace(src, dest)
+        except OSError:
+            tmp = self._tempfile(dest)
+            shutil.move(src, tmp)
+            os.replace(tmp, dest)
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        dest = self._path(key)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._tempfile(dest)
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, dest)
+
+    @staticmethod
+    def _tempfile(dest: Path) -> str:
+        fd, tmp = tempfile.mkstemp(dir=dest.parent, suffix=".part")
+        os.close(fd)
+        return tmp
+
+    def url(self, key: str) -> str:
+        return f"{self.url_prefix}/{key}"
+
+    def local_path(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        return str(path) if path.is_file() else None
+
+    def staging_dir(self) -> Optional[str]:
+        # Same filesystem as the objects, so put_file is a rename.
+        staging = self.root / ".staging"
+        staging.mkdir(parents=True, exist_ok=True)
+        return str(staging)
+
+
+_backends = {"local": LocalStorage}
+_storage: Optional[Storage] = None
+
+
+def get_storage() -> Storage:
+    global _storage
+    if _storage is None:
+        if MEDIA_STORAGE not in _backends:
+            raise RuntimeError(f"Unknown MEDIA_STORAGE {MEDIA_STORAGE!r}")
+        _storage = _backends[MEDIA_STORAGE]()
+    return _storage
@@ -0,0 +1,146 @@
+# app/media/upload.py
+"""Stream a request body to disk with a size cap, hashing as it goes.
+
+FastAPI's UploadFile parameters spool the whole multipart body before the
+endpoint runs, so a size check there comes too late. receive_file() reads
+request.stream() itself: the body is hashed and written chunk by chunk and
+the request is cut off as soon as it passes `max_bytes`.
+"""
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+# Allowance for multipart boundaries and part headers around the file.
+_MULTIPART_OVERHEAD = 16 * 1024
+
+
+@dataclass
+class StagedFile:
+    path: str
+    sha256: str
+    size: int
+
+
+class _Sink:
+    def __init__(self, max_bytes: int, staging_dir: Optional[str]):
+        self.max_bytes = max_bytes
+        self.hash = hashlib.sha256()
+        self.size = 0
+        fd, self.path = tempfile.mkstemp(dir=staging_dir, suffix=".upload")
+        self.file = os.fdopen(fd, "wb")
+
+    def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise HTTPException(
+                status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+                detail=f"File exceeds {self.max_bytes} bytes",
+            )
+        self.hash.update(data)
+        self.file.write(data)
+
+    def write_all(self, chunks: list[bytes]) -> None:
+        for data in chunks:
+            self.write(data)
+
+    def discard(self) -> None:
+        self.file.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class _FilePart:
+    """Feeds the bytes of one named multipart field into a buffer."""
+
+    def __init__(self, field: str):
+        self.field = field.encode()
+        self.pending: list[bytes] = []
+        self.found = False
+        self._in_field = False
+        self._header_field = b""
+        self._header_value = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._part_begin,
+            "on_header_field": lambda data, start, end: self._add("_header_field", data[start:end]),
+            "on_header_value": lambda data, start, end: self._add("_header_value", data[start:end]),
+            "on_header_end": self._header_end,
+            "on_part_data": self._part_data,
+        }
+
+    def _add(self, attr: str, chunk: bytes) -> None:
+        setattr(self, attr, getattr(self, attr) + chunk)
+
+    def _part_begin(self) -> None:
+        self._in_field = False
+
+    def _header_end(self) -> None:
+        if self._header_field.lower() == b"content-disposition":
+            _, options = parse_options_header(self._header_value)
+            if options.get(b"name") == self.field and not self.found:
+                self._in_field = self.found = True
+        self._header_field = self._header_value = b""
+
+    def _part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_field:
+            self.pending.append(data[start:end])
+
+
+async def receive_file(
+    request: Request,
+    max_bytes: int,
+    field: str = "file",
+    staging_dir: Optional[str] = None,
+) -> StagedFile:
+    """Accept either multipart/form-data (file in `field`) or a raw body."""
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes + _MULTIPART_OVERHEAD:
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"File exceeds {max_bytes} bytes",
+        )
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    part = parser = None
+    if content_type == b"multipart/form-data":
+        if b"boundary" not in params:
+            raise HTTPException(status_code=400, detail="Missing multipart boundary")
+        part = _FilePart(field)
+        parser = MultipartParser(params[b"boundary"], part.callbacks())
+
+    sink = _Sink(max_bytes, staging_dir)
+    try:
+        async for chunk in request.stream():
+            if parser is None:
+                pending = [chunk] if chunk else []
+            else:
+                parser.write(chunk)
+                pending, part.pending = part.pending, []
+            if pending:
+                await run_in_threadpool(sink.write_all, pending)
+        if parser is not None:
+            parser.finalize()
+            if not part.found:
+                raise HTTPException(status_code=400, detail=f"Missing file field '{field}'")
+        await run_in_threadpool(sink.file.close)
+    except MultipartParseError:
+        sink.discard()
+        raise HTTPException(status_code=400, detail="Malformed multipart body")
+    except BaseException:
+        sink.discard()
+        raise
+
+    if sink.size == 0:
+        sink.discard()
+        raise HTTPException(status_code=400, detail="Empty upload")
+    return StagedFile(path=sink.path, sha256=sink.hash.hexdigest(), size=sink.size)
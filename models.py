@@ -1,10 +1,11 @@
 # app/models.py
 from __future__ import annotations
 
+import uuid
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 from sqlmodel import SQLModel, Field
-from sqlalchemy import Column, text
+from sqlalchemy import Column, Index, LargeBinary, text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.dialects.postgresql import ENUM as PGEnum
 
@@ -80,6 +81,8 @@ class City(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     country_id: int = Field(foreign_key="countries.id")
     name: str
+    # GeoNames population; ranks autocomplete results (users/cities.py)
+    population: int = Field(default=0, sa_column_kwargs={"server_default": text("0")})
     created_at: datetime = Field(sa_column_kwargs={"server_default": text("now()")})
 
 
@@ -112,6 +115,20 @@ class UserProfile(SQLModel, table=True):
     updated_at: datetime = Field(
         sa_column_kwargs={"server_default": text("now()"), "onupdate": text("now()")}
     )
+    # Bumped on every write; served as the profile's ETag (users/profiles.py)
+    version: int = Field(default=1, sa_column_kwargs={"server_default": text("1")})
+
+
+class ProfileChange(SQLModel, table=True):
+    """Changed-fields audit log for user_profiles: {field: {old, new}}."""
+    __tablename__ = "profile_changes"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="users.id")
+    changed_by: Optional[int] = Field(default=None, foreign_key="users.id")
+    changed_at: datetime = Field(sa_column_kwargs={"server_default": text("now()")})
+    version: int
+    changes: dict = Field(sa_column=Column(JSONB, nullable=False))
 
 
 class UserPersonalEmail(SQLModel, table=True):
@@ -200,6 +217,14 @@ class Course(SQLModel, table=True):
         sa_column_kwargs={"server_default": text("now()"), "onupdate": text("now()")}
     )
 
+class CourseCatalogVersion(SQLModel, table=True):
+    """Single row bumped (and NOTIFYed on 'course_catalog') by a statement
+    trigger on every write to courses; see courses/catalog.py."""
+    __tablename__ = "course_catalog_version"
+
+    id: int = Field(default=1, primary_key=True)
+    version: int = Field(default=0, sa_column_kwargs={"server_default": text("0")})
+
 class EmployeeManager(SQLModel, table=True):
     __tablename__ = "employee_managers"
 
@@ -209,6 +234,10 @@ class EmployeeManager(SQLModel, table=True):
 
 class CourseEnrollment(SQLModel, table=True):
     __tablename__ = "course_enrollments"
+    __table_args__ = (
+        # Enrollment writes rely on it for ON CONFLICT (migrations/sql/0009).
+        Index("course_enrollments_employee_course_key", "employee_id", "course_id", unique=True),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     employee_id: int = Field(foreign_key="users.id")
@@ -218,6 +247,153 @@ class CourseEnrollment(SQLModel, table=True):
     approved_at: Optional[datetime] = None
     approved_by: Optional[int] = Field(default=None, foreign_key="users.id")
     deadline: Optional[datetime] = None
+    # Stamped by the scheduler (scheduler/jobs.py)
+    overdue_at: Optional[datetime] = None
+    reminder_sent_at: Optional[datetime] = None
+    # Folded from learning_events (courses/progress.py)
+    progress_percent: int = Field(default=0, sa_column_kwargs={"server_default": text("0")})
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    last_activity_at: Optional[datetime] = None
+    rejected_at: Optional[datetime] = None
+    # Maintained by a trigger on every UPDATE; the analytics rollup job
+    # (analytics/rollups.py) re-reads rows changed since its window start.
+    updated_at: Optional[datetime] = Field(default=None, sa_column_kwargs={"server_default": text("now()")})
+
+class EnrollmentDailyStat(SQLModel, table=True):
+    """Enrollment events per UTC day, course and team (the employee's
+    manager; 0 when none). Rebuilt by analytics/rollups.py."""
+    __tablename__ = "enrollment_daily_stats"
+
+    day: date = Field(primary_key=True)
+    course_id: int = Field(primary_key=True)
+    manager_id: int = Field(primary_key=True)
+    requested: int = 0
+    approved: int = 0
+    assigned: int = 0
+    rejected: int = 0
+    completed: int = 0
+    overdue: int = 0
+    approval_seconds: float = 0.0   # sum over `approved`, for mean latency
+
+class LearningEvent(SQLModel, table=True):
+    """Inbound learning statements, appended by POST /api/v1/progress/events and
+    consumed (deleted) in batches by the fold_learning_events job."""
+    __tablename__ = "learning_events"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int
+    course_id: int
+    verb: str                           # started | progressed | completed
+    progress: Optional[float] = None    # 0-100
+    occurred_at: datetime
+    received_at: datetime = Field(sa_column_kwargs={"server_default": text("now()")})
+
+class AuthSession(SQLModel, table=True):
+    """One issued refresh token. Rotation links tokens into a family; reusing a
+    rotated token revokes the whole family."""
+    __tablename__ = "auth_sessions"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    jti: uuid.UUID
+    family_id: uuid.UUID
+    user_id: int = Field(foreign_key="users.id")
+    issued_at: datetime = Field(sa_column_kwargs={"server_default": text("now()")})
+    expires_at: datetime
+    rotated_at: Optional[datetime] = None
+    revoked_at: Optional[datetime] = None
+
+class IdempotencyKey(SQLModel, table=True):
+    """A client's Idempotency-Key and the response it produced (idempotency/).
+    status_code is NULL while the first request is still running."""
+    __tablename__ = "idempotency_keys"
+
+    user_id: int = Field(primary_key=True, foreign_key="users.id")
+    key: str = Field(primary_key=True, max_length=255)
+    fingerprint: bytes = Field(sa_column=Column(LargeBinary, nullable=False))  # sha256 of the request
+    status_code: Optional[int] = None
+    headers: Optional[list] = Field(default=None, sa_column=Column(JSONB))
+    body: Optional[bytes] = Field(default=None, sa_column=Column(LargeBinary))
+    created_at: datetime = Field(sa_column_kwargs={"server_default": text("now()")})
+    expires_at: datetime
+
+class RateLimitBucket(SQLModel, table=True):
+    __tablename__ = "rate_limit_buckets"
+
+    key: str = Field(primary_key=True)
+    tokens: float
+    allowed: bool = Field(default=True)
+    updated_at: datetime = Field(sa_column_kwargs={"server_default": text("now()")})
+
+class UserBulkJob(SQLModel, table=True):
+    """A bulk deactivate/delete request, worked through by the
+    process_user_jobs scheduler job (users/deletion.py). `position` counts
+    the entries of user_ids already finished, so a restart resumes there."""
+    __tablename__ = "user_bulk_jobs"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    action: str                         # deactivate | delete
+    user_ids: List[int] = Field(sa_column=Column(JSONB, nullable=False))
+    position: int = 0
+    done: int = 0
+    skipped: int = 0                    # already gone, or protected (last admin)
+    status: str = "queued"              # queued | running | done | failed
+    error: Optional[str] = None
+    created_by: Optional[int] = None
+    created_at: datetime = Field(sa_column_kwargs={"server_default": text("now()")})
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class DataExport(SQLModel, table=True):
+    """A personal-data export (zip) of one or more users, built off the
+    request thread by the process_data_exports job (users/export.py)."""
+    __tablename__ = "data_exports"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_ids: List[int] = Field(sa_column=Column(JSONB, nullable=False))
+    status: str = "queued"              # queued | running | done | failed | expired
+    position: int = 0                   # users written so far
+    file_name: str                      # under EXPORT_ROOT; never derived from input
+    size_bytes: Optional[int] = None
+    error: Optional[str] = None
+    created_by: Optional[int] = None
+    created_at: datetime = Field(sa_column_kwargs={"server_default": text("now()")})
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+
+class WebhookEndpoint(SQLModel, table=True):
+    """A receiver subscribed to enrollment events (webhooks/)."""
+    __tablename__ = "webhook_endpoints"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    url: str
+    secret: str                         # HMAC key; shown once, on creation
+    event_types: List[str] = Field(sa_column=Column(JSONB, nullable=False))
+    is_active: bool = True
+    max_concurrency: int = 4            # requests in flight to this endpoint
+    batch_size: int = 1                 # > 1: receiver accepts {"events": [...]}
+    # Circuit breaker, shared by every worker.
+    consecutive_failures: int = 0
+    circuit_open_until: Optional[datetime] = None
+    created_by: Optional[int] = None
+    created_at: datetime = Field(sa_column_kwargs={"server_default": text("now()")})
+
+class WebhookDelivery(SQLModel, table=True):
+    """One event for one endpoint; the outbox the webhook worker drains."""
+    __tablename__ = "webhook_deliveries"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    endpoint_id: int = Field(foreign_key="webhook_endpoints.id")
+    event_id: str
+    event_type: str
+    payload: dict = Field(sa_column=Column(JSONB, nullable=False))
+    status: str = "pending"             # pending | delivered | failed
+    attempts: int = 0
+    next_attempt_at: datetime = Field(sa_column_kwargs={"server_default": text("now()")})
+    last_status_code: Optional[int] = None
+    last_error: Optional[str] = None
+    created_at: datetime = Field(sa_column_kwargs={"server_default": text("now()")})
+    delivered_at: Optional[datetime] = None
 
 class Notification(SQLModel, table=True):
     __tablename__ = "notifications"
@@ -230,3 +406,9 @@ class Notification(SQLModel, table=True):
     is_read: bool = Field(default=False)
     created_at: datetime = Field(sa_column_kwargs={"server_default": text("now()")})
     meta: Optional[dict] = Field(default=None, sa_column=Column("metadata", JSONB))
+    # Unique per (user_id, type) when set; see notifications/service.py.
+    dedupe_key: Optional[str] = None
+    # Digests: events folded into this row, and when its window closes.
+    event_count: int = Field(default=1, sa_column_kwargs={"server_default": text("1")})
+    window_ends_at: Optional[datetime] = None
+    emailed_at: Optional[datetime] = None
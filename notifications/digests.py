@@ -0,0 +1,70 @@
+# app/notifications/digests.py
+"""Digest emails for coalesced notifications.
+
+With NOTIFY_DIGEST_EMAILS on, the send_notification_digests job mails
+each recipient one email listing their digests whose window has closed
+and which are still unread (reading one in the app makes its email moot).
+Rows are claimed by stamping emailed_at in the same transaction that
+selects them, so a digest is mailed at most once even if the job overlaps
+itself; read digests are stamped without mail.
+"""
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from mailer import build_digest_email, send_email
+from models import Notification, User
+from observability.metrics import DIGEST_EMAILS_SENT
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_DIGEST_EMAILS = os.getenv("NOTIFY_DIGEST_EMAILS", "false").lower() in ("1", "true", "yes")
+DIGEST_EMAIL_BATCH = int(os.getenv("DIGEST_EMAIL_BATCH", "1000"))
+
+
+def _closed_batch(now: datetime):
+    return (
+        select(Notification.id)
+        .where(Notification.emailed_at.is_(None), Notification.window_ends_at <= now)
+        .order_by(Notification.id)
+        .limit(DIGEST_EMAIL_BATCH)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+
+
+def send_notification_digests(session: Session, now: datetime, last_run: Optional[datetime] = None) -> int:
+    if not NOTIFY_DIGEST_EMAILS:
+        return 0
+    sent = 0
+    while True:
+        claimed = session.execute(
+            update(Notification)
+            .where(Notification.id.in_(_closed_batch(now)))
+            .values(emailed_at=now)
+            .returning(Notification.user_id, Notification.title, Notification.body, Notification.is_read)
+        ).all()
+        session.commit()
+        per_user: dict[int, list[tuple[str, str]]] = defaultdict(list)
+        for row in claimed:
+            if not row.is_read:
+                per_user[row.user_id].append((row.title, row.body))
+        if per_user:
+            recipients = session.exec(
+                select(User.id, User.email, User.name).where(User.id.in_(per_user), User.is_active == True)  # noqa: E712
+            ).all()
+            for user_id, email, name in recipients:
+                try:
+                    send_email(build_digest_email(email, name, per_user[user_id]))
+                except Exception:
+                    logger.exception("digest email to user %s failed", user_id)
+                    continue
+                DIGEST_EMAILS_SENT.inc()
+                sent += 1
+        if len(claimed) < DIGEST_EMAIL_BATCH:
+            return sent
@@ -0,0 +1,142 @@
+# app/notifications/service.py
+"""Writing notifications: deduplicated, and coalesced into digests.
+
+Every notification carries a dedupe_key, unique per (user_id, type) via
+the partial index from migration 0018, so a retried request or a re-run
+job inserts nothing instead of a second row (ON CONFLICT DO NOTHING), and
+"is there already one for this enrollment" is an index probe rather than
+a scan of the metadata JSONB.
+
+Types listed in NOTIFY_DIGEST_TYPES are coalesced instead: all events for
+one recipient in the same NOTIFY_DIGEST_WINDOW_SECONDS bucket land on one
+row keyed "digest:<bucket start>". The first event inserts it; later ones
+bump event_count, retitle it, mark it unread again and append their
+metadata to meta["items"] (kept to NOTIFY_DIGEST_MAX_ITEMS), all in the
+same upsert. A manager with 200 reports sees one row per window, not 200.
+The row's key is the window, so the event's own dedupe_key is collected in
+meta["dedupe_keys"] (every event, not capped) and the DO UPDATE skips an
+event already listed there: a retried request is a "duplicate" instead of
+being counted twice.
+Closed windows can be mailed as one digest email per recipient
+(notifications/digests.py).
+
+notify() runs in the caller's transaction; call observe() after commit.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import case, func, literal
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlmodel import Session
+
+from models import Notification
+from observability.metrics import NOTIFICATIONS_COALESCED, NOTIFICATIONS_CREATED
+
+NOTIFY_DIGEST_TYPES = {
+    t.strip() for t in os.getenv("NOTIFY_DIGEST_TYPES", "enrollment_requested").split(",") if t.strip()
+}
+NOTIFY_DIGEST_WINDOW_SECONDS = int(os.getenv("NOTIFY_DIGEST_WINDOW_SECONDS", "3600"))
+NOTIFY_DIGEST_MAX_ITEMS = int(os.getenv("NOTIFY_DIGEST_MAX_ITEMS", "50"))
+
+# Title of a digest holding n > 1 events; %s is n (Postgres format()).
+DIGEST_TITLES = {
+    "enrollment_requested": "%s new enrollment requests",
+}
+
+DEDUPE_INDEX = ["user_id", "type", "dedupe_key"]
+DEDUPE_WHERE = Notification.dedupe_key.is_not(None)
+
+
+def enrollment_key(enrollment_id: int) -> str:
+    return f"enrollment:{enrollment_id}"
+
+
+def digest_window(now: datetime, window: int = NOTIFY_DIGEST_WINDOW_SECONDS) -> tuple[datetime, datetime]:
+    """[start, end) of the window bucket `now` falls in, aligned to the epoch."""
+    epoch = int(now.timestamp())
+    start = datetime.fromtimestamp(epoch - epoch % window, tz=timezone.utc)
+    return start, start + timedelta(seconds=window)
+
+
+def _digest_upsert(
+    user_id: int, type: str, title: str, body: str, meta: dict, dedupe_key: Optional[str], now: datetime
+):
+    start, end = digest_window(now)
+    keys = [dedupe_key] if dedupe_key is not None else []
+    stmt = insert(Notification).values(
+        user_id=user_id,
+        type=type,
+        title=title,
+        body=body,
+        meta={**meta, "items": [meta], "dedupe_keys": keys},
+        dedupe_key=f"digest:{start:%Y%m%dT%H%M%SZ}",
+        event_count=1,
+        window_ends_at=end,
+    )
+    new = stmt.excluded
+    items = Notification.meta["items"].op("||")(new.metadata["items"])
+    seen = func.coalesce(Notification.meta["dedupe_keys"], literal([], JSONB))
+    return stmt.on_conflict_do_update(
+        index_elements=DEDUPE_INDEX,
+        index_where=DEDUPE_WHERE,
+        where=~seen.contains(keys) if keys else None,
+        set_={
+            "event_count": Notification.event_count + 1,
+            "title": func.format(DIGEST_TITLES.get(type, "%s new notifications"), Notification.event_count + 1),
+            "body": new.body,
+            "is_read": False,
+            # Top-level keys follow the latest event; items keeps the first N.
+            "metadata": new.metadata.op("||")(
+                func.jsonb_build_object(
+                    literal("items"),
+                    case(
+                        (Notification.event_count < NOTIFY_DIGEST_MAX_ITEMS, items),
+                        else_=Notification.meta["items"],
+                    ),
+                    literal("dedupe_keys"),
+                    seen.op("||")(new.metadata["dedupe_keys"]),
+                ).cast(JSONB)
+            ),
+        },
+    ).returning(Notification.event_count)
+
+
+def notify(
+    session: Session,
+    user_id: int,
+    type: str,
+    title: str,
+    body: str,
+    meta: Optional[dict] = None,
+    dedupe_key: Optional[str] = None,
+    now: Optional[datetime] = None,
+) -> str:
+    """Add a notification (not committed).
+
+    Returns "created", "merged" (folded into this window's digest) or
+    "duplicate" (a row, or this window's digest, already has the dedupe_key).
+    """
+    meta = meta or {}
+    if type in NOTIFY_DIGEST_TYPES:
+        count = session.execute(
+            _digest_upsert(user_id, type, title, body, meta, dedupe_key, now or datetime.now(timezone.utc))
+        ).scalar()
+        if count is None:
+            return "duplicate"
+        return "created" if count == 1 else "merged"
+    stmt = (
+        insert(Notification)
+        .values(user_id=user_id, type=type, title=title, body=body, meta=meta, dedupe_key=dedupe_key)
+        .on_conflict_do_nothing(index_elements=DEDUPE_INDEX, index_where=DEDUPE_WHERE)
+        .returning(Notification.id)
+    )
+    return "created" if session.execute(stmt).first() else "duplicate"
+
+
+def observe(type: str, outcome: str, n: int = 1) -> None:
+    """Count notify() outcomes once the caller's transaction committed."""
+    if outcome == "created":
+        NOTIFICATIONS_CREATED.labels(type=type).inc(n)
+    else:
+        NOTIFICATIONS_COALESCED.labels(type=type, outcome=outcome).inc(n)
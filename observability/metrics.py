@@ -0,0 +1,202 @@
+# app/observability/metrics.py
+"""Prometheus metrics.
+
+Works in a single process out of the box. With several uvicorn workers set
+PROMETHEUS_MULTIPROC_DIR to an empty, writable directory: each worker then
+writes its samples to mmap'd files (no cross-process locking on the hot path)
+and /metrics aggregates them at scrape time.
+"""
+import os
+
+from fastapi import APIRouter, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template, method and status.",
+    ["route", "method", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests currently being handled.",
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Configured size of the SQLAlchemy connection pool.",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Open DBAPI connections held by the pool.",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the pool.",
+    multiprocess_mode="livesum",
+)
+
+BCRYPT_QUEUE_DEPTH = Gauge(
+    "bcrypt_queue_depth",
+    "bcrypt jobs waiting for a free executor thread.",
+    multiprocess_mode="livesum",
+)
+
+INVITES_SENT = Counter("invites_sent_total", "Invitations issued.")
+ENROLLMENT_EVENTS = Counter(
+    "enrollment_events_total",
+    "Enrollment workflow transitions.",
+    ["event"],
+)
+NOTIFICATIONS_CREATED = Counter(
+    "notifications_created_total",
+    "Notifications written, by type.",
+    ["type"],
+)
+NOTIFICATIONS_COALESCED = Counter(
+    "notifications_coalesced_total",
+    "Notification events that did not add a row: merged into a digest, or duplicates.",
+    ["type", "outcome"],
+)
+DIGEST_EMAILS_SENT = Counter("digest_emails_sent_total", "Notification digest emails sent.")
+EMAIL_SEND_FAILURES = Counter("email_send_failures_total", "Emails that failed to send.")
+RATE_LIMITED = Counter(
+    "rate_limited_total",
+    "Requests rejected by the rate limiter.",
+    ["route", "scope"],
+)
+
+JOB_RUNS = Counter(
+    "scheduled_job_runs_total",
+    "Scheduled job executions, by outcome.",
+    ["job", "outcome"],
+)
+JOB_DURATION = Histogram(
+    "scheduled_job_duration_seconds",
+    "Wall time of one scheduled job run.",
+    ["job"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0),
+)
+JOB_ROWS = Counter(
+    "scheduled_job_rows_total",
+    "Rows touched by scheduled jobs.",
+    ["job"],
+)
+JOB_LAST_SUCCESS = Gauge(
+    "scheduled_job_last_success_timestamp_seconds",
+    "Unix time of the last successful run of each job.",
+    ["job"],
+    multiprocess_mode="max",
+)
+
+CATALOG_REBUILDS = Counter(
+    "catalog_snapshot_rebuilds_total",
+    "Course catalog snapshots built, by trigger (poll/notify or an inline read).",
+    ["reason"],
+)
+CATALOG_CHECKED = Gauge(
+    "catalog_snapshot_checked_timestamp_seconds",
+    "Unix time the catalog version was last confirmed current; staleness is now minus this.",
+    multiprocess_mode="livemin",
+)
+CATALOG_SNAPSHOT_COURSES = Gauge(
+    "catalog_snapshot_courses",
+    "Courses held in the in-process catalog snapshot.",
+    multiprocess_mode="livemax",
+)
+CATALOG_SNAPSHOT_BYTES = Gauge(
+    "catalog_snapshot_bytes",
+    "Approximate memory held by the catalog snapshot (summed over workers).",
+    multiprocess_mode="livesum",
+)
+
+IDEMPOTENCY_REQUESTS = Counter(
+    "idempotency_requests_total",
+    "Requests carrying an Idempotency-Key, by outcome (new/replay/mismatch/in_flight).",
+    ["outcome"],
+)
+
+LEARNING_EVENTS = Counter(
+    "learning_events_total",
+    "Learning events received by the ingestion endpoint and folded into enrollments.",
+    ["stage"],
+)
+
+USER_JOB_USERS = Counter(
+    "user_bulk_job_users_total",
+    "Users handled by bulk deactivate/delete jobs, by action and outcome (done/skipped).",
+    ["action", "outcome"],
+)
+
+WEBHOOK_DELIVERIES = Counter(
+    "webhook_deliveries_total",
+    "Webhook events by outcome (delivered/retry/failed).",
+    ["outcome"],
+)
+WEBHOOK_REQUEST_SECONDS = Histogram(
+    "webhook_request_duration_seconds",
+    "Time for a webhook receiver to answer one request (single event or batch).",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+WEBHOOK_CIRCUIT_OPENED = Counter(
+    "webhook_circuit_opened_total",
+    "Times an endpoint's circuit breaker opened after repeated failures.",
+)
+
+
+def instrument_pool(engine: Engine) -> None:
+    pool = engine.pool
+    size = getattr(pool, "size", None)
+    if callable(size):
+        DB_POOL_SIZE.set(size())
+
+    @event.listens_for(pool, "connect")
+    def _connect(dbapi_connection, connection_record):
+        DB_POOL_CONNECTIONS.inc()
+
+    @event.listens_for(pool, "close")
+    def _close(dbapi_connection, connection_record):
+        DB_POOL_CONNECTIONS.dec()
+
+    @event.listens_for(pool, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(pool, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.dec()
+
+
+def mark_process_dead() -> None:
+    """Drop this worker's live gauges; call on shutdown in multiprocess mode."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
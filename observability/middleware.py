@@ -0,0 +1,147 @@
+# app/observability/middleware.py
+import json
+import logging
+import os
+import time
+from urllib.parse import parse_qs
+
+from jose import jwt, JWTError
+
+from security import JWT_SECRET, JWT_ISSUER
+from . import metrics
+from .profiler import SamplingProfiler
+from .timing import begin_request, end_request
+
+logger = logging.getLogger("ldsaas.request")
+
+QUERY_WARN_THRESHOLD = int(os.getenv("QUERY_WARN_THRESHOLD", "20"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or scope.get("path", "")
+
+
+def _is_admin(scope) -> bool:
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                return False
+            try:
+                payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"], audience="access", issuer=JWT_ISSUER)
+            except JWTError:
+                return False
+            return payload.get("role") == "admin"
+    return False
+
+
+def _wants_profile(scope) -> bool:
+    requested = any(name == b"x-profile" and value == b"1" for name, value in scope.get("headers", []))
+    if not requested and scope.get("query_string"):
+        requested = parse_qs(scope["query_string"].decode("latin-1")).get("profile") == ["1"]
+    return requested and _is_admin(scope)
+
+
+class RequestTimingMiddleware:
+    """Per-request wall/SQL/bcrypt/serialization timing.
+
+    Adds a `Server-Timing` header, logs one JSON line per request and warns
+    when a request runs more than QUERY_WARN_THRESHOLD statements. Admins can
+    send `X-Profile: 1` (or `?profile=1`) to get a sampling profile of the
+    request back instead of the normal response body.
+    """
+
+    def __init__(self, app, query_threshold: int = QUERY_WARN_THRESHOLD):
+        self.app = app
+        self.query_threshold = query_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats, token = begin_request()
+        metrics.REQUESTS_IN_FLIGHT.inc()
+        profiler = None
+        if _wants_profile(scope):
+            profiler = SamplingProfiler(interval=PROFILE_INTERVAL_MS / 1000)
+            profiler.start()
+        status_code = 500
+        response_started = None
+
+        async def send_with_timing(message):
+            nonlocal status_code, response_started
+            if message["type"] == "http.response.start":
+                response_started = time.perf_counter()
+                status_code = message["status"]
+                if profiler is not None:
+                    return
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", self._server_timing(stats, response_started).encode()))
+                message = {**message, "headers": headers}
+            elif profiler is not None:
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            end_request(token)
+            metrics.REQUESTS_IN_FLIGHT.dec()
+            if profiler is not None:
+                profiler.stop()
+            route = scope.get("route")
+            metrics.REQUEST_LATENCY.labels(
+                route=getattr(route, "path", None) or "unmatched",
+                method=scope["method"],
+                status=str(status_code),
+            ).observe(time.perf_counter() - stats.started)
+            self._log(scope, stats, status_code, response_started)
+
+        if profiler is not None:
+            body = profiler.report(stats.threads).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"text/plain; charset=utf-8"),
+                            (b"content-length", str(len(body)).encode())],
+            })
+            await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    def _serialize_time(stats, response_started) -> float:
+        if stats.endpoint_done is None or response_started is None:
+            return 0.0
+        return max(response_started - stats.endpoint_done, 0.0)
+
+    def _server_timing(self, stats, response_started: float) -> str:
+        total = response_started - stats.started
+        bcrypt_time = stats.timers.get("bcrypt", 0.0)
+        parts = [
+            f"total;dur={total * 1000:.2f}",
+            f'db;dur={stats.sql_time * 1000:.2f};desc="queries={stats.queries} rows={stats.rows}"',
+            f"ser;dur={self._serialize_time(stats, response_started) * 1000:.2f}",
+        ]
+        if bcrypt_time:
+            parts.append(f"bcrypt;dur={bcrypt_time * 1000:.2f}")
+        return ", ".join(parts)
+
+    def _log(self, scope, stats, status_code: int, response_started) -> None:
+        record = {
+            "method": scope["method"],
+            "route": route_template(scope),
+            "status": status_code,
+            "wall_ms": round((time.perf_counter() - stats.started) * 1000, 2),
+            "sql_ms": round(stats.sql_time * 1000, 2),
+            "queries": stats.queries,
+            "rows": stats.rows,
+            "bcrypt_ms": round(stats.timers.get("bcrypt", 0.0) * 1000, 2),
+            "serialize_ms": round(self._serialize_time(stats, response_started) * 1000, 2),
+        }
+        if stats.queries > self.query_threshold:
+            record["query_threshold_exceeded"] = True
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
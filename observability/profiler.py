@@ -0,0 +1,60 @@
+# app/observability/profiler.py
+"""Tiny stdlib sampling profiler for one request.
+
+Sync endpoints run in the threadpool, so a per-thread profiler started in
+the middleware (cProfile, pyinstrument) never sees them. Instead a background
+thread samples `sys._current_frames()` and keeps only the threads the request
+was seen running on (see RequestStats.threads).
+"""
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.samples: dict[int, Counter] = {}
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._started = 0.0
+        self._elapsed = 0.0
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._elapsed = time.perf_counter() - self._started
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.samples.setdefault(ident, Counter())[";".join(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def report(self, threads: set[int], top: int = 40) -> str:
+        """Collapsed stacks (flamegraph.pl format) for `threads`, hottest first."""
+        merged: Counter = Counter()
+        for ident in threads:
+            merged.update(self.samples.get(ident, {}))
+        lines = [
+            f"# {self.sample_count} samples over {self._elapsed * 1000:.1f} ms "
+            f"at {self.interval * 1000:.1f} ms, {len(threads)} thread(s)",
+        ]
+        lines += [f"{stack} {count}" for stack, count in merged.most_common(top)]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,112 @@
+# app/observability/timing.py
+"""Per-request counters filled in by SQL events, bcrypt calls and route handlers."""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+from typing import Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class RequestStats:
+    __slots__ = ("started", "endpoint_done", "sql_time", "queries", "rows", "timers", "threads")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.endpoint_done: Optional[float] = None
+        self.sql_time = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.timers: dict[str, float] = {}
+        self.threads: set[int] = {threading.get_ident()}
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+def begin_request() -> tuple[RequestStats, object]:
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def end_request(token) -> None:
+    _current.reset(token)
+
+
+@contextmanager
+def track(name: str):
+    """Add the time spent in the block to the current request's `name` timer."""
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.timers[name] = stats.timers.get(name, 0.0) + time.perf_counter() - started
+        stats.threads.add(threading.get_ident())
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    stats = _current.get()
+    if stats is None:
+        return
+    stats.sql_time += time.perf_counter() - started
+    stats.queries += 1
+    if cursor.rowcount and cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+    stats.threads.add(threading.get_ident())
+
+
+def instrument_engine(engine: Engine) -> None:
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _mark_endpoint_done(endpoint):
+    # Everything between the endpoint returning and the response starting is
+    # response-model validation + JSON encoding, i.e. serialization time.
+    if iscoroutinefunction(endpoint):
+        @wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                stats = _current.get()
+                if stats is not None:
+                    stats.endpoint_done = time.perf_counter()
+        return async_wrapper
+
+    @wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            stats = _current.get()
+            if stats is not None:
+                stats.endpoint_done = time.perf_counter()
+                stats.threads.add(threading.get_ident())
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that records when the endpoint body finished (see RequestTimingMiddleware)."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _mark_endpoint_done(endpoint), **kwargs)
@@ -0,0 +1,129 @@
+# app/ratelimit/backends.py
+"""Token-bucket storage.
+
+A bucket holds up to `capacity` tokens and refills at `rate` tokens/second;
+each hit takes one token. `hit()` returns (allowed, retry_after_seconds).
+"""
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+
+@dataclass(frozen=True)
+class Limit:
+    capacity: int
+    period: float  # seconds to refill from empty to full
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period
+
+    @classmethod
+    def parse(cls, spec: str) -> "Limit":
+        """'10/60' -> 10 requests per 60 seconds."""
+        capacity, _, period = spec.partition("/")
+        return cls(capacity=int(capacity), period=float(period or 60))
+
+
+def _retry_after(tokens: float, limit: Limit) -> int:
+    return max(1, math.ceil((1 - tokens) / limit.rate))
+
+
+class MemoryBackend:
+    """Per-process buckets; fine for a single worker or tests.
+
+    Past `max_keys` buckets, idle ones are dropped at most every
+    `prune_interval` seconds, each against its own limit's period.
+    """
+
+    blocking = False
+
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.monotonic,
+        max_keys: int = 100_000,
+        prune_interval: float = 10.0,
+    ):
+        self.clock = clock
+        self.max_keys = max_keys
+        self.prune_interval = prune_interval
+        # key -> (tokens, updated, period)
+        self._buckets: dict[str, tuple[float, float, float]] = {}
+        self._next_prune = 0.0
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: Limit) -> tuple[bool, int]:
+        now = self.clock()
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (float(limit.capacity), now, limit.period))
+            tokens = min(limit.capacity, tokens + (now - updated) * limit.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now, limit.period)
+            if len(self._buckets) > self.max_keys and now >= self._next_prune:
+                self._next_prune = now + self.prune_interval
+                self._prune_locked(now)
+        return allowed, 0 if allowed else _retry_after(tokens, limit)
+
+    def _prune_locked(self, now: float) -> None:
+        # A bucket untouched for a full period is full again: same as absent.
+        stale = [k for k, (_, updated, period) in self._buckets.items() if now - updated >= period]
+        for k in stale:
+            del self._buckets[k]
+
+    def prune(self, older_than: float) -> int:
+        now = self.clock()
+        with self._lock:
+            stale = [k for k, (_, updated, _) in self._buckets.items() if now - updated >= older_than]
+            for k in stale:
+                del self._buckets[k]
+        return len(stale)
+
+
+class PostgresBackend:
+    """Buckets in the `rate_limit_buckets` table, shared by all workers.
+
+    One upsert per hit: refill, conditional take and the verdict happen in a
+    single statement under the row lock, so concurrent workers can't both
+    spend the last token.
+    """
+
+    blocking = True
+
+    _HIT = text(
+        """
+        INSERT INTO rate_limit_buckets AS b (key, tokens, allowed, updated_at)
+        VALUES (:key, :capacity - 1, true, now())
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = LEAST(:capacity, b.tokens + EXTRACT(EPOCH FROM now() - b.updated_at) * :rate)
+                     - CASE WHEN LEAST(:capacity, b.tokens + EXTRACT(EPOCH FROM now() - b.updated_at) * :rate) >= 1
+                            THEN 1 ELSE 0 END,
+            allowed = LEAST(:capacity, b.tokens + EXTRACT(EPOCH FROM now() - b.updated_at) * :rate) >= 1,
+            updated_at = now()
+        RETURNING tokens, allowed
+        """
+    )
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    def hit(self, key: str, limit: Limit) -> tuple[bool, int]:
+        with self.engine.begin() as conn:
+            tokens, allowed = conn.execute(
+                self._HIT, {"key": key, "capacity": limit.capacity, "rate": limit.rate}
+            ).one()
+        return allowed, 0 if allowed else _retry_after(tokens, limit)
+
+    def prune(self, older_than: float) -> int:
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                text("DELETE FROM rate_limit_buckets WHERE updated_at < now() - make_interval(secs => :secs)"),
+                {"secs": older_than},
+            )
+        return result.rowcount
@@ -0,0 +1,103 @@
+# app/ratelimit/deps.py
+"""FastAPI dependencies that reject over-limit requests with 429 + Retry-After.
+
+Attach them through the route decorator's `dependencies=[...]`: those are
+solved before the endpoint's own parameters, so a limited request never
+reaches bcrypt or the session.
+"""
+import os
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+from observability.metrics import RATE_LIMITED
+from .backends import Limit, MemoryBackend, PostgresBackend
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory | postgres
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "0") == "1"
+
+# name -> (per-IP limit, per-account limit); override with e.g.
+# RATE_LIMIT_LOGIN_IP=30/60 or RATE_LIMIT_LOGIN_ACCOUNT=5/300
+DEFAULT_LIMITS = {
+    "login": ("20/60", "5/60"),
+    "invite": ("30/60", "3/3600"),
+    "accept_invite": ("10/60", "5/300"),
+}
+
+
+def _limits(name: str) -> tuple[Limit, Limit]:
+    ip_spec, account_spec = DEFAULT_LIMITS[name]
+    prefix = f"RATE_LIMIT_{name.upper()}"
+    return (
+        Limit.parse(os.getenv(f"{prefix}_IP", ip_spec)),
+        Limit.parse(os.getenv(f"{prefix}_ACCOUNT", account_spec)),
+    )
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if RATE_LIMIT_BACKEND == "postgres":
+            from db import engine
+            _backend = PostgresBackend(engine)
+        else:
+            _backend = MemoryBackend()
+    return _backend
+
+
+def client_ip(request: Request) -> str:
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+async def _account_from(request: Request, field: str) -> Optional[str]:
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("application/json"):
+            value = (await request.json()).get(field)
+        else:
+            value = (await request.form()).get(field)
+    except Exception:
+        return None
+    return value.strip().lower() if isinstance(value, str) else None
+
+
+async def _hit(key: str, limit: Limit) -> tuple[bool, int]:
+    backend = get_backend()
+    if backend.blocking:
+        return await run_in_threadpool(backend.hit, key, limit)
+    return backend.hit(key, limit)
+
+
+def rate_limit(name: str, account_field: Optional[str] = None):
+    """Dependency enforcing the `name` limits per client IP and, if
+    `account_field` is given, per value of that body field (email/username)."""
+    ip_limit, account_limit = _limits(name)
+
+    async def dependency(request: Request) -> None:
+        if not RATE_LIMIT_ENABLED:
+            return
+        checks = [("ip", f"{name}:ip:{client_ip(request)}", ip_limit)]
+        if account_field:
+            account = await _account_from(request, account_field)
+            if account:
+                checks.append(("account", f"{name}:account:{account}", account_limit))
+        for scope, key, limit in checks:
+            allowed, retry_after = await _hit(key, limit)
+            if not allowed:
+                RATE_LIMITED.labels(route=name, scope=scope).inc()
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many requests",
+                    headers={"Retry-After": str(retry_after)},
+                )
+
+    return dependency
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from auth.deps import require_admin_user
+from courses.catalog import catalog
+from db import get_session
+from models import EnrollmentDailyStat as S, User
+from schemas import CoursePopularityOut, ManagerApprovalLatencyOut, ManagerRejectionsOut, TeamOverdueOut
+from observability.timing import TimedRoute
+
+router = APIRouter(
+    prefix="/api/v1/analytics",
+    tags=["analytics"],
+    route_class=TimedRoute,
+    dependencies=[Depends(require_admin_user)],
+)
+
+# All endpoints read enrollment_daily_stats (analytics/rollups.py), never
+# course_enrollments; the current day is at most one rollup interval behind.
+Days = Query(default=30, ge=1, le=366, description="Look-back window in days, today included")
+
+
+def _recent(days: int):
+    return S.day > datetime.now(timezone.utc).date() - timedelta(days=days)
+
+
+def _by_manager(*columns):
+    return (
+        select(S.manager_id, User.name, *columns)
+        .outerjoin(User, User.id == S.manager_id)
+        .group_by(S.manager_id, User.name)
+    )
+
+
+def _manager_id(value: int):
+    return value or None
+
+
+@router.get("/courses/popular", response_model=list[CoursePopularityOut])
+def popular_courses(
+    days: int = Days,
+    limit: int = Query(default=20, ge=1, le=200),
+    session: Session = Depends(get_session),
+):
+    demand = func.sum(S.requested) + func.sum(S.assigned)
+    rows = session.exec(
+        select(S.course_id, func.sum(S.requested), func.sum(S.assigned), func.sum(S.approved), func.sum(S.completed))
+        .where(_recent(days))
+        .group_by(S.course_id)
+        .order_by(demand.desc(), S.course_id)
+        .limit(limit)
+    ).all()
+    courses = catalog.get(session).by_id
+    return [
+        CoursePopularityOut(
+            course_id=course_id,
+            name=courses[course_id].name if course_id in courses else None,
+            requested=requested,
+            assigned=assigned,
+            approved=approved,
+            completed=completed,
+        )
+        for course_id, requested, assigned, approved, completed in rows
+    ]
+
+
+@router.get("/approval-latency", response_model=list[ManagerApprovalLatencyOut])
+def approval_latency(days: int = Days, session: Session = Depends(get_session)):
+    approved, seconds = func.sum(S.approved), func.sum(S.approval_seconds)
+    rows = session.exec(
+        _by_manager(approved, seconds).where(_recent(days)).having(approved > 0).order_by(approved.desc())
+    ).all()
+    return [
+        ManagerApprovalLatencyOut(
+            manager_id=_manager_id(manager_id),
+            manager_name=name,
+            approved=n,
+            avg_approval_hours=round(total / n / 3600, 2),
+        )
+        for manager_id, name, n, total in rows
+    ]
+
+
+@router.get("/managers/rejections", response_model=list[ManagerRejectionsOut])
+def rejection_rates(days: int = Days, session: Session = Depends(get_session)):
+    approved, rejected = func.sum(S.approved), func.sum(S.rejected)
+    rows = session.exec(
+        _by_manager(approved, rejected)
+        .where(_recent(days))
+        .having(approved + rejected > 0)
+        .order_by((rejected * 1.0 / (approved + rejected)).desc())
+    ).all()
+    return [
+        ManagerRejectionsOut(
+            manager_id=_manager_id(manager_id),
+            manager_name=name,
+            approved=a,
+            rejected=r,
+            rejection_rate=round(r / (a + r), 4),
+        )
+        for manager_id, name, a, r in rows
+    ]
+
+
+@router.get("/teams/overdue", response_model=list[TeamOverdueOut])
+def overdue_by_team(days: int = Days, session: Session = Depends(get_session)):
+    overdue = func.sum(S.overdue)
+    rows = session.exec(
+        _by_manager(overdue).where(_recent(days)).having(overdue > 0).order_by(overdue.desc())
+    ).all()
+    return [
+        TeamOverdueOut(manager_id=_manager_id(manager_id), manager_name=name, overdue=n)
+        for manager_id, name, n in rows
+    ]
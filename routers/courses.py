@@ -1,22 +1,59 @@
 from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlmodel import Session, select
 
 from auth.deps import get_current_user, require_employee_or_manager
+from courses.catalog import catalog
+from courses.enrollments import get_enrollment, insert_enrollment
+from courses.recommendations import index as recommendations, team_of
 from db import get_session
-from models import Course, CourseEnrollment, EmployeeManager, Notification, User
-from schemas import CourseOut, CourseEnrollmentOut
+from models import Course, EmployeeManager, User
+from schemas import CourseOut, CourseEnrollmentOut, RecommendedCourseOut
+from observability.metrics import ENROLLMENT_EVENTS
+from notifications.service import enrollment_key, notify, observe
+from webhooks.events import enqueue, enrollment_data
+from observability.timing import TimedRoute
 
-router = APIRouter(prefix="/api/v1/courses", tags=["courses"])
+router = APIRouter(prefix="/api/v1/courses", tags=["courses"], route_class=TimedRoute)
 
 
 @router.get("/", response_model=list[CourseOut])
 def list_courses(
+    active: Optional[bool] = None,
+    provider_id: Optional[int] = None,
+    classification_id: Optional[int] = None,
+    flag_id: Optional[int] = None,
+    skill: Optional[str] = None,
     session: Session = Depends(get_session),
     _user=Depends(require_employee_or_manager),
 ):
-    stmt = select(Course).order_by(Course.id)
-    return session.exec(stmt).all()
+    """Served from the in-process catalog snapshot (courses/catalog.py)."""
+    return catalog.get(session).filter(
+        active=active,
+        provider_id=provider_id,
+        classification_id=classification_id,
+        flag_id=flag_id,
+        skill=skill,
+    )
+
+
+@router.get("/recommended", response_model=list[RecommendedCourseOut])
+def recommended_courses(
+    limit: int = Query(default=10, ge=1, le=50),
+    session: Session = Depends(get_session),
+    user: User = Depends(require_employee_or_manager),
+):
+    """Active courses ranked by skill/competency overlap with what the user
+    and their team enrolled in; courses the user already has are excluded."""
+    ranked = recommendations.recommend(user.id, team_of(session, user.id), k=limit)
+    courses = catalog.get(session).by_id
+    return [
+        RecommendedCourseOut(course=courses[r.course_id], score=r.score, matched=r.matched)
+        for r in ranked
+        if r.course_id in courses
+    ]
 
 
 @router.post("/{course_id}/enroll", response_model=CourseEnrollmentOut, status_code=status.HTTP_201_CREATED)
@@ -29,48 +66,50 @@ def request_enrollment(
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
 
-    existing = session.exec(
-        select(CourseEnrollment).where(
-            CourseEnrollment.employee_id == employee.id,
-            CourseEnrollment.course_id == course_id,
-        )
-    ).first()
-    if existing:
-        return existing
-
-    enrollment = CourseEnrollment(
-        employee_id=employee.id,
-        course_id=course_id,
-        status="pending",
-    )
+    values = {"status": "pending"}
     if employee.role == "manager":
-        enrollment.status = "approved"
-        enrollment.approved_at = datetime.now(timezone.utc)
-        enrollment.approved_by = employee.id
-    session.add(enrollment)
-    session.commit()
-    session.refresh(enrollment)
+        values.update(status="approved", approved_at=datetime.now(timezone.utc), approved_by=employee.id)
+    enrollment = insert_enrollment(session, employee.id, course_id, **values)
+    if enrollment is None:
+        return get_enrollment(session, employee.id, course_id)
 
-    if employee.role == "manager":
-        return enrollment
-
-    manager = session.exec(
-        select(EmployeeManager).where(EmployeeManager.employee_id == employee.id)
-    ).first()
-    if not manager:
-        raise HTTPException(status_code=400, detail="No manager assigned to this employee")
-
-    notification = Notification(
-        user_id=manager.manager_id,
-        title="Course enrollment request",
-        body=f"{employee.name or employee.email} requested enrollment in {course.name}.",
-        type="enrollment_requested",
-        meta={"employee_id": employee.id, "course_id": course_id, "enrollment_id": enrollment.id},
-    )
-    session.add(notification)
+    notified = None
+    if employee.role != "manager":
+        manager = session.exec(
+            select(EmployeeManager).where(EmployeeManager.employee_id == employee.id)
+        ).first()
+        if not manager:
+            session.rollback()
+            raise HTTPException(status_code=400, detail="No manager assigned to this employee")
+        # Same transaction as the enrollment: both exist, or neither.
+        # Coalesced into the manager's hourly digest (notifications/service.py).
+        notified = notify(
+            session,
+            manager.manager_id,
+            "enrollment_requested",
+            title="Course enrollment request",
+            body=f"{employee.name or employee.email} requested enrollment in {course.name}.",
+            meta={"employee_id": employee.id, "course_id": course_id, "enrollment_id": enrollment.id},
+            dedupe_key=enrollment_key(enrollment.id),
+        )
+    data = enrollment_data(enrollment, actor_id=employee.id)
+    enqueue(session, "enrollment.requested", data)
+    if enrollment.status == "approved":
+        # A manager's own request is approved on creation; subscribers to
+        # approvals hear about it like any other.
+        enqueue(session, "enrollment.approved", data)
+    out = CourseEnrollmentOut.model_validate(enrollment)
     session.commit()
 
-    return enrollment
+    ENROLLMENT_EVENTS.labels(event="requested").inc()
+    if enrollment.status == "approved":
+        ENROLLMENT_EVENTS.labels(event="approved").inc()
+    if notified is not None:
+        observe("enrollment_requested", notified)
+    recommendations.note_enrollment(employee.id, course_id)
+    return out
+
+
 @router.post("/{course_id}/assign", response_model=CourseOut)
 def toggle_assignment(
     course_id: int,
@@ -91,4 +130,5 @@ def toggle_assignment(
     session.add(course)
     session.commit()
     session.refresh(course)
+    catalog.invalidate()
     return course
@@ -0,0 +1,115 @@
+import asyncio
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+
+import db
+from auth.deps import require_employee_or_manager
+from courses.catalog import catalog
+from models import Course, CourseEnrollment, Notification, User
+from schemas import (
+    CourseEnrollmentOut, CourseOut, DashboardOut, NotificationOut, UserOut, UserProfileOut, UserStatus,
+)
+from observability.timing import TimedRoute
+from users.profiles import get_or_create_profile
+from users.status import derive_status
+
+router = APIRouter(prefix="/api/v1/dashboard", tags=["dashboard"], route_class=TimedRoute)
+
+DASHBOARD_NOTIFICATIONS_LIMIT = int(os.getenv("DASHBOARD_NOTIFICATIONS_LIMIT", "20"))
+
+
+def _profile(user_id: int) -> dict:
+    with Session(db.engine) as session:
+        return {"profile": UserProfileOut.model_validate(get_or_create_profile(session, user_id))}
+
+
+def _enrollments(user_id: int) -> dict:
+    with Session(db.engine) as session:
+        rows = session.exec(
+            select(CourseEnrollment, Course)
+            .join(Course, Course.id == CourseEnrollment.course_id)
+            .where(CourseEnrollment.employee_id == user_id)
+            .order_by(CourseEnrollment.id)
+        ).all()
+        return {
+            "enrollments": [
+                CourseEnrollmentOut.model_validate(enrollment).model_copy(
+                    update={"course": CourseOut.model_validate(course)}
+                )
+                for enrollment, course in rows
+            ]
+        }
+
+
+def _notifications(user_id: int) -> dict:
+    # The unread count rides along as a scalar subquery: one round trip.
+    unread = (
+        select(func.count())
+        .select_from(Notification)
+        .where(Notification.user_id == user_id, Notification.is_read.is_(False))
+        .scalar_subquery()
+    )
+    with Session(db.engine) as session:
+        rows = session.exec(
+            select(Notification, unread)
+            .where(Notification.user_id == user_id)
+            .order_by(Notification.id.desc())
+            .limit(DASHBOARD_NOTIFICATIONS_LIMIT)
+        ).all()
+        return {
+            "notifications": [NotificationOut.model_validate(n) for n, _ in rows],
+            "unread_notifications": rows[0][1] if rows else 0,
+        }
+
+
+def _courses(user_id: int) -> dict:
+    with Session(db.engine) as session:
+        return {"courses": list(catalog.get(session).courses)}
+
+
+SECTIONS = {
+    "profile": _profile,
+    "enrollments": _enrollments,
+    "notifications": _notifications,
+    "courses": _courses,
+}
+FIELDS = ("me", *SECTIONS)
+
+
+@router.get("", response_model=DashboardOut, response_model_exclude_unset=True)
+async def get_dashboard(
+    fields: Optional[str] = Query(
+        default=None,
+        description=f"Comma-separated sections to include (default: all of {', '.join(FIELDS)})",
+    ),
+    user: User = Depends(require_employee_or_manager),
+):
+    """Everything the SPA needs for first paint, in one request.
+
+    Each selected section is one query (profile: one read, or an upsert on
+    first visit; courses: none, they come from the catalog snapshot) on its
+    own pooled connection, and the sections run
+    concurrently, so latency is that of the slowest section rather than
+    the sum.
+    """
+    wanted = [f.strip() for f in fields.split(",") if f.strip()] if fields else list(FIELDS)
+    unknown = set(wanted) - set(FIELDS)
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    out: dict = {}
+    if "me" in wanted:
+        me = UserOut.model_validate(user)
+        me.status = UserStatus(derive_status(user))
+        out["me"] = me
+    results = await asyncio.gather(
+        *(run_in_threadpool(SECTIONS[name], user.id) for name in SECTIONS if name in wanted)
+    )
+    for section in results:
+        out.update(section)
+    return DashboardOut(**out)
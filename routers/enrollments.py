@@ -1,3 +1,4 @@
+import logging
 from datetime import datetime, timezone
 from typing import Optional
 
@@ -6,11 +7,18 @@ from sqlmodel import Session, select
 from pydantic import BaseModel
 
 from auth.deps import get_current_user, require_employee_or_manager
+from courses.enrollments import get_enrollment, insert_enrollment
+from courses.recommendations import index as recommendations
 from db import get_session
 from models import Course, CourseEnrollment, Notification, User, EmployeeManager
 from schemas import CourseEnrollmentOut, NotificationOut, TeamEnrollmentOut, CourseOut, UserOut
+from observability.metrics import ENROLLMENT_EVENTS
+from notifications.service import enrollment_key, notify, observe
+from webhooks.events import enqueue, enrollment_data
+from observability.timing import TimedRoute
 
-router = APIRouter(prefix="/api/v1/enrollments", tags=["enrollments"])
+router = APIRouter(prefix="/api/v1/enrollments", tags=["enrollments"], route_class=TimedRoute)
+logger = logging.getLogger(__name__)
 
 
 class RejectRequest(BaseModel):
@@ -76,6 +84,10 @@ def list_team_enrollments(
                 id=enrollment.id,
                 status=enrollment.status,
                 deadline=enrollment.deadline,
+                overdue_at=enrollment.overdue_at,
+                progress_percent=enrollment.progress_percent,
+                completed_at=enrollment.completed_at,
+                last_activity_at=enrollment.last_activity_at,
                 requested_at=enrollment.requested_at,
                 employee=UserOut.model_validate(employee),
                 course=CourseOut.model_validate(course),
@@ -117,29 +129,31 @@ def approve_enrollment(
     enrollment.approved_at = datetime.now(timezone.utc)
     enrollment.approved_by = approver.id
     session.add(enrollment)
+    enqueue(session, "enrollment.approved", enrollment_data(enrollment, actor_id=approver.id))
     session.commit()
     session.refresh(enrollment)
+    ENROLLMENT_EVENTS.labels(event="approved").inc()
 
     approver_name = approver.name or approver.email
     try:
-        notification = Notification(
-            user_id=enrollment.employee_id,
+        outcome = notify(
+            session,
+            enrollment.employee_id,
+            "enrollment_approved",
             title="Enrollment approved",
             body=f"Your course enrollment was approved by {approver_name}.",
-            type="enrollment_approved",
             meta={
                 "enrollment_id": enrollment.id,
                 "course_id": enrollment.course_id,
                 "approver_id": approver.id,
                 "approver_name": approver_name,
             },
+            dedupe_key=enrollment_key(enrollment.id),
         )
-        session.add(notification)
         session.commit()
-    except Exception as e:
-        import traceback
-        print(f"FAILED to create notification: {e}")
-        traceback.print_exc()
+        observe("enrollment_approved", outcome)
+    except Exception:
+        logger.exception("Failed to create notification for enrollment %s", enrollment.id)
 
     return enrollment
 
@@ -201,31 +215,37 @@ def reject_enrollment(
         raise HTTPException(status_code=403, detail="Not authorized")
 
     enrollment.status = "rejected"
+    enrollment.rejected_at = datetime.now(timezone.utc)
     session.add(enrollment)
+    enqueue(session, "enrollment.rejected", enrollment_data(enrollment, actor_id=rejector.id))
     session.commit()
     session.refresh(enrollment)
+    ENROLLMENT_EVENTS.labels(event="rejected").inc()
+    recommendations.forget_enrollment(enrollment.employee_id, enrollment.course_id)
 
     rejector_name = rejector.name or rejector.email
     course = session.get(Course, enrollment.course_id)
     course_name = course.name if course else "Unknown Course"
 
     try:
-        notification = Notification(
-            user_id=enrollment.employee_id,
+        outcome = notify(
+            session,
+            enrollment.employee_id,
+            "enrollment_rejected",
             title="Enrollment Rejected",
             body=f"Your request for {course_name} was rejected. Reason: {req.reason}",
-            type="enrollment_rejected",
             meta={
                 "enrollment_id": enrollment.id,
                 "course_id": enrollment.course_id,
                 "rejector_id": rejector.id,
                 "reason": req.reason,
             },
+            dedupe_key=enrollment_key(enrollment.id),
         )
-        session.add(notification)
         session.commit()
-    except Exception as e:
-        print(f"FAILED to create notification: {e}")
+        observe("enrollment_rejected", outcome)
+    except Exception:
+        logger.exception("Failed to create notification for enrollment %s", enrollment.id)
 
     return enrollment
 
@@ -266,15 +286,18 @@ def assign_course_to_employee(
         if not rel:
              raise HTTPException(status_code=403, detail="Employee does not report to you")
 
-    # 2. Check if already enrolled
-    existing = session.exec(
-        select(CourseEnrollment).where(
-            CourseEnrollment.employee_id == req.employee_id,
-            CourseEnrollment.course_id == req.course_id
-        )
-    ).first()
-    
-    if existing:
+    # 2. Create the assignment, unless the employee is already enrolled
+    enrollment = insert_enrollment(
+        session,
+        req.employee_id,
+        req.course_id,
+        status="assigned",  # Distinct status
+        deadline=req.deadline,
+        approved_at=datetime.now(timezone.utc),  # Auto-approved since assigned by manager
+        approved_by=manager.id,
+    )
+    if enrollment is None:
+        existing = get_enrollment(session, req.employee_id, req.course_id)
         # Update deadline if provided
         if req.deadline:
             existing.deadline = req.deadline
@@ -283,40 +306,27 @@ def assign_course_to_employee(
             session.refresh(existing)
         return existing
 
-    # 3. Create Assignment
-    enrollment = CourseEnrollment(
-        employee_id=req.employee_id,
-        course_id=req.course_id,
-        status="assigned",  # Distinct status
-        deadline=req.deadline,
-        approved_at=datetime.now(timezone.utc),  # Auto-approved since assigned by manager
-        approved_by=manager.id,
+    # 3. Notify Employee, in the same transaction as the assignment
+    manager_name = manager.name or manager.email
+    outcome = notify(
+        session,
+        req.employee_id,
+        "quest_assigned",
+        title="New Mission Assigned",
+        body=f"Manager {manager_name} assigned you a new quest.",
+        meta={
+            "course_id": req.course_id,
+            "deadline": req.deadline.isoformat() if req.deadline else None,
+            "manager_id": manager.id,
+            "manager_name": manager_name,
+            "enrollment_id": enrollment.id,
+        },
+        dedupe_key=enrollment_key(enrollment.id),
     )
-    session.add(enrollment)
+    enqueue(session, "enrollment.assigned", enrollment_data(enrollment, actor_id=manager.id))
+    out = CourseEnrollmentOut.model_validate(enrollment)
     session.commit()
-    session.refresh(enrollment)
-    
-    # Notify Employee
-    manager_name = manager.name or manager.email
-    try:
-        notification = Notification(
-            user_id=req.employee_id,
-            title="New Mission Assigned",
-            body=f"Manager {manager_name} assigned you a new quest.",
-            type="quest_assigned",
-            meta={
-                "course_id": req.course_id,
-                "deadline": req.deadline.isoformat() if req.deadline else None,
-                "manager_id": manager.id,
-                "manager_name": manager_name,
-                "enrollment_id": enrollment.id,
-            },
-        )
-        session.add(notification)
-        session.commit()
-    except Exception as e:
-        import traceback
-        print(f"FAILED to create notification: {e}")
-        traceback.print_exc()
-        
-    return enrollment
+    ENROLLMENT_EVENTS.labels(event="assigned").inc()
+    observe("quest_assigned", outcome)
+    recommendations.note_enrollment(req.employee_id, req.course_id)
+    return out
@@ -0,0 +1,85 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from sqlmodel import Session
+
+from auth.deps import get_current_user, require_admin_user
+from db import get_session
+from models import DataExport, User
+from schemas import DataExportIn, DataExportOut
+from observability.timing import TimedRoute
+from users.export import create_export, expire_export, export_path, pending_for
+
+router = APIRouter(prefix="/api/v1/exports", tags=["exports"], route_class=TimedRoute)
+
+# Exports are built by the process_data_exports scheduler job (users/export.py);
+# clients poll GET /{id} until status is "done", then follow download_url.
+
+
+def _out(export: DataExport) -> DataExportOut:
+    out = DataExportOut.model_validate(export)
+    out.total = len(export.user_ids)
+    if export.status == "done":
+        out.download_url = router.url_path_for("download_export", export_id=str(export.id))
+    return out
+
+
+def _get_owned(session: Session, export_id: int, user: User) -> DataExport:
+    export = session.get(DataExport, export_id)
+    # Someone else's export is reported as missing, not forbidden.
+    if not export or (user.role != "admin" and export.created_by != user.id):
+        raise HTTPException(status_code=404, detail="Export not found")
+    return export
+
+
+@router.post("", response_model=DataExportOut, status_code=status.HTTP_202_ACCEPTED)
+def request_export(
+    payload: DataExportIn,
+    session: Session = Depends(get_session),
+    admin: User = Depends(require_admin_user),
+):
+    """Queue one zip covering every user in `user_ids` (data-subject access requests).
+
+    At most EXPORT_MAX_USERS users per export; request more as several exports.
+    """
+    return _out(create_export(session, payload.user_ids, created_by=admin.id))
+
+
+@router.post("/me", response_model=DataExportOut, status_code=status.HTTP_202_ACCEPTED)
+def request_my_export(
+    session: Session = Depends(get_session),
+    user: User = Depends(get_current_user),
+):
+    if pending_for(session, user.id):
+        raise HTTPException(status_code=409, detail="An export is already in progress.")
+    return _out(create_export(session, [user.id], created_by=user.id))
+
+
+@router.get("/{export_id}", response_model=DataExportOut)
+def get_export(
+    export_id: int,
+    session: Session = Depends(get_session),
+    user: User = Depends(get_current_user),
+):
+    return _out(_get_owned(session, export_id, user))
+
+
+@router.get("/{export_id}/download", name="download_export")
+def download_export(
+    export_id: int,
+    session: Session = Depends(get_session),
+    user: User = Depends(get_current_user),
+):
+    export = _get_owned(session, export_id, user)
+    if export.status != "done":
+        raise HTTPException(status_code=409, detail=f"Export is {export.status}")
+    path = export_path(export)
+    if not path.is_file():
+        # Purged early or lost with its volume: say so, and stop offering it.
+        expire_export(session, export)
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Export is expired")
+    return FileResponse(
+        path,
+        media_type="application/zip",
+        filename=f"personal-data-{export.id}.zip",
+        headers={"Cache-Control": "private, no-store"},
+    )
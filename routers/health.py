@@ -0,0 +1,138 @@
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from pathlib import Path
+from typing import Callable, Optional
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+
+import db
+from mailer import SMTP_HOST, SMTP_PORT
+from observability.timing import TimedRoute
+
+router = APIRouter(prefix="/health", tags=["health"], route_class=TimedRoute)
+
+READY_CACHE_SECONDS = float(os.getenv("READY_CACHE_SECONDS", "2"))
+READY_DB_TIMEOUT_SECONDS = float(os.getenv("READY_DB_TIMEOUT_SECONDS", "1"))
+READY_SMTP_TIMEOUT_SECONDS = float(os.getenv("READY_SMTP_TIMEOUT_SECONDS", "1"))
+READY_POOL_MAX_UTILIZATION = float(os.getenv("READY_POOL_MAX_UTILIZATION", "0.9"))
+
+_repo_root = Path(__file__).resolve().parents[1]
+
+# Checks run here so a hung DB/SMTP call can be abandoned after its timeout
+# without tying up a request thread.
+_probe_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="readiness")
+
+_lock = threading.Lock()
+_cached: Optional[tuple[float, bool, dict]] = None
+_migration_head: Optional[str] = None
+
+
+def _with_timeout(fn: Callable[[], dict], timeout: float) -> dict:
+    try:
+        return _probe_pool.submit(fn).result(timeout=timeout)
+    except FutureTimeout:
+        return {"ok": False, "error": f"timed out after {timeout:.1f}s"}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+
+def _check_pool() -> dict:
+    pool = db.engine.pool
+    if not callable(getattr(pool, "size", None)):
+        return {"ok": True, "detail": type(pool).__name__}
+    capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+    checked_out = pool.checkedout()
+    utilization = checked_out / capacity if capacity else 0.0
+    return {
+        "ok": utilization < READY_POOL_MAX_UTILIZATION,
+        "checked_out": checked_out,
+        "capacity": capacity,
+        "utilization": round(utilization, 3),
+    }
+
+
+def _check_db() -> dict:
+    with db.engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        current = conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    return {"ok": True, "revision": current}
+
+
+def _head_revision() -> str:
+    global _migration_head
+    if _migration_head is None:
+        cfg = Config(str(_repo_root / "alembic.ini"))
+        cfg.set_main_option("script_location", str(_repo_root / "alembic"))
+        _migration_head = ScriptDirectory.from_config(cfg).get_current_head()
+    return _migration_head
+
+
+def _check_smtp() -> dict:
+    if not SMTP_HOST:
+        return {"ok": True, "detail": "not configured"}
+    with socket.create_connection((SMTP_HOST, SMTP_PORT), timeout=READY_SMTP_TIMEOUT_SECONDS):
+        pass
+    return {"ok": True}
+
+
+def _timed(fn: Callable[[], dict], timeout: float) -> dict:
+    started = time.perf_counter()
+    result = _with_timeout(fn, timeout)
+    result["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+def run_checks() -> tuple[bool, dict]:
+    # Pool first: on an exhausted pool connect() would block for pool_timeout,
+    # which is exactly what the probe must not do.
+    checks = {"pool": _check_pool()}
+    if checks["pool"]["ok"]:
+        checks["database"] = _timed(_check_db, READY_DB_TIMEOUT_SECONDS)
+    else:
+        checks["database"] = {"ok": False, "error": "skipped: pool saturated"}
+
+    head = _head_revision()
+    current = checks["database"].get("revision")
+    checks["migrations"] = {"ok": current == head, "head": head, "current": current}
+
+    # SMTP only degrades the report: invite emails fail, but requests still work.
+    checks["smtp"] = _timed(_check_smtp, READY_SMTP_TIMEOUT_SECONDS + 0.5)
+    checks["smtp"]["critical"] = False
+
+    ready = all(c["ok"] for c in checks.values() if c.get("critical", True))
+    return ready, checks
+
+
+def readiness() -> tuple[bool, dict]:
+    """run_checks() cached for READY_CACHE_SECONDS; concurrent probes share one run."""
+    global _cached
+    now = time.monotonic()
+    if _cached and now - _cached[0] < READY_CACHE_SECONDS:
+        return _cached[1], _cached[2]
+    with _lock:
+        if _cached and time.monotonic() - _cached[0] < READY_CACHE_SECONDS:
+            return _cached[1], _cached[2]
+        ready, checks = run_checks()
+        _cached = (time.monotonic(), ready, checks)
+        return ready, checks
+
+
+@router.get("/live")
+def live():
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+def ready():
+    is_ready, checks = readiness()
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"status": "ready" if is_ready else "unavailable", "checks": checks},
+    )
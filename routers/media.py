@@ -0,0 +1,29 @@
+import re
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+
+from media.storage import get_storage
+from observability.timing import TimedRoute
+
+router = APIRouter(prefix="/api/v1/media", tags=["media"], route_class=TimedRoute)
+
+# Content-addressed keys only; also rules out path traversal.
+_KEY = re.compile(r"^avatars/[0-9a-f]{2}/(?P<sha>[0-9a-f]{64})(?:_\d+)?\.(?:jpg|png|gif|webp)$")
+
+# Keys never change content, so clients and CDNs may keep them forever.
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+@router.get("/{key:path}", include_in_schema=False)
+def get_media(key: str, request: Request):
+    match = _KEY.match(key)
+    path = get_storage().local_path(key) if match else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Not found")
+
+    etag = f'"{key.rsplit("/", 1)[-1]}"'
+    headers = {"Cache-Control": IMMUTABLE, "ETag": etag}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, headers=headers)
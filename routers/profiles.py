@@ -1,7 +1,7 @@
-from datetime import datetime
+import os
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from sqlmodel import Session, select
 from models import (
     User, UserProfile, UserPersonalEmail, UserDependent,
@@ -11,10 +11,17 @@ from schemas import (
     UserProfileOut, UserProfileIn,
     CountryOut, CityOut, EducationLevelOut
 )
+import db
 from db import get_session
 from auth.deps import get_current_user
+from observability.timing import TimedRoute
+from users.cities import CITY_SEARCH_MAX_LIMIT, search_cities
+from users.profiles import PreconditionFailed, etag, get_or_create_profile, parse_if_match, upsert_profile
+
+router = APIRouter(prefix="/api/v1/profiles", tags=["profiles"], route_class=TimedRoute)
 
-router = APIRouter(prefix="/api/v1/profiles", tags=["profiles"])
+# Reject profile writes without If-Match (428) instead of applying them blindly.
+PROFILE_REQUIRE_IF_MATCH = os.getenv("PROFILE_REQUIRE_IF_MATCH", "false").lower() in ("1", "true", "yes")
 
 # --- Reference Data ---
 
@@ -22,6 +29,15 @@ router = APIRouter(prefix="/api/v1/profiles", tags=["profiles"])
 def list_countries(session: Session = Depends(get_session)):
     return session.exec(select(Country).order_by(Country.name)).all()
 
+@router.get("/cities/search", response_model=list[CityOut])
+def search_cities_endpoint(
+    q: str = Query(min_length=1, max_length=100, description="Case-insensitive name prefix"),
+    country_id: Optional[int] = None,
+    limit: int = Query(default=10, ge=1, le=CITY_SEARCH_MAX_LIMIT),
+    session: Session = Depends(get_session),
+):
+    return search_cities(session, q, country_id, limit)
+
 @router.get("/cities/{country_id}", response_model=list[CityOut])
 def list_cities(country_id: int, session: Session = Depends(get_session)):
     return session.exec(select(City).where(City.country_id == country_id).order_by(City.name)).all()
@@ -34,74 +50,84 @@ def list_education_levels(session: Session = Depends(get_session)):
 
 @router.get("/me", response_model=UserProfileOut)
 def get_my_profile(
+    response: Response,
     session: Session = Depends(get_session),
     user: User = Depends(get_current_user),
 ):
-    profile = session.get(UserProfile, user.id)
-    if not profile:
-        # Create empty profile if none exists
-        profile = UserProfile(user_id=user.id)
-        session.add(profile)
-        session.commit()
-        session.refresh(profile)
+    profile = get_or_create_profile(session, user.id)
+    response.headers["ETag"] = etag(profile)
     return profile
 
 @router.put("/me", response_model=UserProfileOut)
+@router.patch("/me", response_model=UserProfileOut)
 def update_my_profile(
     profile_in: UserProfileIn,
+    response: Response,
+    if_match: Optional[str] = Header(default=None),
     session: Session = Depends(get_session),
     user: User = Depends(get_current_user),
 ):
-    profile = session.get(UserProfile, user.id)
-    if not profile:
-        profile = UserProfile(user_id=user.id)
-        session.add(profile)
-    
-    # Update fields
-    data = profile_in.model_dump(exclude_unset=True)
-    for key, value in data.items():
-        setattr(profile, key, value)
-    
-    profile.updated_at = datetime.utcnow()
-    
-    session.add(profile)
-    session.commit()
-    session.refresh(profile)
+    """Writes only the fields present in the body.
+
+    Send the ETag from GET as If-Match to have the write rejected with 412
+    if someone else changed the profile in between.
+    """
+    if if_match is None and PROFILE_REQUIRE_IF_MATCH:
+        raise HTTPException(status_code=status.HTTP_428_PRECONDITION_REQUIRED, detail="If-Match header required")
+    try:
+        profile = upsert_profile(
+            session,
+            user.id,
+            profile_in.model_dump(exclude_unset=True),
+            actor_id=user.id,
+            if_match=parse_if_match(if_match),
+        )
+    except PreconditionFailed:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Profile was modified")
+    response.headers["ETag"] = etag(profile)
     return profile
 
-import shutil
-import os
-from fastapi import UploadFile, File
+from fastapi import Request
+from sqlalchemy import update
+from starlette.concurrency import run_in_threadpool
+from media.avatars import AVATAR_MAX_BYTES, avatar_url, schedule_thumbnails, store_original
+from media.storage import get_storage
+from media.upload import receive_file
+
+def _set_avatar(user_id: int, url: str):
+    with Session(db.engine) as session:
+        return upsert_profile(session, user_id, {"profile_picture_url": url}, actor_id=user_id)
+
+def _swap_in_thumbnail(user_id: int, original_url: str, thumb_url: str) -> None:
+    # Only if the user hasn't uploaded something else in the meantime.
+    with Session(db.engine) as session:
+        session.execute(
+            update(UserProfile)
+            .where(UserProfile.user_id == user_id, UserProfile.profile_picture_url == original_url)
+            .values(profile_picture_url=thumb_url, version=UserProfile.version + 1)
+        )
+        session.commit()
 
 @router.post("/avatar", response_model=UserProfileOut)
-def upload_avatar(
-    file: UploadFile = File(...),
-    session: Session = Depends(get_session),
+async def upload_avatar(
+    request: Request,
     user: User = Depends(get_current_user),
 ):
-    profile = session.get(UserProfile, user.id)
-    if not profile:
-        profile = UserProfile(user_id=user.id)
-        session.add(profile)
-    
-    # Ensure directory exists
-    os.makedirs("static/uploads", exist_ok=True)
-    
-    # Save file
-    safe_filename = f"user_{user.id}_{file.filename}"
-    file_path = f"static/uploads/{safe_filename}"
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    # Construct URL (assuming mounting at /static)
-    # Ideally use a base_url from env or request, but relative path works for frontend often if proxied.
-    # Or absolute path if we know the domain. For now, /static/...
-    profile.profile_picture_url = f"/api/static/uploads/{safe_filename}"
-    
-    session.add(profile)
-    session.commit()
-    session.refresh(profile)
+    """Multipart (field `file`) or a raw image body, at most AVATAR_MAX_BYTES.
+
+    Returns once the original is stored; profile_picture_url points at the
+    original until the thumbnail worker swaps in the resized version.
+    """
+    storage = get_storage()
+    staged = await receive_file(request, AVATAR_MAX_BYTES, staging_dir=storage.staging_dir())
+    key = await run_in_threadpool(store_original, storage, staged)
+    url = await run_in_threadpool(avatar_url, storage, staged.sha256, key)
+    profile = await run_in_threadpool(_set_avatar, user.id, url)
+    if url == storage.url(key):
+        schedule_thumbnails(
+            storage, staged.sha256, key,
+            on_done=lambda: _swap_in_thumbnail(user.id, url, avatar_url(storage, staged.sha256, key)),
+        )
     return profile
 
 # --- Dependents Management ---
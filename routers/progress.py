@@ -0,0 +1,35 @@
+import os
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, status
+from pydantic import Field
+from sqlmodel import Session
+
+from auth.deps import require_employee_or_manager
+from courses.progress import record_events
+from db import get_session
+from models import User
+from schemas import LearningBatchOut, LearningStatementIn
+from observability.timing import TimedRoute
+
+router = APIRouter(prefix="/api/v1/progress", tags=["progress"], route_class=TimedRoute)
+
+PROGRESS_MAX_BATCH = int(os.getenv("PROGRESS_MAX_BATCH", "1000"))
+
+# Checked while the list is validated, so an oversized batch is rejected
+# (422) at statement N + 1 instead of after validating all of it.
+LearningBatchIn = Annotated[list[LearningStatementIn], Field(max_length=PROGRESS_MAX_BATCH)]
+
+
+@router.post("/events", response_model=LearningBatchOut, status_code=status.HTTP_202_ACCEPTED)
+def ingest_events(
+    statements: LearningBatchIn,
+    session: Session = Depends(get_session),
+    user: User = Depends(require_employee_or_manager),
+):
+    """Accept a batch of learning statements for the current user.
+
+    Events are only appended here; enrollment progress catches up within
+    a few seconds, when the fold_learning_events job drains the batch.
+    """
+    return LearningBatchOut(accepted=record_events(session, user.id, statements))
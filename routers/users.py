@@ -1,17 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
 from typing import Optional
 from sqlmodel import Session, select
-from models import User, EmployeeManager
+from models import User, EmployeeManager, UserBulkJob
 from db import get_session
 from auth.deps import require_admin_user, get_current_user
 from users.status import derive_status
-from schemas import UserOut
+from users.directory import DIRECTORY_MAX_LIMIT, InvalidCursor, directory_page
+from users.hris import SyncRefused, open_snapshot, sync_snapshot
+from users.deletion import create_job, delete_user, is_last_admin
+from auth.sessions import revoke_user_sessions
+from schemas import HrisSyncReportOut, UserBulkJobIn, UserBulkJobOut, UserDirectoryPageOut, UserOut, UserStatus
+from observability.timing import TimedRoute
 
-router = APIRouter(prefix="/api/v1/users", tags=["users"])
-
-def _count_active_admins(session: Session) -> int:
-    stmt = select(User).where(User.role == "admin", User.is_active == True)
-    return len(session.exec(stmt).all())
+router = APIRouter(prefix="/api/v1/users", tags=["users"], route_class=TimedRoute)
 
 def _get_user_or_404(session: Session, user_id: int) -> User:
     user = session.get(User, user_id)
@@ -23,7 +24,54 @@ def _get_user_or_404(session: Session, user_id: int) -> User:
 
 @router.get("/me", response_model=UserOut)
 def get_me(current_user: User = Depends(get_current_user)):
-    return current_user
+    out = UserOut.model_validate(current_user)
+    out.status = derive_status(current_user)
+    return out
+
+@router.get("/directory", response_model=UserDirectoryPageOut)
+def user_directory(
+    q: Optional[str] = Query(default=None, max_length=100, description="Fuzzy match on email, name, first/last name"),
+    role: Optional[str] = Query(default=None, pattern="^(admin|manager|employee)$"),
+    status_: Optional[UserStatus] = Query(default=None, alias="status"),
+    manager_id: Optional[int] = None,
+    limit: int = Query(default=50, ge=1, le=DIRECTORY_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    session: Session = Depends(get_session),
+    admin: User = Depends(require_admin_user),
+):
+    try:
+        rows, next_cursor = directory_page(
+            session,
+            limit,
+            q=q,
+            role=role,
+            status=status_.value if status_ else None,
+            manager_id=manager_id,
+            cursor=cursor,
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": [dict(r._mapping) for r in rows], "next_cursor": next_cursor}
+
+@router.post("/sync", response_model=HrisSyncReportOut)
+def sync_users(
+    snapshot: UploadFile = File(..., description="Full HRIS export: CSV with a header row, or JSONL"),
+    fmt: Optional[str] = Query(default=None, alias="format", pattern="^(csv|jsonl)$", description="Defaults to the file extension"),
+    dry_run: bool = True,
+    force: bool = False,
+    session: Session = Depends(get_session),
+    admin: User = Depends(require_admin_user),
+):
+    """Provision users from an HRIS snapshot; reports the diff without writing unless dry_run=false."""
+    fmt = fmt or ("jsonl" if (snapshot.filename or "").lower().endswith((".jsonl", ".ndjson")) else "csv")
+    try:
+        return sync_snapshot(
+            session, open_snapshot(snapshot.file), fmt, dry_run=dry_run, force=force, actor_id=admin.id
+        )
+    except SyncRefused as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Snapshot must be UTF-8")
 
 # --- GET (temporary): list all users (id, name, email) ---
 
@@ -54,9 +102,8 @@ def soft_delete_user(
         raise HTTPException(status_code=400, detail="Admins cannot deactivate themselves.")
 
     # Safety: don't deactivate the last active admin
-    if target.role == "admin" and target.is_active:
-        if _count_active_admins(session) <= 1:
-            raise HTTPException(status_code=400, detail="Cannot deactivate the last active admin.")
+    if is_last_admin(session, target):
+        raise HTTPException(status_code=400, detail="Cannot deactivate the last active admin.")
 
     if not target.is_active:
         # idempotent delete semantics
@@ -66,6 +113,18 @@ def soft_delete_user(
     target.status = derive_status(target)
     session.add(target)
     session.commit()
+    revoke_user_sessions(session, target.id)
+    return
+
+
+@router.delete("/{user_id}/sessions", status_code=status.HTTP_204_NO_CONTENT)
+def revoke_sessions(
+    user_id: int,
+    session: Session = Depends(get_session),
+    admin: User = Depends(require_admin_user),
+):
+    _get_user_or_404(session, user_id)
+    revoke_user_sessions(session, user_id)
     return
 
 
@@ -84,16 +143,63 @@ def hard_delete_user(
         raise HTTPException(status_code=400, detail="Admins cannot delete themselves.")
 
     # Safety: don't delete the last active admin
-    if target.role == "admin" and target.is_active:
-        if _count_active_admins(session) <= 1:
-            raise HTTPException(status_code=400, detail="Cannot delete the last active admin.")
+    if is_last_admin(session, target):
+        raise HTTPException(status_code=400, detail="Cannot delete the last active admin.")
 
-    # If you rely on FK constraints, this will fail fast if referential integrity is violated.
-    session.delete(target)
-    session.commit()
+    # Dependent rows go first, in short chunked transactions (users/deletion.py).
+    session.expunge(target)
+    delete_user(session, target.id)
     return
 
 
+# --- Bulk deactivate / delete, run by the scheduler ---
+
+def _job_out(job: UserBulkJob) -> UserBulkJobOut:
+    out = UserBulkJobOut.model_validate(job)
+    out.total = len(job.user_ids)
+    return out
+
+@router.post("/bulk-jobs", response_model=UserBulkJobOut, status_code=status.HTTP_202_ACCEPTED)
+def create_bulk_job(
+    payload: UserBulkJobIn,
+    session: Session = Depends(get_session),
+    admin: User = Depends(require_admin_user),
+):
+    if admin.id in payload.user_ids:
+        raise HTTPException(status_code=400, detail="Admins cannot deactivate or delete themselves.")
+    return _job_out(create_job(session, payload.action, payload.user_ids, created_by=admin.id))
+
+@router.get("/bulk-jobs/{job_id}", response_model=UserBulkJobOut)
+def get_bulk_job(
+    job_id: int,
+    session: Session = Depends(get_session),
+    admin: User = Depends(require_admin_user),
+):
+    job = session.get(UserBulkJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_out(job)
+
+@router.post("/bulk-jobs/{job_id}/resume", response_model=UserBulkJobOut)
+def resume_bulk_job(
+    job_id: int,
+    session: Session = Depends(get_session),
+    admin: User = Depends(require_admin_user),
+):
+    """Re-queue a failed job; it continues from its recorded position."""
+    job = session.get(UserBulkJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != "failed":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    job.status = "running"
+    job.error = None
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return _job_out(job)
+
+
 # --- NEW: Team Management Endpoint ---
 
 @router.get("/my-team", response_model=list[UserOut])
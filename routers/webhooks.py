@@ -0,0 +1,127 @@
+import secrets
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from auth.deps import require_admin_user
+from db import get_session
+from models import User, WebhookDelivery, WebhookEndpoint
+from schemas import WebhookDeliveryOut, WebhookEndpointIn, WebhookEndpointOut, WebhookEndpointUpdate
+from observability.timing import TimedRoute
+
+router = APIRouter(prefix="/api/v1/webhooks", tags=["webhooks"], route_class=TimedRoute)
+
+# Events are queued by the enrollment routes (webhooks/events.py) and sent by
+# the background worker (webhooks/worker.py); this router only manages endpoints.
+
+
+def _out(endpoint: WebhookEndpoint, with_secret: bool = False) -> WebhookEndpointOut:
+    out = WebhookEndpointOut.model_validate(endpoint)
+    if not with_secret:
+        out.secret = None
+    return out
+
+
+def _get_endpoint_or_404(session: Session, endpoint_id: int) -> WebhookEndpoint:
+    endpoint = session.get(WebhookEndpoint, endpoint_id)
+    if not endpoint:
+        raise HTTPException(status_code=404, detail="Webhook endpoint not found")
+    return endpoint
+
+
+@router.post("", response_model=WebhookEndpointOut, status_code=status.HTTP_201_CREATED)
+def create_endpoint(
+    payload: WebhookEndpointIn,
+    session: Session = Depends(get_session),
+    admin: User = Depends(require_admin_user),
+):
+    """Subscribe a receiver. The signing secret is returned here and never again."""
+    endpoint = WebhookEndpoint(**payload.model_dump(), secret=secrets.token_urlsafe(32), created_by=admin.id)
+    session.add(endpoint)
+    session.commit()
+    session.refresh(endpoint)
+    return _out(endpoint, with_secret=True)
+
+
+@router.get("", response_model=list[WebhookEndpointOut])
+def list_endpoints(
+    session: Session = Depends(get_session),
+    admin: User = Depends(require_admin_user),
+):
+    endpoints = session.exec(select(WebhookEndpoint).order_by(WebhookEndpoint.id)).all()
+    return [_out(e) for e in endpoints]
+
+
+@router.patch("/{endpoint_id}", response_model=WebhookEndpointOut)
+def update_endpoint(
+    endpoint_id: int,
+    payload: WebhookEndpointUpdate,
+    session: Session = Depends(get_session),
+    admin: User = Depends(require_admin_user),
+):
+    """Change an endpoint; re-activating one also closes its circuit breaker."""
+    endpoint = _get_endpoint_or_404(session, endpoint_id)
+    changes = payload.model_dump(exclude_unset=True)
+    for key, value in changes.items():
+        setattr(endpoint, key, value)
+    if changes.get("is_active"):
+        endpoint.consecutive_failures = 0
+        endpoint.circuit_open_until = None
+    session.add(endpoint)
+    session.commit()
+    session.refresh(endpoint)
+    return _out(endpoint)
+
+
+@router.delete("/{endpoint_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_endpoint(
+    endpoint_id: int,
+    session: Session = Depends(get_session),
+    admin: User = Depends(require_admin_user),
+):
+    endpoint = _get_endpoint_or_404(session, endpoint_id)
+    session.execute(delete(WebhookDelivery).where(WebhookDelivery.endpoint_id == endpoint.id))
+    session.delete(endpoint)
+    session.commit()
+    return
+
+
+@router.get("/{endpoint_id}/deliveries", response_model=list[WebhookDeliveryOut])
+def list_deliveries(
+    endpoint_id: int,
+    status_: Optional[str] = Query(default=None, alias="status", pattern="^(pending|delivered|failed)$"),
+    limit: int = Query(default=50, ge=1, le=500),
+    session: Session = Depends(get_session),
+    admin: User = Depends(require_admin_user),
+):
+    """Most recent deliveries first."""
+    _get_endpoint_or_404(session, endpoint_id)
+    stmt = select(WebhookDelivery).where(WebhookDelivery.endpoint_id == endpoint_id)
+    if status_:
+        stmt = stmt.where(WebhookDelivery.status == status_)
+    return session.exec(stmt.order_by(WebhookDelivery.id.desc()).limit(limit)).all()
+
+
+@router.post("/{endpoint_id}/deliveries/{delivery_id}/retry", response_model=WebhookDeliveryOut)
+def retry_delivery(
+    endpoint_id: int,
+    delivery_id: int,
+    session: Session = Depends(get_session),
+    admin: User = Depends(require_admin_user),
+):
+    """Queue a failed delivery again, with a fresh set of attempts."""
+    delivery = session.get(WebhookDelivery, delivery_id)
+    if not delivery or delivery.endpoint_id != endpoint_id:
+        raise HTTPException(status_code=404, detail="Delivery not found")
+    if delivery.status != "failed":
+        raise HTTPException(status_code=409, detail=f"Delivery is {delivery.status}")
+    delivery.status = "pending"
+    delivery.attempts = 0
+    delivery.next_attempt_at = datetime.now(timezone.utc)
+    session.add(delivery)
+    session.commit()
+    session.refresh(delivery)
+    return delivery
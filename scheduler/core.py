@@ -0,0 +1,208 @@
+# app/scheduler/core.py
+"""In-process job scheduler.
+
+Every worker runs a Scheduler, but only the one holding the leader lock
+(a session-level Postgres advisory lock) executes jobs. If the leader dies
+its connection closes, Postgres drops the lock, and another worker takes
+over on its next tick. The clock is injectable so tests can drive ticks
+without sleeping.
+
+Jobs run one after another within a lane, and each lane ticks on its own
+thread. Long, time-budgeted jobs (bulk user jobs, data exports) get lanes
+of their own, so they only delay themselves and never the short,
+frequent jobs (the progress fold, invite expiry) in the default lane.
+"""
+import asyncio
+import logging
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+
+from observability.metrics import JOB_DURATION, JOB_LAST_SUCCESS, JOB_ROWS, JOB_RUNS
+
+logger = logging.getLogger(__name__)
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass
+class Job:
+    """`fn(session, now, last_run)` does one batched pass and returns rows touched."""
+    name: str
+    interval: timedelta
+    fn: Callable[[Session, datetime, Optional[datetime]], int]
+    lane: str = "default"
+
+
+@dataclass
+class JobResult:
+    name: str
+    started: datetime
+    seconds: float
+    rows: int = 0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class AdvisoryLockLeader:
+    """Leadership = holding pg_try_advisory_lock(key) on a dedicated connection."""
+
+    def __init__(self, engine: Engine, name: str = "ldsaas.scheduler"):
+        self.engine = engine
+        self.key = zlib.crc32(name.encode())
+        self._conn: Optional[Connection] = None
+
+    def is_leader(self) -> bool:
+        if self._conn is not None:
+            try:
+                self._conn.execute(select(1))
+                self._conn.commit()
+                return True
+            except Exception:
+                logger.warning("scheduler lost its leader connection", exc_info=True)
+                self.release()
+        conn = self.engine.connect()
+        try:
+            acquired = conn.execute(select(func.pg_try_advisory_lock(self.key))).scalar()
+            conn.commit()
+        except Exception:
+            conn.close()
+            raise
+        if not acquired:
+            conn.close()
+            return False
+        self._conn = conn
+        logger.info("scheduler leadership acquired")
+        return True
+
+    def release(self) -> None:
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute(select(func.pg_advisory_unlock(self.key)))
+            self._conn.commit()
+        except Exception:
+            pass
+        finally:
+            self._conn.close()
+            self._conn = None
+
+
+class LocalLeader:
+    """Single-process deployments (and SQLite) have nothing to elect."""
+
+    def is_leader(self) -> bool:
+        return True
+
+    def release(self) -> None:
+        pass
+
+
+def leader_for(engine: Engine):
+    if engine.dialect.name == "postgresql":
+        return AdvisoryLockLeader(engine)
+    return LocalLeader()
+
+
+class Scheduler:
+    def __init__(
+        self,
+        jobs: list[Job],
+        session_factory: Callable[[], Session],
+        leader,
+        clock: Callable[[], datetime] = utcnow,
+    ):
+        self.jobs = jobs
+        self.session_factory = session_factory
+        self.leader = leader
+        self.clock = clock
+        self.last_run: dict[str, datetime] = {}
+        self.next_run: dict[str, datetime] = {}
+        self.leading = False
+        # Lanes tick concurrently; the leader's connection is not thread-safe.
+        self._leader_lock = threading.Lock()
+
+    @property
+    def lanes(self) -> list[str]:
+        return list(dict.fromkeys(job.lane for job in self.jobs))
+
+    def _jobs(self, lane: Optional[str]) -> list[Job]:
+        return [job for job in self.jobs if lane is None or job.lane == lane]
+
+    def due(self, now: datetime, lane: Optional[str] = None) -> list[Job]:
+        return [job for job in self._jobs(lane) if self.next_run.get(job.name, now) <= now]
+
+    def run_job(self, job: Job, now: datetime) -> JobResult:
+        started = time.perf_counter()
+        result = JobResult(name=job.name, started=now, seconds=0.0)
+        try:
+            with self.session_factory() as session:
+                result.rows = job.fn(session, now, self.last_run.get(job.name)) or 0
+            self.last_run[job.name] = now
+        except Exception as e:
+            logger.exception("scheduled job %s failed", job.name)
+            result.error = str(e)
+        result.seconds = time.perf_counter() - started
+        self.next_run[job.name] = now + job.interval
+
+        JOB_RUNS.labels(job=job.name, outcome="ok" if result.ok else "error").inc()
+        JOB_DURATION.labels(job=job.name).observe(result.seconds)
+        if result.ok:
+            JOB_ROWS.labels(job=job.name).inc(result.rows)
+            JOB_LAST_SUCCESS.labels(job=job.name).set(now.timestamp())
+        logger.info(
+            "job %s: %s rows=%d in %.3fs",
+            job.name, "ok" if result.ok else "failed", result.rows, result.seconds,
+        )
+        return result
+
+    def tick(self, lane: Optional[str] = None) -> list[JobResult]:
+        """Run every job (of `lane`, else all) that is due, if this worker is the leader."""
+        with self._leader_lock:
+            try:
+                self.leading = self.leader.is_leader()
+            except Exception:
+                logger.exception("scheduler leader election failed")
+                self.leading = False
+        if not self.leading:
+            return []
+        results = []
+        for job in self.due(self.clock(), lane):
+            # Fresh `now` per job: a slow job must not leave the next one a stale timestamp.
+            results.append(self.run_job(job, self.clock()))
+        return results
+
+    def seconds_until_next(self, poll: float, lane: Optional[str] = None) -> float:
+        if not self.leading:
+            return poll
+        now = self.clock()
+        upcoming = [self.next_run.get(job.name, now) for job in self._jobs(lane)]
+        if not upcoming:
+            return poll
+        wait = (min(upcoming) - now).total_seconds()
+        return min(max(wait, 0.0), poll)
+
+    async def _run_lane(self, lane: str, poll: float) -> None:
+        while True:
+            await run_in_threadpool(self.tick, lane)
+            await asyncio.sleep(self.seconds_until_next(poll, lane) or 0.01)
+
+    async def run_forever(self, poll: float) -> None:
+        """Tick every lane until cancelled. Non-leaders retry election every `poll` seconds."""
+        try:
+            await asyncio.gather(*(self._run_lane(lane, poll) for lane in self.lanes))
+        finally:
+            self.leader.release()
@@ -0,0 +1,168 @@
+# app/scheduler/jobs.py
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import Session
+
+import db
+from models import Course, CourseEnrollment, IdempotencyKey, Notification
+from notifications.digests import send_notification_digests
+from notifications.service import DEDUPE_INDEX, DEDUPE_WHERE, enrollment_key, observe
+from analytics.rollups import refresh_recent
+from courses.progress import fold_learning_events
+from users.deletion import process_user_jobs
+from users.export import process_data_exports
+from users.status import expire_invites, reconcile_statuses
+from .core import Job, Scheduler, leader_for
+
+SCHEDULER_POLL_SECONDS = float(os.getenv("SCHEDULER_POLL_SECONDS", "15"))
+JOB_BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE", "5000"))
+DEADLINE_REMINDER_HOURS = float(os.getenv("DEADLINE_REMINDER_HOURS", "48"))
+
+# Enrollments that still have work left; their deadlines are worth watching.
+OPEN_STATUSES = ("approved", "assigned")
+
+
+def _interval(name: str, default: float) -> timedelta:
+    return timedelta(seconds=float(os.getenv(f"JOB_{name.upper()}_SECONDS", default)))
+
+
+def _expire_invites(session: Session, now: datetime, last_run: Optional[datetime]) -> int:
+    return expire_invites(session, since=last_run, now=now)
+
+
+def _reconcile_statuses(session: Session, now: datetime, last_run: Optional[datetime]) -> int:
+    return reconcile_statuses(session, now=now)
+
+
+def _due_batch(*conditions):
+    """Ids of the next JOB_BATCH_SIZE matching enrollments, skipping rows
+    a request is currently updating instead of waiting on them."""
+    return (
+        select(CourseEnrollment.id)
+        .where(CourseEnrollment.status.in_(OPEN_STATUSES), CourseEnrollment.completed_at.is_(None), *conditions)
+        .order_by(CourseEnrollment.id)
+        .limit(JOB_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+
+
+def flag_overdue_enrollments(session: Session, now: datetime, last_run: Optional[datetime] = None) -> int:
+    """Stamp overdue_at on open enrollments whose deadline has passed."""
+    flagged = 0
+    while True:
+        batch = _due_batch(
+            CourseEnrollment.overdue_at.is_(None),
+            CourseEnrollment.deadline.is_not(None),
+            CourseEnrollment.deadline < now,
+        )
+        result = session.execute(
+            update(CourseEnrollment)
+            .where(CourseEnrollment.id.in_(batch))
+            .values(overdue_at=now)
+        )
+        session.commit()
+        flagged += result.rowcount
+        if result.rowcount < JOB_BATCH_SIZE:
+            return flagged
+
+
+def send_deadline_reminders(session: Session, now: datetime, last_run: Optional[datetime] = None) -> int:
+    """One reminder per open enrollment due within DEADLINE_REMINDER_HOURS.
+
+    reminder_sent_at is stamped in the same transaction as the notification
+    insert, so a crash between batches never sends a reminder twice.
+    """
+    horizon = now + timedelta(hours=DEADLINE_REMINDER_HOURS)
+    sent = 0
+    while True:
+        batch = _due_batch(
+            CourseEnrollment.reminder_sent_at.is_(None),
+            CourseEnrollment.overdue_at.is_(None),
+            CourseEnrollment.deadline >= now,
+            CourseEnrollment.deadline <= horizon,
+        )
+        due = session.execute(
+            update(CourseEnrollment)
+            .where(CourseEnrollment.id.in_(batch))
+            .values(reminder_sent_at=now)
+            .returning(
+                CourseEnrollment.id,
+                CourseEnrollment.employee_id,
+                CourseEnrollment.course_id,
+                CourseEnrollment.deadline,
+            )
+        ).all()
+        if due:
+            course_ids = {row.course_id for row in due}
+            names = dict(session.execute(select(Course.id, Course.name).where(Course.id.in_(course_ids))).all())
+            created = session.execute(
+                pg_insert(Notification)
+                .values([
+                    {
+                        "user_id": row.employee_id,
+                        "title": "Deadline approaching",
+                        "body": f"{names.get(row.course_id, 'Your course')} is due on {row.deadline:%Y-%m-%d}.",
+                        "type": "deadline_reminder",
+                        "is_read": False,
+                        "meta": {
+                            "enrollment_id": row.id,
+                            "course_id": row.course_id,
+                            "deadline": row.deadline.isoformat(),
+                        },
+                        "dedupe_key": enrollment_key(row.id),
+                    }
+                    for row in due
+                ])
+                .on_conflict_do_nothing(index_elements=DEDUPE_INDEX, index_where=DEDUPE_WHERE)
+                .returning(Notification.id)
+            ).all()
+        session.commit()
+        if due:
+            observe("deadline_reminder", "created", len(created))
+            observe("deadline_reminder", "duplicate", len(due) - len(created))
+        sent += len(due)
+        if len(due) < JOB_BATCH_SIZE:
+            return sent
+
+
+def purge_idempotency_keys(session: Session, now: datetime, last_run: Optional[datetime] = None) -> int:
+    """Delete expired Idempotency-Key records (idempotency/), a batch at a time."""
+    purged = 0
+    while True:
+        batch = (
+            select(IdempotencyKey.user_id, IdempotencyKey.key)
+            .where(IdempotencyKey.expires_at < now)
+            .limit(JOB_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        result = session.execute(
+            delete(IdempotencyKey).where(tuple_(IdempotencyKey.user_id, IdempotencyKey.key).in_(batch))
+        )
+        session.commit()
+        purged += result.rowcount
+        if result.rowcount < JOB_BATCH_SIZE:
+            return purged
+
+
+JOBS = [
+    Job("expire_invites", _interval("expire_invites", 60), _expire_invites),
+    Job("reconcile_user_statuses", _interval("reconcile_user_statuses", 3600), _reconcile_statuses),
+    Job("flag_overdue_enrollments", _interval("flag_overdue_enrollments", 300), flag_overdue_enrollments),
+    Job("deadline_reminders", _interval("deadline_reminders", 900), send_deadline_reminders),
+    Job("fold_learning_events", _interval("fold_learning_events", 5), fold_learning_events),
+    Job("rollup_enrollment_stats", _interval("rollup_enrollment_stats", 300), refresh_recent),
+    Job("purge_idempotency_keys", _interval("purge_idempotency_keys", 3600), purge_idempotency_keys),
+    # Budgeted bulk work, each on its own lane (scheduler/core.py).
+    Job("process_user_jobs", _interval("process_user_jobs", 10), process_user_jobs, lane="user_jobs"),
+    Job("process_data_exports", _interval("process_data_exports", 10), process_data_exports, lane="exports"),
+    Job("send_notification_digests", _interval("send_notification_digests", 300), send_notification_digests),
+]
+
+
+def build_scheduler() -> Scheduler:
+    return Scheduler(JOBS, session_factory=lambda: Session(db.engine), leader=leader_for(db.engine))
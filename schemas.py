@@ -1,7 +1,7 @@
 # app/schemas.py
-from typing import Optional, Any, List
-from datetime import datetime
-from pydantic import BaseModel, EmailStr, Field, constr
+from typing import Optional, Any, List, Literal
+from datetime import datetime, timezone
+from pydantic import BaseModel, EmailStr, Field, constr, field_validator
 from enum import Enum
 
 MAX_PWD_BYTES = 72
@@ -37,6 +37,126 @@ class UserOut(BaseModel):
     class Config:
         from_attributes = True
 
+class UserDirectoryEntryOut(BaseModel):
+    id: int
+    email: EmailStr
+    name: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    role: str
+    status: UserStatus
+    is_active: bool
+    manager_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    score: Optional[float] = None  # search relevance (Postgres only)
+
+class UserDirectoryPageOut(BaseModel):
+    items: List[UserDirectoryEntryOut]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next page
+
+class HrisSyncErrorOut(BaseModel):
+    line: Optional[int] = None  # None: the row parsed but could not be applied
+    email: Optional[str] = None
+    error: str
+
+class HrisSyncReportOut(BaseModel):
+    applied: bool
+    created: int
+    updated: int
+    deactivated: int
+    reactivated: int
+    manager_changes: int
+    unchanged: int
+    skipped_admins: int
+    skipped_inactive: int
+    errors: List[HrisSyncErrorOut]
+    samples: dict[str, list]
+
+class UserBulkJobIn(BaseModel):
+    action: Literal["deactivate", "delete"]
+    user_ids: List[int] = Field(min_length=1, max_length=100_000)
+
+class UserBulkJobOut(BaseModel):
+    id: int
+    action: str
+    status: str
+    total: int = 0
+    position: int       # users finished so far (done + skipped)
+    done: int
+    skipped: int        # already gone, or kept as the last active admin
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    class Config:
+        from_attributes = True
+
+# One export is built in one scheduler run, so its size bounds that run;
+# larger requests are split into several exports by the caller.
+EXPORT_MAX_USERS = 200
+
+class DataExportIn(BaseModel):
+    user_ids: List[int] = Field(min_length=1, max_length=EXPORT_MAX_USERS)
+
+class DataExportOut(BaseModel):
+    id: int
+    status: str
+    total: int = 0
+    position: int
+    size_bytes: Optional[int] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    download_url: Optional[str] = None  # set once status is "done"
+    class Config:
+        from_attributes = True
+
+WebhookEventType = Literal[
+    "enrollment.requested", "enrollment.approved", "enrollment.rejected", "enrollment.assigned"
+]
+
+class WebhookEndpointIn(BaseModel):
+    url: str = Field(pattern=r"^https?://", max_length=2000)
+    event_types: List[WebhookEventType] = Field(min_length=1)
+    max_concurrency: int = Field(default=4, ge=1, le=32)
+    batch_size: int = Field(default=1, ge=1, le=100)  # > 1 only if the receiver accepts {"events": [...]}
+
+class WebhookEndpointUpdate(BaseModel):
+    url: Optional[str] = Field(default=None, pattern=r"^https?://", max_length=2000)
+    event_types: Optional[List[WebhookEventType]] = Field(default=None, min_length=1)
+    max_concurrency: Optional[int] = Field(default=None, ge=1, le=32)
+    batch_size: Optional[int] = Field(default=None, ge=1, le=100)
+    is_active: Optional[bool] = None
+
+class WebhookEndpointOut(BaseModel):
+    id: int
+    url: str
+    event_types: List[str]
+    is_active: bool
+    max_concurrency: int
+    batch_size: int
+    consecutive_failures: int
+    circuit_open_until: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    secret: Optional[str] = None  # only in the response that creates the endpoint
+    class Config:
+        from_attributes = True
+
+class WebhookDeliveryOut(BaseModel):
+    id: int
+    event_id: str
+    event_type: str
+    status: str
+    attempts: int
+    next_attempt_at: datetime
+    last_status_code: Optional[int] = None
+    last_error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    delivered_at: Optional[datetime] = None
+    class Config:
+        from_attributes = True
+
 class EducationLevelOut(BaseModel):
     id: int
     name: str
@@ -56,6 +176,7 @@ class CityOut(BaseModel):
     id: int
     country_id: int
     name: str
+    population: int = 0
     class Config:
         from_attributes = True
 
@@ -109,6 +230,7 @@ class UserProfileOut(BaseModel):
     attribute8: Optional[str] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
+    version: Optional[int] = None
     class Config:
         from_attributes = True
 
@@ -150,6 +272,14 @@ class LoginOut(BaseModel):
     token_type: str = "bearer"
     user: UserOut
 
+class RefreshIn(BaseModel):
+    refresh_token: str
+
+class TokenPairOut(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+
 class CourseOut(BaseModel):
     id: int
     name: str
@@ -188,6 +318,11 @@ class CourseEnrollmentOut(BaseModel):
     approved_at: Optional[datetime] = None
     approved_by: Optional[int] = None
     deadline: Optional[datetime] = None
+    overdue_at: Optional[datetime] = None
+    progress_percent: int = 0
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    last_activity_at: Optional[datetime] = None
     course: Optional[CourseOut] = None
     class Config:
         from_attributes = True
@@ -196,6 +331,10 @@ class TeamEnrollmentOut(BaseModel):
     id: int
     status: str
     deadline: Optional[datetime] = None
+    overdue_at: Optional[datetime] = None
+    progress_percent: int = 0
+    completed_at: Optional[datetime] = None
+    last_activity_at: Optional[datetime] = None
     requested_at: datetime
     employee: UserOut
     course: CourseOut
@@ -210,6 +349,7 @@ class NotificationOut(BaseModel):
     type: str
     is_read: bool
     created_at: datetime
+    event_count: int = 1  # > 1: a digest of that many events
     meta: Optional[dict[str, Any]] = Field(
         default=None,
         serialization_alias="metadata",
@@ -217,3 +357,79 @@ class NotificationOut(BaseModel):
     )
     class Config:
         from_attributes = True
+
+
+class DashboardOut(BaseModel):
+    """GET /api/v1/dashboard; sections not asked for via `fields` are omitted."""
+    me: Optional[UserOut] = None
+    profile: Optional[UserProfileOut] = None
+    enrollments: Optional[list[CourseEnrollmentOut]] = None
+    notifications: Optional[list[NotificationOut]] = None
+    unread_notifications: Optional[int] = None
+    courses: Optional[list[CourseOut]] = None
+
+
+class RecommendedCourseOut(BaseModel):
+    course: CourseOut
+    score: float
+    matched: list[str] = []  # skill:/competency: terms shared with the user's interests
+
+
+LEARNING_VERBS = ("started", "progressed", "completed")
+
+
+class LearningStatementIn(BaseModel):
+    """An xAPI-style statement, reduced to what progress tracking needs. The
+    actor is the authenticated user; `verb` may be a bare name or an xAPI
+    verb IRI such as http://adlnet.gov/expapi/verbs/completed."""
+    verb: str
+    course_id: int
+    progress: Optional[float] = Field(default=None, ge=0, le=100)
+    timestamp: Optional[datetime] = None
+
+    @field_validator("verb")
+    @classmethod
+    def _verb(cls, value: str) -> str:
+        verb = value.rstrip("/").rsplit("/", 1)[-1].lower()
+        if verb not in LEARNING_VERBS:
+            raise ValueError(f"verb must be one of {', '.join(LEARNING_VERBS)}")
+        return verb
+
+    @field_validator("timestamp")
+    @classmethod
+    def _utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        return value.replace(tzinfo=timezone.utc) if value and value.tzinfo is None else value
+
+
+class LearningBatchOut(BaseModel):
+    accepted: int
+
+
+class CoursePopularityOut(BaseModel):
+    course_id: int
+    name: Optional[str] = None
+    requested: int
+    assigned: int
+    approved: int
+    completed: int
+
+
+class ManagerApprovalLatencyOut(BaseModel):
+    manager_id: Optional[int] = None   # None: employees without a manager
+    manager_name: Optional[str] = None
+    approved: int
+    avg_approval_hours: Optional[float] = None
+
+
+class ManagerRejectionsOut(BaseModel):
+    manager_id: Optional[int] = None
+    manager_name: Optional[str] = None
+    approved: int
+    rejected: int
+    rejection_rate: Optional[float] = None
+
+
+class TeamOverdueOut(BaseModel):
+    manager_id: Optional[int] = None
+    manager_name: Optional[str] = None
+    overdue: int
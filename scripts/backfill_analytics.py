@@ -0,0 +1,45 @@
+"""Rebuild enrollment_daily_stats for history before the live window.
+
+The scheduler's rollup_enrollment_stats job keeps the last
+ANALYTICS_WINDOW_DAYS days current; run this once after deploying the
+analytics migration (or after changing the rollup definition) to fill in
+everything older. It reads course_enrollments in primary-key chunks, one
+short transaction each, into a staging table that replaces the old
+history in one final transaction, so it can run against a live database.
+
+Usage:
+    python scripts/backfill_analytics.py [--chunk 20000]
+"""
+import argparse
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlmodel import Session  # noqa: E402
+
+import db  # noqa: E402
+from analytics.rollups import ANALYTICS_BACKFILL_CHUNK, backfill, refresh_recent, window_start  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk", type=int, default=ANALYTICS_BACKFILL_CHUNK, help="enrollment ids per transaction")
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc)
+    with Session(db.engine) as session:
+        backfill(
+            session,
+            until=window_start(now),
+            chunk=args.chunk,
+            on_chunk=lambda done, total: print(f"\r{done}/{total} enrollments", end="", file=sys.stderr),
+        )
+        print(file=sys.stderr)
+        rows = refresh_recent(session, now)
+    print(f"backfilled history before {window_start(now)}; {rows} rollup rows in the live window")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""HTTP load test and benchmark for the API.
+
+Drives the employee (login, courses, enroll, my enrollments, notifications,
+profile) and manager (pending, approve, team) flows with concurrent virtual
+users and writes per-endpoint latency percentiles, throughput and
+queries-per-request to JSON, so runs can be compared across commits.
+
+By default `main.app` is booted in-process (ASGI transport) against
+DATABASE_URL; pass --base-url to hit a running server instead. SQL statement
+counts come from the `Server-Timing` header set by RequestTimingMiddleware.
+
+    python scripts/seed_dummy_data.py --users 2000 --courses 300 --enrollments 20000 --prefix bench
+    python scripts/bench_api.py run --prefix bench --vus 20 --duration 30
+    python scripts/bench_api.py compare bench-results/abc123.json bench-results/def456.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+from sqlalchemy import select
+
+repo_root = Path(__file__).resolve().parents[1]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+_QUERIES_RE = re.compile(r"queries=(\d+)")
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.queries: dict[str, list[int]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.recording = False
+
+    def add(self, name: str, elapsed: float, resp: httpx.Response | None):
+        if not self.recording:
+            return
+        self.samples[name].append(elapsed)
+        if resp is None or resp.status_code >= 400:
+            self.errors[name] += 1
+        match = _QUERIES_RE.search(resp.headers.get("server-timing", "")) if resp is not None else None
+        if match:
+            self.queries[name].append(int(match.group(1)))
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples: list[float], queries: list[int], errors: int, wall: float) -> dict:
+    values = sorted(samples)
+    return {
+        "count": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / wall, 2) if wall else 0.0,
+        "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+        "queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+async def _call(client: httpx.AsyncClient, rec: Recorder, name: str, method: str, url: str, **kw):
+    started = time.perf_counter()
+    resp = None
+    try:
+        resp = await client.request(method, url, **kw)
+    except httpx.HTTPError:
+        pass
+    rec.add(name, time.perf_counter() - started, resp)
+    return resp
+
+
+async def _login(client, rec, email: str, password: str) -> dict | None:
+    resp = await _call(
+        client, rec, "POST /api/v1/auth/login", "POST", "/api/v1/auth/login",
+        data={"username": email, "password": password},
+    )
+    if resp is None or resp.status_code != 200:
+        return None
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+async def employee_flow(client, rec, rng: random.Random, email: str, password: str, course_ids, stop: float):
+    headers = await _login(client, rec, email, password)
+    if headers is None:
+        return
+    await _call(client, rec, "GET /api/v1/auth/me", "GET", "/api/v1/auth/me", headers=headers)
+    while time.perf_counter() < stop:
+        await _call(client, rec, "GET /api/v1/courses/", "GET", "/api/v1/courses/", headers=headers)
+        course_id = rng.choice(course_ids)
+        await _call(
+            client, rec, "POST /api/v1/courses/{course_id}/enroll", "POST",
+            f"/api/v1/courses/{course_id}/enroll", headers=headers,
+        )
+        await _call(client, rec, "GET /api/v1/enrollments/me", "GET", "/api/v1/enrollments/me", headers=headers)
+        await _call(
+            client, rec, "GET /api/v1/enrollments/notifications", "GET",
+            "/api/v1/enrollments/notifications", headers=headers,
+        )
+        await _call(client, rec, "GET /api/v1/profiles/me", "GET", "/api/v1/profiles/me", headers=headers)
+        await _call(
+            client, rec, "PUT /api/v1/profiles/me", "PUT", "/api/v1/profiles/me",
+            headers=headers, json={"bio": f"bench {rng.random():.6f}"},
+        )
+
+
+async def manager_flow(client, rec, rng: random.Random, email: str, password: str, course_ids, stop: float):
+    headers = await _login(client, rec, email, password)
+    if headers is None:
+        return
+    while time.perf_counter() < stop:
+        resp = await _call(
+            client, rec, "GET /api/v1/enrollments/pending", "GET",
+            "/api/v1/enrollments/pending", headers=headers,
+        )
+        pending = resp.json() if resp is not None and resp.status_code == 200 else []
+        if pending:
+            enrollment = rng.choice(pending)
+            await _call(
+                client, rec, "POST /api/v1/enrollments/{enrollment_id}/approve", "POST",
+                f"/api/v1/enrollments/{enrollment['id']}/approve", headers=headers,
+            )
+        await _call(client, rec, "GET /api/v1/enrollments/team", "GET", "/api/v1/enrollments/team", headers=headers)
+        await _call(
+            client, rec, "GET /api/v1/enrollments/notifications", "GET",
+            "/api/v1/enrollments/notifications", headers=headers,
+        )
+
+
+def _load_accounts(prefix: str):
+    from sqlmodel import Session
+    from db import engine
+    from models import Course, User
+
+    with Session(engine) as session:
+        users = session.execute(
+            select(User.email, User.role)
+            .where(User.email.like(f"{prefix}.%"), User.is_active == True)  # noqa: E712
+            .order_by(User.id)
+        ).all()
+        course_ids = session.execute(
+            select(Course.id).where(Course.is_active == True).order_by(Course.id)  # noqa: E712
+        ).scalars().all()
+    managers = [email for email, role in users if role == "manager"]
+    employees = [email for email, role in users if role == "employee"]
+    return managers, employees, course_ids
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=repo_root, capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run_benchmark(args) -> dict:
+    managers, employees, course_ids = _load_accounts(args.prefix)
+    if not employees or not managers or not course_ids:
+        raise SystemExit(f"No seeded data for prefix '{args.prefix}'; run scripts/seed_dummy_data.py first.")
+
+    if args.base_url:
+        transport = None
+        base_url = args.base_url
+    else:
+        import main
+
+        transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+        base_url = "http://bench"
+
+    rng = random.Random(args.seed)
+    rec = Recorder()
+    manager_vus = max(1, round(args.vus * args.manager_share))
+    employee_vus = max(1, args.vus - manager_vus)
+
+    limits = httpx.Limits(max_connections=args.vus * 2)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60, limits=limits) as client:
+        async def run_phase(seconds: float):
+            stop = time.perf_counter() + seconds
+            tasks = [
+                employee_flow(client, rec, random.Random(rng.random()), rng.choice(employees),
+                              args.password, course_ids, stop)
+                for _ in range(employee_vus)
+            ] + [
+                manager_flow(client, rec, random.Random(rng.random()), rng.choice(managers),
+                             args.password, course_ids, stop)
+                for _ in range(manager_vus)
+            ]
+            await asyncio.gather(*tasks)
+
+        if args.warmup:
+            await run_phase(args.warmup)
+        rec.recording = True
+        started = time.perf_counter()
+        await run_phase(args.duration)
+        wall = time.perf_counter() - started
+
+    endpoints = {
+        name: summarize(rec.samples[name], rec.queries.get(name, []), rec.errors.get(name, 0), wall)
+        for name in sorted(rec.samples)
+    }
+    all_samples = [s for values in rec.samples.values() for s in values]
+    all_queries = [q for values in rec.queries.values() for q in values]
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "mode": "http" if args.base_url else "in-process",
+            "python": platform.python_version(),
+            "vus": args.vus,
+            "manager_vus": manager_vus,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "seed": args.seed,
+            "prefix": args.prefix,
+            "scale": {"managers": len(managers), "employees": len(employees), "courses": len(course_ids)},
+        },
+        "total": summarize(all_samples, all_queries, sum(rec.errors.values()), wall),
+        "endpoints": endpoints,
+    }
+
+
+def print_report(result: dict) -> None:
+    print(f"{'endpoint':<50} {'n':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'q/req':>6}")
+    rows = list(result["endpoints"].items()) + [("TOTAL", result["total"])]
+    for name, s in rows:
+        qpr = "-" if s["queries_per_request"] is None else f"{s['queries_per_request']:.1f}"
+        print(
+            f"{name:<50} {s['count']:>7} {s['errors']:>5} {s['throughput_rps']:>8.1f} "
+            f"{s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f} {qpr:>6}"
+        )
+
+
+def compare(base: dict, head: dict, metric: str, threshold: float) -> list[str]:
+    """Return the endpoints whose `metric` regressed by more than `threshold` (a ratio)."""
+    regressions = []
+    print(f"{'endpoint':<50} {'base':>9} {'head':>9} {'delta':>8}")
+    for name in sorted(set(base["endpoints"]) | set(head["endpoints"])):
+        b = base["endpoints"].get(name, {}).get(metric)
+        h = head["endpoints"].get(name, {}).get(metric)
+        if b is None or h is None:
+            print(f"{name:<50} {b if b is not None else '-':>9} {h if h is not None else '-':>9} {'':>8}")
+            continue
+        delta = (h - b) / b if b else 0.0
+        flag = " !" if delta > threshold else ""
+        print(f"{name:<50} {b:>9.2f} {h:>9.2f} {delta:>+7.1%}{flag}")
+        if delta > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Run the load test and write a JSON result")
+    run.add_argument("--prefix", default="bench", help="Seeded dataset prefix (see seed_dummy_data.py)")
+    run.add_argument("--password", default="Password123!")
+    run.add_argument("--vus", type=int, default=10, help="Concurrent virtual users")
+    run.add_argument("--manager-share", type=float, default=0.2, help="Share of VUs running the manager flow")
+    run.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    run.add_argument("--warmup", type=float, default=5, help="Unmeasured warm-up seconds")
+    run.add_argument("--seed", type=int, default=7)
+    run.add_argument("--base-url", default=None, help="Benchmark a running server instead of in-process")
+    run.add_argument("--out", default=None, help="Result path (default bench-results/<commit>.json)")
+
+    cmp_ = sub.add_parser("compare", help="Compare two JSON results")
+    cmp_.add_argument("base")
+    cmp_.add_argument("head")
+    cmp_.add_argument("--metric", default="p95_ms")
+    cmp_.add_argument("--threshold", type=float, default=0.10, help="Allowed relative regression")
+
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        base = json.loads(Path(args.base).read_text())
+        head = json.loads(Path(args.head).read_text())
+        regressions = compare(base, head, args.metric, args.threshold)
+        if regressions:
+            raise SystemExit(f"{len(regressions)} endpoint(s) regressed on {args.metric}")
+        return
+
+    result = asyncio.run(run_benchmark(args))
+    print_report(result)
+    out = Path(args.out or repo_root / "bench-results" / f"{result['meta']['commit']}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2))
+    print(f"Wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Precompress static assets ahead of deploy.
+
+Writes `<file>.br` (brotli quality 11, if the brotli package is installed)
+and `<file>.gz` (gzip -9) next to every compressible file in the static
+directory, skipping variants that are already up to date or would not be
+smaller. The server picks these up at startup (assets/static.py) instead
+of compressing in memory, and serves large files' variants from disk.
+
+Usage:
+    python scripts/build_static.py [--dir static] [--min-size 256]
+"""
+import argparse
+import os
+import sys
+from mimetypes import guess_type
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from assets.static import ENCODINGS, STATIC_EXCLUDE, SUFFIXES, brotli, compress, compressible  # noqa: E402
+
+
+def build(directory: Path, min_size: int) -> None:
+    total_in = total_out = 0
+    for path in sorted(directory.rglob("*")):
+        if not path.is_file() or path.suffix in (".br", ".gz"):
+            continue
+        if path.relative_to(directory).parts[0] in STATIC_EXCLUDE:
+            continue
+        media_type = guess_type(path.name)[0] or "application/octet-stream"
+        size = path.stat().st_size
+        if size < min_size or not compressible(media_type):
+            continue
+        data = path.read_bytes()
+        for encoding in ENCODINGS:
+            if encoding == "br" and brotli is None:
+                continue
+            target = path.with_name(path.name + SUFFIXES[encoding])
+            if target.exists() and target.stat().st_mtime >= path.stat().st_mtime:
+                continue
+            out = compress(data, encoding)
+            if len(out) >= size:
+                continue
+            tmp = target.with_name(target.name + ".tmp")
+            tmp.write_bytes(out)
+            os.replace(tmp, target)
+            total_in += size
+            total_out += len(out)
+            print(f"{target.relative_to(directory)}: {size} -> {len(out)} bytes")
+    if brotli is None:
+        print("brotli not installed; wrote gzip variants only", file=sys.stderr)
+    if total_in:
+        print(f"compressed {total_in} -> {total_out} bytes")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default="static")
+    parser.add_argument("--min-size", type=int, default=256, help="skip files smaller than this")
+    args = parser.parse_args()
+    build(Path(args.dir), args.min_size)
+
+
+if __name__ == "__main__":
+    main()
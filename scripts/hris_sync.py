@@ -0,0 +1,43 @@
+"""Provision users from a full HRIS snapshot (CSV or JSONL).
+
+Prints the diff against users/employee_managers as JSON; nothing is
+written unless --apply is given. See users/hris.py for the rules.
+
+Usage:
+    python scripts/hris_sync.py employees.csv [--apply] [--force]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlmodel import Session  # noqa: E402
+
+import db  # noqa: E402
+from users.hris import SyncRefused, open_snapshot, sync_snapshot  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("snapshot", type=Path)
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="defaults to the file extension")
+    parser.add_argument("--apply", action="store_true", help="write the changes (default: dry run)")
+    parser.add_argument("--force", action="store_true", help="apply even past the deactivation limit")
+    args = parser.parse_args()
+
+    fmt = args.format or ("jsonl" if args.snapshot.suffix.lower() in (".jsonl", ".ndjson") else "csv")
+    started = time.perf_counter()
+    with Session(db.engine) as session, args.snapshot.open("rb") as fh:
+        try:
+            report = sync_snapshot(session, open_snapshot(fh), fmt, dry_run=not args.apply, force=args.force)
+        except SyncRefused as e:
+            sys.exit(f"refused: {e}")
+    print(json.dumps(report, indent=2))
+    print(f"{'applied' if report['applied'] else 'dry run'} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,24 @@
+"""Synthetic data generator for load testing.
+
+Creates a deterministic (per --seed) dataset of users arranged in a
+multi-level manager tree, a course catalog and enrollments/notifications
+with realistic status and date distributions. Rows are generated lazily and
+written with multi-row INSERTs in batches, so memory stays flat and a million
+enrollments take a few minutes on a local Postgres.
+
+    python scripts/seed_dummy_data.py --users 50000 --courses 2000 --enrollments 1000000
+"""
 import argparse
+import math
+import random
 import sys
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-import random
-from datetime import datetime, timezone
 
-from sqlmodel import Session, select
+from sqlalchemy import func, insert, select
+from sqlmodel import Session
 
 repo_root = Path(__file__).resolve().parents[1]
 if str(repo_root) not in sys.path:
@@ -22,6 +36,7 @@ from models import (
     Notification,
     User,
 )
+from security import hash_password
 
 
 PROVIDERS = [
@@ -111,16 +126,30 @@ ADJECTIVES = [
     "High-Impact",
 ]
 
+FIRST_NAMES = [
+    "Amina", "Omar", "Lea", "Hugo", "Sara", "Youssef", "Emma", "Lucas", "Nour", "Adam",
+    "Ines", "Karim", "Chloe", "Rami", "Maya", "Louis", "Lina", "Tom", "Hana", "Noah",
+]
 
-def get_or_create_by_name(session: Session, model, name: str):
-    existing = session.exec(select(model).where(model.name == name)).first()
-    if existing:
-        return existing
-    obj = model(name=name)
-    session.add(obj)
-    session.commit()
-    session.refresh(obj)
-    return obj
+LAST_NAMES = [
+    "Haddad", "Martin", "Nasser", "Bernard", "Khoury", "Dubois", "Saleh", "Moreau",
+    "Fares", "Laurent", "Aoun", "Simon", "Daher", "Michel", "Karam", "Garcia",
+]
+
+# Share of enrollments per status; roughly what the production workflow shows.
+STATUS_WEIGHTS = {
+    "pending": 0.20,
+    "approved": 0.45,
+    "assigned": 0.20,
+    "rejected": 0.15,
+}
+
+# Share of users per account state; pending users are open invites.
+USER_STATE_WEIGHTS = {
+    "active": 0.90,
+    "pending": 0.05,
+    "inactive": 0.05,
+}
 
 
 def slugify(text: str) -> str:
@@ -134,181 +163,333 @@ def slugify(text: str) -> str:
     )
 
 
-def seed_courses(session: Session, target_count: int, manager_id: int | None):
-    provider_map = {p: get_or_create_by_name(session, CourseProvider, p) for p in PROVIDERS}
-    classification_map = {
-        c: get_or_create_by_name(session, CourseClassification, c) for c in CLASSIFICATIONS
-    }
-    flag_map = {f: get_or_create_by_name(session, CourseFlag, f) for f in FLAGS}
-    unit_map = {u: get_or_create_by_name(session, CourseDurationUnit, u) for u in DURATION_UNITS}
-
-    existing_courses = session.exec(select(Course)).all()
-    existing_names = {c.name for c in existing_courses}
-    courses_needed = max(target_count - len(existing_courses), 0)
-
-    if courses_needed == 0:
-        return
-
-    random.seed(7)
-    for idx in range(courses_needed):
-        topic = random.choice(TOPICS)
-        adjective = random.choice(ADJECTIVES)
-        name = f"{adjective} {topic} {idx + 1}"
-        if name in existing_names:
-            name = f"{name}X"
-        existing_names.add(name)
-
-        provider_name = random.choice(PROVIDERS)
-        classification_name = random.choice(CLASSIFICATIONS)
-        flag_name = random.choice(FLAGS)
-        unit_name = random.choice(DURATION_UNITS)
-
-        duration = random.choice([30, 45, 60, 90, 120, 3, 5, 8, 12])
-        if unit_name in {"weeks", "months", "years"}:
-            duration = random.choice([1, 2, 3, 6, 12])
-
-        assigned_by_manager = random.choice([True, False])
-        skills = random.sample(SKILLS, k=random.randint(2, 4))
-        competencies = random.sample(COMPETENCIES, k=random.randint(1, 2))
-        slug = slugify(name)
-
-        course = Course(
-            name=name,
-            description=f"{name} course designed to build {skills[0].lower()} skills.",
-            provider=provider_name,
-            provider_id=provider_map[provider_name].id,
-            link=f"https://example.com/courses/{slug}",
-            image=f"https://picsum.photos/seed/{slug}/600/400",
-            duration=duration,
-            duration_unit_id=unit_map[unit_name].id,
-            skills=skills,
-            competencies=competencies,
-            classification_id=classification_map[classification_name].id,
-            flag_id=flag_map[flag_name].id,
-            is_active=True,
-            assigned_by_manager=assigned_by_manager,
-            assigned_by_manager_id=manager_id if assigned_by_manager else None,
-            attribute1=random.choice(["Level 1", "Level 2", "Level 3"]),
-            attribute2=random.choice(["English", "Arabic", "French"]),
-            attribute3=random.choice(["Video", "Blended", "Workshop"]),
-            attribute4=random.choice(["Internal", "External"]),
-            attribute5=random.choice(["Short", "Medium", "Long"]),
-            attribute6=random.choice(["Self-paced", "Instructor-led"]),
-            attribute7=random.choice(["Certificate", "No certificate"]),
-        )
-        session.add(course)
-
+def _batched(rows, size: int):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert_returning(session: Session, table, rows: list[dict], *cols):
+    """Multi-row INSERT ... RETURNING, results in the same order as `rows`."""
+    stmt = insert(table).returning(*cols, sort_by_parameter_order=True)
+    return session.execute(stmt, rows).all()
+
+
+def _ensure_names(session: Session, model, names: list[str]) -> dict[str, int]:
+    table = model.__table__
+    existing = dict(session.execute(select(table.c.name, table.c.id)).all())
+    missing = [{"name": n} for n in names if n not in existing]
+    if missing:
+        for name, id_ in _insert_returning(session, table, missing, table.c.name, table.c.id):
+            existing[name] = id_
+    return existing
+
+
+def _zipf_cum_weights(n: int, s: float) -> list[float]:
+    """Cumulative Zipf(s) weights: a few courses are far more popular than the tail."""
+    total = 0.0
+    cum = []
+    for rank in range(1, n + 1):
+        total += 1.0 / rank ** s
+        cum.append(total)
+    return cum
+
+
+def seed_users(session: Session, rng: random.Random, args, now: datetime):
+    """Insert users and return (managers, employees) as lists of (id, state)."""
+    password_hash = hash_password(args.password)
+    manager_count = max(1, math.ceil(args.users / (args.span + 1)))
+    states = list(USER_STATE_WEIGHTS)
+    state_weights = list(USER_STATE_WEIGHTS.values())
+
+    def rows():
+        for i in range(args.users):
+            # Managers are always active: the tree must be able to approve.
+            role = "manager" if i < manager_count else "employee"
+            state = "active" if role == "manager" else rng.choices(states, state_weights)[0]
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            created = now - timedelta(days=rng.uniform(0, args.days * 2))
+            row = {
+                "email": f"{args.prefix}.{role}{i}@example.com",
+                "name": f"{first} {last}",
+                "role": role,
+                "status": state,
+                "password_hash": password_hash,
+                "is_active": state == "active",
+                "created_at": created,
+                "updated_at": created,
+                "email_verified_at": created,
+                "invited_at": None,
+                "invite_expires_at": None,
+            }
+            if state == "pending":
+                row["password_hash"] = None
+                row["email_verified_at"] = None
+                row["invited_at"] = now - timedelta(hours=rng.uniform(0, 24))
+                row["invite_expires_at"] = row["invited_at"] + timedelta(hours=48)
+            yield row
+
+    table = User.__table__
+    managers, employees = [], []
+    for batch in _batched(rows(), args.batch_size):
+        ids = _insert_returning(session, table, batch, table.c.id)
+        for row, (user_id,) in zip(batch, ids):
+            target = managers if row["role"] == "manager" else employees
+            target.append((user_id, row["status"]))
     session.commit()
-
-
-def seed_enrollments_and_notifications(
-    session: Session, employee: User | None, manager: User | None
-):
-    if not employee or not manager:
-        return
-
-    rel = session.exec(
-        select(EmployeeManager).where(
-            EmployeeManager.employee_id == employee.id,
-            EmployeeManager.manager_id == manager.id,
-        )
-    ).first()
-    if not rel:
-        session.add(EmployeeManager(employee_id=employee.id, manager_id=manager.id))
-        session.commit()
-
-    courses = session.exec(select(Course)).all()
-    random.seed(11)
-    selected = random.sample(courses, k=min(30, len(courses)))
-
-    for course in selected:
-        enrollment = session.exec(
-            select(CourseEnrollment).where(
-                CourseEnrollment.employee_id == employee.id,
-                CourseEnrollment.course_id == course.id,
-            )
-        ).first()
-        if not enrollment:
-            enrollment = CourseEnrollment(
-                employee_id=employee.id,
-                course_id=course.id,
+    return managers, employees
+
+
+def seed_manager_tree(session: Session, rng: random.Random, args, managers, employees) -> dict[int, int]:
+    """Build a multi-level reporting tree and return {employee_id: manager_id}.
+
+    Managers form a `span`-ary tree (so depth grows with log(users)); every
+    employee reports to a randomly chosen manager.
+    """
+    reports_to: dict[int, int] = {}
+    manager_ids = [m for m, _ in managers]
+    for idx in range(1, len(manager_ids)):
+        reports_to[manager_ids[idx]] = manager_ids[(idx - 1) // args.span]
+    for employee_id, _state in employees:
+        reports_to[employee_id] = rng.choice(manager_ids)
+
+    table = EmployeeManager.__table__
+    rows = ({"employee_id": e, "manager_id": m} for e, m in reports_to.items())
+    for batch in _batched(rows, args.batch_size):
+        session.execute(insert(table), batch)
+    session.commit()
+    return reports_to
+
+
+def seed_courses(session: Session, rng: random.Random, args, manager_ids: list[int]) -> list[tuple[int, str]]:
+    provider_map = _ensure_names(session, CourseProvider, PROVIDERS)
+    classification_map = _ensure_names(session, CourseClassification, CLASSIFICATIONS)
+    flag_map = _ensure_names(session, CourseFlag, FLAGS)
+    unit_map = _ensure_names(session, CourseDurationUnit, DURATION_UNITS)
+
+    def rows():
+        for idx in range(args.courses):
+            name = f"{rng.choice(ADJECTIVES)} {rng.choice(TOPICS)} {args.prefix}-{idx + 1}"
+            provider_name = rng.choice(PROVIDERS)
+            unit_name = rng.choice(DURATION_UNITS)
+            duration = rng.choice([30, 45, 60, 90, 120, 3, 5, 8, 12])
+            if unit_name in {"weeks", "months", "years"}:
+                duration = rng.choice([1, 2, 3, 6, 12])
+            assigned_by_manager = rng.random() < 0.3
+            skills = rng.sample(SKILLS, k=rng.randint(2, 4))
+            slug = slugify(name)
+            yield {
+                "name": name,
+                "description": f"{name} course designed to build {skills[0].lower()} skills.",
+                "provider": provider_name,
+                "provider_id": provider_map[provider_name],
+                "link": f"https://example.com/courses/{slug}",
+                "image": f"https://picsum.photos/seed/{slug}/600/400",
+                "duration": duration,
+                "duration_unit_id": unit_map[unit_name],
+                "skills": skills,
+                "competencies": rng.sample(COMPETENCIES, k=rng.randint(1, 2)),
+                "classification_id": classification_map[rng.choice(CLASSIFICATIONS)],
+                "flag_id": flag_map[rng.choice(FLAGS)],
+                "is_active": rng.random() < 0.95,
+                "assigned_by_manager": assigned_by_manager,
+                "assigned_by_manager_id": rng.choice(manager_ids) if assigned_by_manager else None,
+                "attribute1": rng.choice(["Level 1", "Level 2", "Level 3"]),
+                "attribute2": rng.choice(["English", "Arabic", "French"]),
+                "attribute3": rng.choice(["Video", "Blended", "Workshop"]),
+                "attribute4": rng.choice(["Internal", "External"]),
+                "attribute5": rng.choice(["Short", "Medium", "Long"]),
+                "attribute6": rng.choice(["Self-paced", "Instructor-led"]),
+                "attribute7": rng.choice(["Certificate", "No certificate"]),
+            }
+
+    table = Course.__table__
+    courses: list[tuple[int, str]] = []
+    for batch in _batched(rows(), args.batch_size):
+        courses.extend(_insert_returning(session, table, batch, table.c.id, table.c.name))
+    session.commit()
+    return courses
+
+
+def _enrollment_rows(rng: random.Random, args, now: datetime, employees, reports_to, courses):
+    course_ids = [c for c, _ in courses]
+    cum_weights = _zipf_cum_weights(len(course_ids), args.zipf)
+    total_weight = cum_weights[-1]
+    statuses = list(STATUS_WEIGHTS)
+    status_weights = list(STATUS_WEIGHTS.values())
+    enrollable = [e for e, state in employees if state != "pending"]
+    per_user_cap = min(len(course_ids), args.max_per_user)
+    remaining = args.enrollments
+
+    for idx, employee_id in enumerate(enrollable):
+        if remaining <= 0:
+            break
+        # Re-derive the mean from what is left so the total lands on target.
+        mean = remaining / (len(enrollable) - idx)
+        count = min(per_user_cap, remaining, int(rng.expovariate(1.0 / mean) + 0.5))
+        picked: set[int] = set()
+        while len(picked) < count:
+            picked.add(course_ids[bisect_left(cum_weights, rng.random() * total_weight)])
+        remaining -= count
+
+        manager_id = reports_to.get(employee_id)
+        for course_id in picked:
+            status = rng.choices(statuses, status_weights)[0]
+            # Skew towards recent activity.
+            requested_at = now - timedelta(days=args.days * rng.random() ** 2)
+            row = {
+                "employee_id": employee_id,
+                "course_id": course_id,
+                "status": status,
+                "requested_at": requested_at,
+                "approved_at": None,
+                "approved_by": None,
+                "deadline": None,
+            }
+            if status in {"approved", "assigned"}:
+                # Approval latency is long-tailed: most within a day, some after weeks.
+                latency = timedelta(hours=min(rng.lognormvariate(math.log(12), 1.2), 24 * 60))
+                row["approved_at"] = min(requested_at + latency, now)
+                row["approved_by"] = manager_id
+            if status == "assigned":
+                row["approved_at"] = requested_at
+                row["deadline"] = requested_at + timedelta(days=rng.choice([14, 30, 45, 60, 90]))
+            yield row
+
+
+def _notification_row(rng: random.Random, now: datetime, enrollment: dict, enrollment_id: int,
+                      course_name: str, manager_id: int | None, names: dict[int, str]):
+    employee_id = enrollment["employee_id"]
+    status = enrollment["status"]
+    meta = {"course_id": enrollment["course_id"], "enrollment_id": enrollment_id}
+    if status == "pending":
+        if manager_id is None:
+            return None
+        meta["employee_id"] = employee_id
+        row = {
+            "user_id": manager_id,
+            "title": "Course enrollment request",
+            "body": f"{names.get(employee_id, 'An employee')} requested enrollment in {course_name}.",
+            "type": "enrollment_requested",
+            "created_at": enrollment["requested_at"],
+        }
+    elif status == "approved":
+        approver_name = names.get(manager_id, "your manager")
+        meta.update({"approver_id": manager_id, "approver_name": approver_name})
+        row = {
+            "user_id": employee_id,
+            "title": "Enrollment approved",
+            "body": f"Your course enrollment was approved by {approver_name}.",
+            "type": "enrollment_approved",
+            "created_at": enrollment["approved_at"],
+        }
+    elif status == "rejected":
+        meta.update({"rejector_id": manager_id, "reason": "Not a priority this quarter"})
+        row = {
+            "user_id": employee_id,
+            "title": "Enrollment Rejected",
+            "body": f"Your request for {course_name} was rejected. Reason: Not a priority this quarter",
+            "type": "enrollment_rejected",
+            "created_at": enrollment["requested_at"],
+        }
+    else:
+        manager_name = names.get(manager_id, "your manager")
+        meta.update({
+            "deadline": enrollment["deadline"].isoformat(),
+            "manager_id": manager_id,
+            "manager_name": manager_name,
+        })
+        row = {
+            "user_id": employee_id,
+            "title": "New Mission Assigned",
+            "body": f"Manager {manager_name} assigned you a new quest.",
+            "type": "quest_assigned",
+            "created_at": enrollment["approved_at"],
+        }
+    # Older notifications are much more likely to have been read.
+    age_days = (now - row["created_at"]).total_seconds() / 86400
+    row["is_read"] = rng.random() < min(0.95, 0.2 + age_days / 30)
+    row["metadata"] = meta
+    row["dedupe_key"] = f"enrollment:{enrollment_id}"
+    return row
+
+
+def seed_enrollments_and_notifications(session: Session, rng: random.Random, args, now: datetime,
+                                       employees, reports_to, courses) -> tuple[int, int]:
+    course_names = dict(courses)
+    names = dict(session.execute(select(User.__table__.c.id, User.__table__.c.name)).all())
+    enrollments_table = CourseEnrollment.__table__
+    notifications_table = Notification.__table__
+
+    enrollments = notifications = 0
+    rows = _enrollment_rows(rng, args, now, employees, reports_to, courses)
+    for batch in _batched(rows, args.batch_size):
+        ids = _insert_returning(session, enrollments_table, batch, enrollments_table.c.id)
+        notification_rows = []
+        for enrollment, (enrollment_id,) in zip(batch, ids):
+            row = _notification_row(
+                rng, now, enrollment, enrollment_id,
+                course_names[enrollment["course_id"]],
+                reports_to.get(enrollment["employee_id"]),
+                names,
             )
-
-        approved = random.choice([True, False, False])
-        if approved:
-            enrollment.status = "approved"
-            enrollment.approved_at = datetime.now(timezone.utc)
-            enrollment.approved_by = manager.id
-        else:
-            enrollment.status = "pending"
-            enrollment.approved_at = None
-            enrollment.approved_by = None
-
-        session.add(enrollment)
-        session.commit()
-        session.refresh(enrollment)
-
-        if enrollment.status == "pending":
-            existing = session.exec(
-                select(Notification).where(
-                    Notification.user_id == manager.id,
-                    Notification.type == "enrollment_requested",
-                    Notification.meta["enrollment_id"].as_integer() == enrollment.id,
-                )
-            ).first()
-            if not existing:
-                session.add(
-                    Notification(
-                        user_id=manager.id,
-                        title="Course enrollment request",
-                        body=f"{employee.name or employee.email} requested enrollment in {course.name}.",
-                        type="enrollment_requested",
-                        meta={
-                            "employee_id": employee.id,
-                            "course_id": course.id,
-                            "enrollment_id": enrollment.id,
-                        },
-                    )
-                )
-        else:
-            existing = session.exec(
-                select(Notification).where(
-                    Notification.user_id == employee.id,
-                    Notification.type == "enrollment_approved",
-                    Notification.meta["enrollment_id"].as_integer() == enrollment.id,
-                )
-            ).first()
-            if not existing:
-                session.add(
-                    Notification(
-                        user_id=employee.id,
-                        title="Enrollment approved",
-                        body=f"Your course enrollment was approved by {manager.name or manager.email}.",
-                        type="enrollment_approved",
-                        meta={
-                            "course_id": course.id,
-                            "enrollment_id": enrollment.id,
-                            "approver_id": manager.id,
-                            "approver_name": manager.name or manager.email,
-                        },
-                    )
-                )
+            if row is not None:
+                notification_rows.append(row)
+        if notification_rows:
+            session.execute(insert(notifications_table), notification_rows)
         session.commit()
+        enrollments += len(batch)
+        notifications += len(notification_rows)
+        print(f"  enrollments={enrollments} notifications={notifications}", flush=True)
+    return enrollments, notifications
 
 
 def main() -> None:
-    parser = argparse.ArgumentParser()
+    parser = argparse.ArgumentParser(description="Generate a synthetic load-testing dataset.")
+    parser.add_argument("--users", type=int, default=1000, help="Total users (managers + employees)")
+    parser.add_argument("--span", type=int, default=8, help="Average direct reports per manager")
     parser.add_argument("--courses", type=int, default=100)
+    parser.add_argument("--enrollments", type=int, default=5000, help="Target total enrollments")
+    parser.add_argument("--max-per-user", type=int, default=60, help="Cap on enrollments per employee")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Course popularity skew (Zipf exponent)")
+    parser.add_argument("--days", type=int, default=365, help="History window for request dates")
+    parser.add_argument("--seed", type=int, default=7, help="RNG seed; same seed gives the same dataset")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--prefix", default="seed", help="Email/course name prefix for this dataset")
+    parser.add_argument("--password", default="Password123!", help="Password for all generated accounts")
     args = parser.parse_args()
 
-    with Session(engine) as session:
-        manager = session.exec(select(User).where(User.email == "manager1@example.com")).first()
-        employee = session.exec(select(User).where(User.email == "employee1@example.com")).first()
+    if args.users < 2 or args.courses < 1 or args.span < 1:
+        parser.error("--users must be >= 2, --courses and --span >= 1")
 
-        seed_courses(session, args.courses, manager.id if manager else None)
-        seed_enrollments_and_notifications(session, employee, manager)
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    started = time.perf_counter()
+
+    with Session(engine) as session:
+        existing = session.execute(
+            select(func.count()).select_from(User.__table__).where(User.email.like(f"{args.prefix}.%"))
+        ).scalar_one()
+        if existing:
+            raise SystemExit(f"Dataset with prefix '{args.prefix}' already exists; pick another --prefix.")
+
+        managers, employees = seed_users(session, rng, args, now)
+        print(f"users: {len(managers)} managers, {len(employees)} employees", flush=True)
+        reports_to = seed_manager_tree(session, rng, args, managers, employees)
+        print(f"manager tree: {len(reports_to)} reporting lines", flush=True)
+        courses = seed_courses(session, rng, args, [m for m, _ in managers])
+        print(f"courses: {len(courses)}", flush=True)
+        enrollments, notifications = seed_enrollments_and_notifications(
+            session, rng, args, now, employees, reports_to, courses
+        )
 
-    print("SEED COMPLETE")
+    elapsed = time.perf_counter() - started
+    print(f"SEED COMPLETE: {enrollments} enrollments, {notifications} notifications in {elapsed:.1f}s")
 
 
 if __name__ == "__main__":
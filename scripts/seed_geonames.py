@@ -106,8 +106,7 @@ def main() -> None:
 
         country_map = {c.code: c for c in session.exec(select(Country)).all() if c.code}
 
-        existing_cities = session.exec(select(City)).all()
-        existing_pairs = {(c.country_id, c.name) for c in existing_cities}
+        existing_cities = {(c.country_id, c.name): c for c in session.exec(select(City)).all()}
 
         inserts = 0
         session.execute(
@@ -121,11 +120,15 @@ def main() -> None:
             if not candidates:
                 continue
             top_cities = sorted(candidates, key=lambda x: x[1], reverse=True)[: args.top]
-            for name, _population in top_cities:
-                key = (country.id, name)
-                if key in existing_pairs:
+            for name, population in top_cities:
+                city = existing_cities.get((country.id, name))
+                if city is not None:
+                    # Backfills population for cities seeded before it was stored.
+                    if city.population != population:
+                        city.population = population
+                        session.add(city)
                     continue
-                session.add(City(country_id=country.id, name=name))
+                session.add(City(country_id=country.id, name=name, population=population))
                 inserts += 1
         session.commit()
         session.execute(
@@ -1,15 +1,19 @@
 # app/security.py
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from passlib.hash import bcrypt
 from jose import jwt, JWTError
 from fastapi.security import OAuth2PasswordBearer
+from observability.metrics import BCRYPT_QUEUE_DEPTH
+from observability.timing import track
 
 
 JWT_SECRET = os.getenv("JWT_SECRET") or "_dev_only_change_me_"
 JWT_ISSUER = os.getenv("JWT_ISSUER", "ldsaas")
 ACCESS_TTL_MIN = int(os.getenv("ACCESS_TTL_MIN", "30"))
 REFRESH_TTL_DAYS = int(os.getenv("REFRESH_TTL_DAYS", "7"))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(os.cpu_count() or 2)))
 
 
 _MAX = 72
@@ -18,13 +22,27 @@ def _trunc(p: str) -> str:
     # keep behavior consistent for unicode >72 bytes
     return p.encode("utf-8")[:_MAX].decode("utf-8", "ignore")
 
+# bcrypt is CPU-bound; cap concurrent hashes at the core count so a burst of
+# logins queues here (visible as bcrypt_queue_depth) instead of thrashing.
+_bcrypt_pool = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+
+def run_bcrypt(fn, *args):
+    BCRYPT_QUEUE_DEPTH.inc()
+
+    def job():
+        BCRYPT_QUEUE_DEPTH.dec()
+        return fn(*args)
+
+    with track("bcrypt"):
+        return _bcrypt_pool.submit(job).result()
+
 def hash_password(plain: str) -> str:
-    return bcrypt.hash(_trunc(plain))
+    return run_bcrypt(bcrypt.hash, _trunc(plain))
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return bcrypt.verify(_trunc(plain), hashed)
+    return run_bcrypt(bcrypt.verify, _trunc(plain), hashed)
 
-def _jwt(sub: int, role: str, ttl: timedelta, aud: str) -> str:
+def _jwt(sub: int, role: str, ttl: timedelta, aud: str, **claims) -> str:
     now = datetime.now(timezone.utc)
     payload = {
         "sub": str(sub),
@@ -34,13 +52,16 @@ def _jwt(sub: int, role: str, ttl: timedelta, aud: str) -> str:
         "iat": int(now.timestamp()),
         "exp": int((now + ttl).timestamp()),
     }
+    payload.update({k: v for k, v in claims.items() if v is not None})
     return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
 
-def create_access_token(user_id: int, role: str) -> str:
-    return _jwt(user_id, role, timedelta(minutes=ACCESS_TTL_MIN), "access")
+# `fam` is the refresh-token family (auth_sessions.family_id); access tokens
+# carry it so revoking the family also rejects its outstanding access tokens.
+def create_access_token(user_id: int, role: str, family: str | None = None) -> str:
+    return _jwt(user_id, role, timedelta(minutes=ACCESS_TTL_MIN), "access", fam=family)
 
-def create_refresh_token(user_id: int, role: str) -> str:
-    return _jwt(user_id, role, timedelta(days=REFRESH_TTL_DAYS), "refresh")
+def create_refresh_token(user_id: int, role: str, jti: str | None = None, family: str | None = None) -> str:
+    return _jwt(user_id, role, timedelta(days=REFRESH_TTL_DAYS), "refresh", jti=jti, fam=family)
 
 # Used by FastAPI dependencies to extract the bearer token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
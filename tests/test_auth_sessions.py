@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+import pytest
+from sqlmodel import Session, select
+
+from auth import sessions
+from models import AuthSession, User
+from security import create_refresh_token
+
+
+@pytest.fixture
+def session(db_engine):
+    with Session(db_engine) as session:
+        session.add(User(id=1, email="ann@example.com", role="employee", status="active", password_hash="x"))
+        session.commit()
+        yield session
+
+
+def refresh_token(auth_session):
+    return create_refresh_token(1, "employee", jti=str(auth_session.jti), family=str(auth_session.family_id))
+
+
+def test_rotate_spends_the_token_and_issues_a_successor(session):
+    first = sessions.start_family(session, 1)
+
+    second = sessions.rotate(session, first.jti)
+
+    assert second.family_id == first.family_id and second.jti != first.jti
+    session.refresh(first)
+    assert first.rotated_at is not None and first.revoked_at is None
+    assert sessions.rotate(session, second.jti) is not None
+
+
+def test_reusing_a_rotated_token_revokes_the_family(session):
+    first = sessions.start_family(session, 1)
+    other = sessions.start_family(session, 1)
+    second = sessions.rotate(session, first.jti)
+
+    assert sessions.rotate(session, first.jti) is None
+
+    revoked = session.exec(select(AuthSession).where(AuthSession.family_id == first.family_id)).all()
+    assert all(row.revoked_at is not None for row in revoked)
+    assert sessions.revocations.is_revoked(first.family_id)
+    assert not sessions.revocations.is_revoked(other.family_id)
+    # The successor went down with its family.
+    assert sessions.rotate(session, second.jti) is None
+
+
+def test_refresh_endpoint_rotates_and_rejects_replays(client, session):
+    # The callable the router depends on; conftest reloads db after it was bound.
+    from auth.routes import get_session
+
+    client.app.dependency_overrides[get_session] = lambda: session
+    try:
+        token = refresh_token(sessions.start_family(session, 1))
+
+        first = client.post("/api/v1/auth/refresh", json={"refresh_token": token})
+        assert first.status_code == 200
+        pair = first.json()
+        assert pair["access_token"] and pair["refresh_token"] != token
+
+        assert client.post("/api/v1/auth/refresh", json={"refresh_token": token}).status_code == 401
+        # The replay revoked the family, so the fresh token is dead too.
+        assert client.post("/api/v1/auth/refresh", json={"refresh_token": pair["refresh_token"]}).status_code == 401
+        assert client.post("/api/v1/auth/refresh", json={"refresh_token": "garbage"}).status_code == 401
+    finally:
+        client.app.dependency_overrides.clear()
+
+
+def test_revocation_cache_pulls_and_expires_families(session):
+    first = sessions.start_family(session, 1)
+    sessions.revoke_family(session, first.family_id)
+    cache = sessions.RevocationCache(retention=timedelta(minutes=15), sync_interval=0)
+
+    cache.maybe_sync(session)
+    assert cache.is_revoked(first.family_id)
+
+    cache.retention = timedelta(0)
+    cache.maybe_sync(session)
+    assert not cache.is_revoked(first.family_id)
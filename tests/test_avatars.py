@@ -0,0 +1,79 @@
+import hashlib
+import io
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from media import storage as media_storage
+from media.avatars import render_thumbnails, store_original, thumb_key
+from media.storage import LocalStorage
+from media.upload import receive_file
+
+
+def png_bytes(size=(300, 200)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def upload_app(storage, max_bytes=1024 * 1024):
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        staged = await receive_file(request, max_bytes, staging_dir=storage.staging_dir())
+        return {"key": store_original(storage, staged), "size": staged.size}
+
+    return TestClient(app)
+
+
+def test_upload_is_content_addressed_and_deduplicated(tmp_path):
+    storage = LocalStorage(root=str(tmp_path))
+    client = upload_app(storage)
+    data = png_bytes()
+    sha = hashlib.sha256(data).hexdigest()
+
+    first = client.post("/upload", files={"file": ("me.png", data, "image/png")})
+    assert first.status_code == 200
+    assert first.json() == {"key": f"avatars/{sha[:2]}/{sha}.png", "size": len(data)}
+
+    # Same bytes as a raw body, under a different name: same object.
+    second = client.post("/upload", content=data, headers={"Content-Type": "image/png"})
+    assert second.json()["key"] == first.json()["key"]
+    assert list((tmp_path / ".staging").iterdir()) == []
+
+
+def test_upload_rejects_oversized_and_non_images(tmp_path):
+    storage = LocalStorage(root=str(tmp_path))
+    client = upload_app(storage, max_bytes=100)
+
+    resp = client.post("/upload", files={"file": ("big.png", png_bytes(), "image/png")})
+    assert resp.status_code == 413
+
+    client = upload_app(storage)
+    resp = client.post("/upload", files={"file": ("x.png", b"not an image", "image/png")})
+    assert resp.status_code == 415
+    assert list((tmp_path / ".staging").iterdir()) == []
+
+
+def test_thumbnails_are_served_immutable(client, tmp_path, monkeypatch):
+    storage = LocalStorage(root=str(tmp_path))
+    monkeypatch.setattr(media_storage, "_storage", storage)
+    data = png_bytes()
+    sha = hashlib.sha256(data).hexdigest()
+    key = f"avatars/{sha[:2]}/{sha}.png"
+    storage.put_bytes(key, data)
+
+    written = render_thumbnails(storage, sha, key)
+    assert thumb_key(sha, 64) in written
+    with Image.open(storage.local_path(thumb_key(sha, 64))) as im:
+        assert max(im.size) == 64
+    assert render_thumbnails(storage, sha, key) == []
+
+    resp = client.get(storage.url(thumb_key(sha, 64)))
+    assert resp.status_code == 200
+    assert resp.headers["cache-control"] == "public, max-age=31536000, immutable"
+    cached = client.get(storage.url(thumb_key(sha, 64)), headers={"If-None-Match": resp.headers["etag"]})
+    assert cached.status_code == 304
+    assert client.get("/api/v1/media/../../etc/passwd").status_code == 404
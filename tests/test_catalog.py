@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+
+import courses.catalog as catalog_module
+from courses.catalog import Catalog, CatalogSnapshot
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def course(id, skills=(), provider_id=None, flag_id=None, is_active=True):
+    return {
+        "id": id, "name": f"Course {id}", "skills": list(skills), "provider_id": provider_id,
+        "flag_id": flag_id, "is_active": is_active, "created_at": NOW,
+    }
+
+
+ROWS = [
+    course(3, ["SQL"], provider_id=1),
+    course(1, ["Python", "sql"], provider_id=1, flag_id=2),
+    course(2, ["Python"], provider_id=2, is_active=False),
+]
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.loads = 0
+
+    def exec(self, stmt):
+        self.loads += 1
+        return self
+
+    def all(self):
+        return self.rows
+
+
+def test_snapshot_filters_through_indexes_in_id_order():
+    snap = CatalogSnapshot.build(1, ROWS)
+
+    assert [c.id for c in snap.courses] == [1, 2, 3]
+    assert [c.id for c in snap.filter(skill=" SQL ")] == [1, 3]
+    assert [c.id for c in snap.filter(provider_id=1, flag_id=2)] == [1]
+    assert [c.id for c in snap.filter(skill="python", active=True)] == [1]
+    assert [c.id for c in snap.filter(active=False)] == [2]
+    assert snap.filter(provider_id=9) == []
+    assert snap.by_id[2].name == "Course 2"
+
+
+def test_rebuilds_only_when_version_moves_or_invalidated(monkeypatch):
+    version = {"v": 1}
+    monkeypatch.setattr(catalog_module, "current_version", lambda session: version["v"])
+    now = {"t": 0.0}
+    catalog = Catalog(max_staleness=60, clock=lambda: now["t"])
+    session = FakeSession(ROWS)
+
+    first = catalog.get(session)
+    assert first.version == 1 and session.loads == 1
+
+    # Fresh: served without touching the session.
+    assert catalog.get(session) is first and session.loads == 1
+
+    # Past the staleness bound the version is checked; unchanged, no rebuild.
+    now["t"] = 61
+    assert catalog.get(session) is first
+
+    version["v"] = 2
+    assert catalog.refresh(session) is not first
+    assert catalog.snapshot.version == 2
+
+    second = catalog.snapshot
+    catalog.invalidate()
+    assert catalog.get(session) is not second
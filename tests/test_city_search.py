@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from users.cities import CityIndex, CityIndexCache, search_query
+
+
+def city(id, name, population, country_id=1):
+    return SimpleNamespace(id=id, name=name, population=population, country_id=country_id)
+
+
+ROWS = [
+    city(1, "Berlin", 3_600_000),
+    city(2, "Bern", 130_000, country_id=2),
+    city(3, "Bergen", 285_000, country_id=3),
+    city(4, "Bernau", 40_000),
+    city(5, "Bielefeld", 330_000),
+    city(6, "bergisch Gladbach", 110_000),
+]
+
+
+def test_prefix_search_ranks_by_population():
+    index = CityIndex(ROWS)
+
+    assert [c.name for c in index.search("BER")] == ["Berlin", "Bergen", "Bern", "bergisch Gladbach", "Bernau"]
+    assert [c.name for c in index.search("bern", country_id=1)] == ["Bernau"]
+    assert [c.name for c in index.search("be", limit=2)] == ["Berlin", "Bergen"]
+    assert index.search("zz") == [] and index.search("  ") == []
+
+
+def test_index_is_rebuilt_only_after_ttl():
+    now = {"t": 0.0}
+    loads = []
+
+    class FakeSession:
+        def exec(self, stmt):
+            loads.append(stmt)
+            return SimpleNamespace(all=lambda: ROWS)
+
+    cache = CityIndexCache(ttl=300, clock=lambda: now["t"])
+    first = cache.get(FakeSession())
+    assert cache.get(FakeSession()) is first and len(loads) == 1
+    now["t"] = 301
+    assert cache.get(FakeSession()) is not first and len(loads) == 2
+
+
+def test_postgres_query_is_an_escaped_prefix_match():
+    stmt = search_query("St_Pa%", country_id=7, limit=5)
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    params = stmt.compile(dialect=postgresql.dialect()).params
+
+    assert "lower(cities.name) LIKE" in sql and "ESCAPE" in sql
+    assert "ORDER BY cities.population DESC" in sql
+    assert "st\\_pa\\%%" in params.values()
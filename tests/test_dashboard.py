@@ -0,0 +1,82 @@
+import pytest
+from sqlmodel import Session
+
+from courses.catalog import Catalog
+from models import Course, CourseEnrollment, Notification, User, UserProfile
+
+
+def test_dashboard_fields_select_sections(client):
+    from auth.deps import get_current_user  # needs DATABASE_URL, set by the client fixture
+
+    user = User(id=1, email="e@example.com", role="employee", status="active", password_hash="x", is_active=True)
+    client.app.dependency_overrides[get_current_user] = lambda: user
+    try:
+        resp = client.get("/api/v1/dashboard", params={"fields": "me"})
+        assert resp.status_code == 200
+        assert resp.json() == {
+            "me": {"id": 1, "email": "e@example.com", "name": None, "role": "employee", "is_active": True, "status": "active"}
+        }
+        resp = client.get("/api/v1/dashboard", params={"fields": "me,bogus"})
+        assert resp.status_code == 422
+    finally:
+        client.app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def seeded(client, db_engine, monkeypatch):
+    import db
+    import routers.dashboard as dashboard
+    from auth.deps import get_current_user
+
+    with Session(db_engine) as session:
+        session.add_all(
+            [
+                User(id=1, email="ann@example.com", role="employee", status="active", password_hash="x"),
+                User(id=2, email="bob@example.com", role="employee", status="active", password_hash="x"),
+            ]
+        )
+        session.add_all(Course(id=i, name=f"Course {i}") for i in (10, 11))
+        session.flush()
+        session.add(CourseEnrollment(id=5, employee_id=1, course_id=11, status="approved", progress_percent=40))
+        session.add_all(
+            Notification(user_id=user_id, title=f"n{i}", body="b", type="x", is_read=read)
+            for i, (user_id, read) in enumerate([(1, True), (1, False), (1, False), (2, False)])
+        )
+        session.commit()
+        user = session.get(User, 1)
+
+    # Sections open their own sessions on db.engine, one per thread.
+    monkeypatch.setattr(db, "engine", db_engine)
+    monkeypatch.setattr(dashboard, "catalog", Catalog())
+    client.app.dependency_overrides[get_current_user] = lambda: user
+    try:
+        yield lambda **params: client.get("/api/v1/dashboard", params=params)
+    finally:
+        client.app.dependency_overrides.clear()
+
+
+def test_every_section_runs_against_the_database(seeded, db_engine):
+    resp = seeded()
+    assert resp.status_code == 200
+    body = resp.json()
+
+    assert set(body) == {"me", "profile", "enrollments", "notifications", "unread_notifications", "courses"}
+    assert body["me"]["email"] == "ann@example.com"
+    # First visit creates the profile.
+    assert body["profile"]["user_id"] == 1
+    with Session(db_engine) as session:
+        assert session.get(UserProfile, 1) is not None
+    [enrollment] = body["enrollments"]
+    assert (enrollment["id"], enrollment["progress_percent"], enrollment["course"]["name"]) == (5, 40, "Course 11")
+    assert [n["title"] for n in body["notifications"]] == ["n2", "n1", "n0"]
+    assert body["unread_notifications"] == 2
+    assert [c["id"] for c in body["courses"]] == [10, 11]
+
+
+def test_fields_limit_the_sections(seeded):
+    body = seeded(fields="notifications").json()
+    assert set(body) == {"notifications", "unread_notifications"}
+    assert body["unread_notifications"] == 2
+
+    body = seeded(fields="profile, enrollments").json()
+    assert set(body) == {"profile", "enrollments"}
@@ -0,0 +1,144 @@
+import csv
+import io
+import json
+import zipfile
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlmodel import Session, select
+
+import users.export as export_module
+from models import DataExport, User
+
+
+class Result(list):
+    def first(self):
+        return self[0] if self else None
+
+
+class ScriptedSession:
+    """Answers each exec() with the next scripted result."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.statements = []
+
+    def exec(self, stmt):
+        self.statements.append(stmt)
+        return Result(self.results.pop(0))
+
+    def rollback(self):
+        pass
+
+
+def row(**values):
+    return SimpleNamespace(_mapping=values)
+
+
+def test_user_folder_has_json_and_csv_files_without_secrets():
+    when = datetime(2026, 1, 2, tzinfo=timezone.utc)
+    session = ScriptedSession(
+        [row(id=7, email="ann@example.com", created_at=when, manager_id=3)],
+        [row(user_id=7, first_name="Ann")],
+        [(1, 7, "ann@home.example", True, when)],
+        [],
+        [(9, 7, "Approved", "body", "enrollment_approved", False, when, {"enrollment_id": 4}, "enrollment:4", 1, None, None)],
+        [(4, 7, 2, "approved") + (None,) * 15 + ("SQL Basics",)],
+    )
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        counts = export_module.write_user(zf, session, 7)
+
+    assert counts == {"personal_emails": 1, "dependents": 0, "notifications": 1, "enrollments": 1}
+    assert "password_hash" not in str(session.statements[0])
+    with zipfile.ZipFile(buf) as zf:
+        assert json.loads(zf.read("user-7/user.json")) == {
+            "id": 7, "email": "ann@example.com", "created_at": "2026-01-02T00:00:00+00:00", "manager_id": 3,
+        }
+        notifications = list(csv.reader(io.StringIO(zf.read("user-7/notifications.csv").decode())))
+        assert notifications[1][notifications[0].index("metadata")] == '{"enrollment_id":4}'
+        assert zf.read("user-7/dependents.csv").decode().startswith("id,user_id,name")
+        assert zf.read("user-7/enrollments.csv").decode().splitlines()[1].endswith("SQL Basics")
+
+    assert export_module.write_user(zipfile.ZipFile(io.BytesIO(), "w"), ScriptedSession([]), 8) is None
+
+
+def test_build_writes_part_file_then_renames(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_module, "EXPORT_ROOT", str(tmp_path))
+    monkeypatch.setattr(
+        export_module, "write_user",
+        lambda zf, session, user_id: zf.writestr(f"user-{user_id}/user.json", "{}") or {"enrollments": 0},
+    )
+    export = DataExport(id=5, user_ids=[1, 2], file_name="export-abc.zip")
+    seen = []
+
+    size = export_module.build_export(ScriptedSession(), export, on_user=seen.append)
+
+    assert seen == [1, 2]
+    assert [p.name for p in tmp_path.iterdir()] == ["export-abc.zip"]
+    with zipfile.ZipFile(tmp_path / "export-abc.zip") as zf:
+        manifest = json.loads(zf.read("manifest.json"))
+        assert sorted(zf.namelist()) == ["manifest.json", "user-1/user.json", "user-2/user.json"]
+    assert manifest["users"] == {"1": {"enrollments": 0}, "2": {"enrollments": 0}}
+    assert size == (tmp_path / "export-abc.zip").stat().st_size
+
+
+@pytest.fixture
+def session(db_engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(export_module, "EXPORT_ROOT", str(tmp_path))
+    with Session(db_engine) as session:
+        session.add_all(User(id=i, email=f"u{i}@example.com", status="active") for i in (1, 2))
+        session.commit()
+        yield session
+
+
+def test_processing_stops_starting_exports_once_the_budget_is_spent(session):
+    now = datetime.now(timezone.utc)
+    first, second = (export_module.create_export(session, [i], created_by=1) for i in (1, 2))
+    stale = DataExport(user_ids=[1], file_name="export-old.zip", status="done", expires_at=now - timedelta(hours=1))
+    session.add(stale)
+    session.commit()
+
+    # Out of time: nothing new is built, but expired files are still purged.
+    assert export_module.process_data_exports(session, now, budget=0) == 1
+    assert [e.status for e in (first, second, stale)] == ["queued", "queued", "expired"]
+
+    assert export_module.process_data_exports(session, now) == 2
+    assert [(e.status, e.position) for e in (first, second)] == [("done", 1), ("done", 1)]
+    assert export_module.export_path(second).is_file()
+
+
+def test_download_of_a_missing_file_expires_the_export(client, session):
+    from routers.exports import get_current_user, get_session
+
+    export = export_module.create_export(session, [1], created_by=1)
+    export_module.process_data_exports(session, datetime.now(timezone.utc))
+    client.app.dependency_overrides[get_session] = lambda: session
+    client.app.dependency_overrides[get_current_user] = lambda: session.get(User, 1)
+    try:
+        response = client.get(f"/api/v1/exports/{export.id}/download")
+        assert response.status_code == 200 and response.headers["content-type"] == "application/zip"
+
+        export_module.export_path(export).unlink()
+        assert client.get(f"/api/v1/exports/{export.id}/download").status_code == 410
+        assert client.get(f"/api/v1/exports/{export.id}").json()["status"] == "expired"
+        assert client.get(f"/api/v1/exports/{export.id}/download").status_code == 409
+    finally:
+        client.app.dependency_overrides.clear()
+    assert session.exec(select(DataExport.status)).all() == ["expired"]
+
+
+def test_an_export_is_capped_at_export_max_users(client, session):
+    from routers.exports import get_session, require_admin_user
+    from schemas import EXPORT_MAX_USERS
+
+    client.app.dependency_overrides[get_session] = lambda: session
+    client.app.dependency_overrides[require_admin_user] = lambda: session.get(User, 1)
+    try:
+        too_many = client.post("/api/v1/exports", json={"user_ids": list(range(EXPORT_MAX_USERS + 1))})
+        assert too_many.status_code == 422
+        assert client.post("/api/v1/exports", json={"user_ids": [1, 2]}).status_code == 202
+    finally:
+        client.app.dependency_overrides.clear()
+    assert session.exec(select(DataExport.user_ids)).all() == [[1, 2]]
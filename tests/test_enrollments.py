@@ -0,0 +1,114 @@
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from courses.enrollments import get_enrollment, insert_enrollment
+from models import Course, CourseEnrollment, EmployeeManager, Notification, User, WebhookDelivery, WebhookEndpoint
+
+
+@pytest.fixture
+def session(pg_engine):
+    with Session(pg_engine) as session:
+        session.add_all(
+            [
+                User(id=1, email="boss@example.com", role="manager", status="active"),
+                User(id=2, email="ann@example.com", role="employee", status="active"),
+            ]
+        )
+        session.add(Course(id=10, name="SQL Basics"))
+        session.flush()
+        session.add(EmployeeManager(employee_id=2, manager_id=1))
+        session.commit()
+        yield session
+
+
+def counts(session):
+    return (
+        session.exec(select(func.count()).select_from(CourseEnrollment)).one(),
+        session.exec(select(func.count()).select_from(Notification)).one(),
+    )
+
+
+@pytest.fixture
+def as_user(client, session, monkeypatch):
+    """A client acting as the given user id, on the Postgres session."""
+    from auth.deps import get_current_user  # needs DATABASE_URL, set by the client fixture
+    from courses.recommendations import index
+    from routers.courses import get_session
+
+    monkeypatch.setattr(index, "note_enrollment", lambda user_id, course_id: None)
+    client.app.dependency_overrides[get_session] = lambda: session
+
+    def act(user_id):
+        user = session.get(User, user_id)
+        client.app.dependency_overrides[get_current_user] = lambda: user
+        return client
+
+    try:
+        yield act
+    finally:
+        client.app.dependency_overrides.clear()
+
+
+def test_second_insert_of_the_same_enrollment_is_none(session):
+    first = insert_enrollment(session, 2, 10, status="pending")
+    session.commit()
+    assert first is not None and first.status == "pending"
+
+    assert insert_enrollment(session, 2, 10, status="approved") is None
+    session.commit()
+    assert get_enrollment(session, 2, 10).status == "pending"
+    assert counts(session) == (1, 0)
+
+
+def test_repeated_enroll_request_creates_one_row_and_one_notification(session, as_user):
+    client = as_user(2)
+    first = client.post("/api/v1/courses/10/enroll")
+    again = client.post("/api/v1/courses/10/enroll")
+
+    assert first.status_code == again.status_code == 201
+    assert first.json()["id"] == again.json()["id"]
+    assert counts(session) == (1, 1)
+    notification = session.exec(select(Notification)).one()
+    assert (notification.user_id, notification.event_count) == (1, 1)
+
+
+def test_repeated_assignment_creates_one_row_and_one_notification(session, as_user):
+    client = as_user(1)
+    deadline = datetime(2026, 12, 1, tzinfo=timezone.utc)
+    first = client.post("/api/v1/enrollments/assign", json={"employee_id": 2, "course_id": 10})
+    again = client.post(
+        "/api/v1/enrollments/assign", json={"employee_id": 2, "course_id": 10, "deadline": deadline.isoformat()}
+    )
+
+    assert first.status_code == again.status_code == 200
+    assert first.json()["id"] == again.json()["id"]
+    assert counts(session) == (1, 1)
+    enrollment = session.exec(select(CourseEnrollment)).one()
+    assert (enrollment.status, enrollment.approved_by, enrollment.deadline) == ("assigned", 1, deadline)
+    notification = session.exec(select(Notification)).one()
+    assert (notification.user_id, notification.type) == (2, "quest_assigned")
+
+
+def test_a_managers_own_enrollment_is_also_announced_as_approved(session, as_user):
+    session.add_all(
+        WebhookEndpoint(id=i, url=f"https://hooks.example.com/{i}", secret="s", event_types=types)
+        for i, types in [(1, ["enrollment.approved"]), (2, ["enrollment.requested", "enrollment.approved"])]
+    )
+    session.commit()
+
+    assert as_user(1).post("/api/v1/courses/10/enroll").status_code == 201
+    as_user(2).post("/api/v1/courses/10/enroll")   # pending: no approval yet
+
+    deliveries = session.exec(
+        select(WebhookDelivery.endpoint_id, WebhookDelivery.event_type, WebhookDelivery.payload)
+    ).all()
+    assert sorted((p["data"]["employee_id"], t, e) for e, t, p in deliveries) == [
+        (1, "enrollment.approved", 1),
+        (1, "enrollment.approved", 2),
+        (1, "enrollment.requested", 2),
+        (2, "enrollment.requested", 2),
+    ]
+    assert {p["data"]["status"] for _, t, p in deliveries if t == "enrollment.approved"} == {"approved"}
@@ -2,3 +2,19 @@ def test_health_endpoint(client):
     resp = client.get("/health")
     assert resp.status_code == 200
     assert resp.json() == {"status": "ok"}
+
+
+def test_liveness_endpoint(client):
+    resp = client.get("/health/live")
+    assert resp.status_code == 200
+    assert resp.json() == {"status": "ok"}
+
+
+def test_readiness_reports_checks(client):
+    resp = client.get("/health/ready")
+    body = resp.json()
+    assert set(body["checks"]) == {"pool", "database", "migrations", "smtp"}
+    assert body["checks"]["migrations"]["head"]
+    # The in-memory test database has no alembic_version table.
+    assert resp.status_code == 503
+    assert body["status"] == "unavailable"
@@ -0,0 +1,155 @@
+import io
+
+import pytest
+from sqlmodel import Session, select
+
+from models import EmployeeManager, User
+from users.hris import CurrentUser, SyncRefused, apply_plan, check_limits, load_current, parse_snapshot, plan_sync
+
+CSV = """email,name,role,manager_email,active
+boss@example.com,Boss,manager,,
+Ann@Example.com,Ann,employee,boss@example.com,true
+new@example.com,New Hire,employee,boss@example.com,
+gone@example.com,Gone,employee,,false
+bad,Nobody,employee,,
+ann@example.com,Ann Again,employee,,
+self@example.com,Self,employee,self@example.com,
+"""
+
+
+def current(*users):
+    return {u.email.lower(): u for u in users}
+
+
+def test_parse_collects_errors_and_keeps_first_duplicate():
+    records, errors = parse_snapshot(io.StringIO(CSV), "csv")
+
+    assert sorted(records) == ["ann@example.com", "boss@example.com", "gone@example.com", "new@example.com"]
+    assert records["gone@example.com"].active is False
+    assert [(e.line, e.error.split()[0]) for e in errors] == [(6, "missing"), (7, "duplicate"), (8, "user")]
+
+    records, errors = parse_snapshot(io.StringIO('{"email": "a@x.io", "role": "manager"}\n\nnope\n'), "jsonl")
+    assert records["a@x.io"].role == "manager" and [e.line for e in errors] == [3]
+
+
+def test_jsonl_fields_of_the_wrong_type_are_line_errors():
+    snapshot = "\n".join(
+        [
+            '{"email": 5}',
+            '{"email": "b@x.io", "role": ["manager"]}',
+            '{"email": "c@x.io", "name": {"first": "C"}}',
+            '{"email": "d@x.io", "manager_email": null, "name": null, "active": false}',
+        ]
+    )
+    records, errors = parse_snapshot(io.StringIO(snapshot + "\n"), "jsonl")
+
+    assert sorted(records) == ["d@x.io"] and records["d@x.io"].active is False
+    assert [(e.line, e.email, e.error) for e in errors] == [
+        (1, None, "email must be a string"),
+        (2, "b@x.io", "role must be a string"),
+        (3, "c@x.io", "name must be a string"),
+    ]
+
+
+def test_plan_diffs_against_current_state():
+    records, _ = parse_snapshot(io.StringIO(CSV), "csv")
+    plan = plan_sync(
+        records,
+        current(
+            CurrentUser(1, "boss@example.com", "Boss", "manager", True, "active", None),
+            CurrentUser(2, "ann@example.com", "Ann", "employee", True, "active", None),
+            CurrentUser(3, "gone@example.com", "Gone", "employee", True, "active", 1),
+            CurrentUser(4, "left@example.com", "Left", "employee", True, "pending", 1),
+            CurrentUser(5, "root@example.com", "Root", "admin", True, "active", None),
+            CurrentUser(6, "old@example.com", "Old", "employee", False, "inactive", None),
+        ),
+    )
+
+    assert plan.unchanged == 1                                  # boss
+    assert [r.email for r in plan.create] == ["new@example.com"]
+    assert plan.update == []
+    assert sorted(plan.deactivate) == [3, 4]                    # active=false, and missing with an open invite
+    assert plan.reactivate == []
+    assert plan.managers == {
+        "ann@example.com": "boss@example.com",
+        "new@example.com": "boss@example.com",
+        "gone@example.com": None,
+    }
+    assert plan.skipped_admins == 0 and plan.managed == 4
+
+
+def test_inactive_rows_for_unknown_emails_are_not_created():
+    records, _ = parse_snapshot(
+        io.StringIO(
+            "email,name,role,manager_email,active\n"
+            "x@example.com,X,manager,,false\n"
+            "y@example.com,Y,employee,x@example.com,\n"
+        ),
+        "csv",
+    )
+    plan = plan_sync(records, {})
+
+    assert [r.email for r in plan.create] == ["y@example.com"]
+    assert plan.skipped_inactive == 1
+    # x is never created, so it can't become y's manager either.
+    assert plan.managers == {} and [e.email for e in plan.errors] == ["y@example.com"]
+
+
+def test_apply_writes_users_and_manager_links(db_engine):
+    with Session(db_engine) as session:
+        session.add_all(
+            [
+                User(id=1, email="boss@example.com", name="Boss", role="manager", status="active", password_hash="x"),
+                User(id=2, email="ann@example.com", name="Ann", role="employee", status="active", password_hash="x"),
+                User(id=3, email="gone@example.com", name="Gone", role="employee", status="active", password_hash="x"),
+            ]
+        )
+        session.flush()
+        session.add(EmployeeManager(employee_id=3, manager_id=1))
+        session.commit()
+
+        records, errors = parse_snapshot(io.StringIO(CSV + "left@example.com,Left,employee,,false\n"), "csv")
+        apply_plan(session, plan_sync(records, load_current(session), errors), actor_id=1)
+
+        users = {u.email: u for u in session.exec(select(User)).all()}
+        links = {(link.employee_id, link.manager_id) for link in session.exec(select(EmployeeManager)).all()}
+
+    assert sorted(users) == ["ann@example.com", "boss@example.com", "gone@example.com", "new@example.com"]
+    new = users["new@example.com"]
+    assert (new.is_active, new.status, new.password_hash, new.invited_by) == (True, "inactive", None, 1)
+    assert (users["gone@example.com"].is_active, users["gone@example.com"].status) == (False, "inactive")
+    assert links == {(2, 1), (new.id, 1)}
+
+    # Re-applying the same snapshot is a no-op.
+    with Session(db_engine) as session:
+        plan = plan_sync(records, load_current(session))
+    assert (plan.create, plan.update, plan.deactivate, plan.managers) == ([], [], [], {})
+
+
+def test_unknown_manager_is_reported_and_admins_are_left_alone():
+    records, _ = parse_snapshot(
+        io.StringIO("email,name,role,manager_email\nroot@example.com,Root,employee,\nann@example.com,Ann,manager,x@example.com\n"),
+        "csv",
+    )
+    plan = plan_sync(
+        records,
+        current(
+            CurrentUser(5, "root@example.com", "Root", "admin", True, "active", None),
+            CurrentUser(2, "ann@example.com", "Ann", "employee", False, "inactive", None),
+        ),
+    )
+
+    assert plan.skipped_admins == 1
+    assert [(i, r.role) for i, r in plan.update] == [(2, "manager")]
+    assert plan.reactivate == [2] and plan.managers == {}
+    assert [e.email for e in plan.errors] == ["ann@example.com"]
+
+
+def test_mass_deactivation_is_refused():
+    users = [CurrentUser(i, f"u{i}@example.com", None, "employee", True, "active", None) for i in range(10)]
+    plan = plan_sync({}, current(*users))
+
+    assert len(plan.deactivate) == 10
+    with pytest.raises(SyncRefused):
+        check_limits(plan, max_ratio=0.2)
+    check_limits(plan_sync({}, current(*users[:1])), max_ratio=1.0)
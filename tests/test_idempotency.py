@@ -0,0 +1,148 @@
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlmodel import Session
+
+from idempotency.middleware import IdempotencyMiddleware, fingerprint
+from idempotency.store import Claim, IdempotencyStore, StoredResponse
+from models import User
+from security import create_access_token
+
+
+class MemoryStore:
+    def __init__(self):
+        self.rows = {}
+
+    def claim(self, user_id, key, fingerprint):
+        row = self.rows.get((user_id, key))
+        if row is None:
+            self.rows[(user_id, key)] = [fingerprint, None]
+            return Claim("new")
+        if row[0] != fingerprint:
+            return Claim("mismatch")
+        return Claim("replay", row[1]) if row[1] else Claim("in_flight")
+
+    def complete(self, user_id, key, fingerprint, response):
+        self.rows[(user_id, key)][1] = response
+
+    def release(self, user_id, key, fingerprint):
+        self.rows.pop((user_id, key), None)
+
+
+def make_client(**options):
+    app = FastAPI()
+    calls = []
+
+    @app.post("/things", status_code=201)
+    def create(payload: dict):
+        calls.append(payload)
+        if payload.get("fail"):
+            raise HTTPException(status_code=503)
+        return {"n": len(calls)}
+
+    store = MemoryStore()
+    app.add_middleware(IdempotencyMiddleware, store=store, **options)
+    return TestClient(app), calls, store
+
+
+def auth(user_id=1, key="k1"):
+    return {"Authorization": f"Bearer {create_access_token(user_id, 'employee')}", "Idempotency-Key": key}
+
+
+def test_retry_replays_stored_response_without_rerunning():
+    client, calls, _ = make_client()
+
+    first = client.post("/things", json={"a": 1}, headers=auth())
+    retry = client.post("/things", json={"a": 1}, headers=auth())
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json() == {"n": 1}
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert len(calls) == 1
+
+    # Scoped per user: another user's identical key is a new request.
+    assert client.post("/things", json={"a": 1}, headers=auth(user_id=2)).json() == {"n": 2}
+
+
+def test_key_reused_for_different_request_is_rejected():
+    client, calls, _ = make_client()
+    client.post("/things", json={"a": 1}, headers=auth())
+
+    assert client.post("/things", json={"a": 2}, headers=auth()).status_code == 422
+    assert len(calls) == 1
+
+
+def test_server_errors_are_not_stored_and_anonymous_requests_pass_through():
+    client, calls, store = make_client()
+
+    assert client.post("/things", json={"fail": True}, headers=auth()).status_code == 503
+    assert store.rows == {}
+    assert client.post("/things", json={"fail": True}, headers=auth()).status_code == 503
+    assert len(calls) == 2
+
+    client.post("/things", json={"a": 1}, headers={"Idempotency-Key": "k1"})
+    client.post("/things", json={"a": 1}, headers={"Idempotency-Key": "k1"})
+    assert len(calls) == 4
+
+
+def test_retry_while_the_first_request_runs_is_a_409():
+    client, calls, store = make_client()
+    body = b'{"a":1}'
+    store.rows[(1, "k1")] = [fingerprint({"method": "POST", "path": "/things"}, body), None]
+
+    resp = client.post("/things", content=body, headers={**auth(), "Content-Type": "application/json"})
+
+    assert resp.status_code == 409 and resp.headers["retry-after"] == "1"
+    assert calls == []
+    assert (1, "k1") in store.rows       # the running request still owns the key
+
+
+def test_request_body_over_the_cap_is_a_413():
+    client, calls, store = make_client(max_body=16)
+
+    resp = client.post("/things", json={"a": "x" * 32}, headers=auth())
+
+    assert resp.status_code == 413
+    assert calls == [] and store.rows == {}
+    # Without a key the cap doesn't apply.
+    assert client.post("/things", json={"a": "x" * 32}).status_code == 201
+
+
+def test_store_claims_replays_and_takes_over_on_postgres(pg_engine):
+    with Session(pg_engine) as session:
+        session.add(User(id=1, email="ann@example.com", status="active"))
+        session.commit()
+    store = IdempotencyStore(pg_engine, ttl=3600, lock=60)
+    ok = StoredResponse(201, [["content-type", "application/json"]], b'{"n":1}')
+
+    def age(column, seconds):
+        with pg_engine.begin() as conn:
+            conn.execute(text(f"UPDATE idempotency_keys SET {column} = now() - make_interval(secs => :s)"), {"s": seconds})
+
+    assert store.claim(1, "k", b"a").outcome == "new"
+    assert store.claim(1, "k", b"a").outcome == "in_flight"
+    assert store.claim(1, "k", b"b").outcome == "mismatch"
+
+    store.complete(1, "k", b"b", ok)                  # wrong fingerprint: ignored
+    assert store.claim(1, "k", b"a").outcome == "in_flight"
+    store.complete(1, "k", b"a", ok)
+    replay = store.claim(1, "k", b"a")
+    assert replay.outcome == "replay"
+    assert replay.response == StoredResponse(201, [("content-type", "application/json")], b'{"n":1}')
+    store.release(1, "k", b"a")                       # finished: kept
+    assert store.claim(1, "k", b"a").outcome == "replay"
+
+    # An expired key is taken over, by any request.
+    age("expires_at", 1)
+    assert store.claim(1, "k", b"c").outcome == "new"
+    assert store.claim(1, "k", b"c").outcome == "in_flight"
+
+    # So is an unfinished claim older than `lock` (its worker died)...
+    age("created_at", 30)
+    assert store.claim(1, "k", b"c").outcome == "in_flight"
+    age("created_at", 61)
+    assert store.claim(1, "k", b"d").outcome == "new"
+
+    # ...and a released one.
+    store.release(1, "k", b"d")
+    assert store.claim(1, "k", b"e").outcome == "new"
@@ -0,0 +1,21 @@
+def test_metrics_endpoint_exposes_route_histogram(client):
+    client.get("/health")
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    body = resp.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in body
+    assert "http_requests_in_flight" in body
+    assert "bcrypt_queue_depth" in body
+    assert "enrollment_events_total" in body
+
+
+def test_pool_size_gauge_is_set_not_added_up():
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import QueuePool
+
+    from observability.metrics import DB_POOL_SIZE, instrument_pool
+
+    engine = create_engine("sqlite://", poolclass=QueuePool, pool_size=3)
+    instrument_pool(engine)
+    instrument_pool(engine)
+    assert DB_POOL_SIZE._value.get() == 3
@@ -0,0 +1,109 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session, select
+
+import notifications.digests as digests
+import notifications.service as service
+from models import Notification, User
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+class RecordingSession:
+    def __init__(self, results=(), users=()):
+        self.results = list(results)
+        self.users = list(users)
+        self.statements = []
+        self.commits = 0
+
+    def execute(self, stmt):
+        self.statements.append(stmt)
+        return self.results.pop(0)
+
+    def exec(self, stmt):
+        self.statements.append(stmt)
+        return SimpleNamespace(all=lambda: self.users)
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_digest_windows_are_aligned_buckets():
+    start, end = service.digest_window(datetime(2026, 10, 19, 9, 59, 59, tzinfo=timezone.utc), window=3600)
+    assert start == datetime(2026, 10, 19, 9, tzinfo=timezone.utc)
+    assert end == datetime(2026, 10, 19, 10, tzinfo=timezone.utc)
+    assert service.digest_window(datetime(2026, 10, 19, 9, 0, tzinfo=timezone.utc), window=3600)[0] == start
+
+
+def test_plain_notifications_dedupe_on_the_partial_index():
+    session = RecordingSession(results=[SimpleNamespace(first=lambda: None)])
+
+    outcome = service.notify(session, 7, "enrollment_approved", "t", "b", dedupe_key=service.enrollment_key(3))
+
+    assert outcome == "duplicate"
+    sql = _sql(session.statements[0])
+    assert "ON CONFLICT (user_id, type, dedupe_key) WHERE dedupe_key IS NOT NULL DO NOTHING" in sql
+    assert "RETURNING notifications.id" in sql
+
+
+def test_digest_types_fold_into_one_row_per_window():
+    session = RecordingSession(results=[SimpleNamespace(scalar=lambda: 1), SimpleNamespace(scalar=lambda: 4)])
+    now = datetime(2026, 10, 19, 9, 30, tzinfo=timezone.utc)
+
+    first = service.notify(session, 7, "enrollment_requested", "t", "b", meta={"enrollment_id": 1}, now=now)
+    later = service.notify(session, 7, "enrollment_requested", "t", "b", meta={"enrollment_id": 2}, now=now)
+
+    assert (first, later) == ("created", "merged")
+    stmt = session.statements[0]
+    sql = _sql(stmt)
+    assert "ON CONFLICT (user_id, type, dedupe_key) WHERE dedupe_key IS NOT NULL DO UPDATE" in sql
+    assert "event_count = (notifications.event_count + " in sql
+    params = stmt.compile(dialect=postgresql.dialect()).params
+    assert params["dedupe_key"] == "digest:20261019T090000Z"
+    assert params["window_ends_at"] == datetime(2026, 10, 19, 10, tzinfo=timezone.utc)
+
+
+def test_a_retried_event_is_not_folded_into_the_digest_twice(pg_engine):
+    now = datetime(2026, 10, 19, 9, 30, tzinfo=timezone.utc)
+    with Session(pg_engine) as session:
+        session.add(User(id=7, email="boss@example.com", status="active"))
+        session.commit()
+
+        def request(enrollment_id, dedupe=True):
+            key = service.enrollment_key(enrollment_id) if dedupe else None
+            return service.notify(session, 7, "enrollment_requested", "t", "b",
+                                  meta={"enrollment_id": enrollment_id}, dedupe_key=key, now=now)
+
+        outcomes = [request(1), request(2), request(1), request(2), request(3, dedupe=False), request(3, dedupe=False)]
+        session.commit()
+
+        [digest] = session.exec(select(Notification)).all()
+    assert outcomes == ["created", "merged", "duplicate", "duplicate", "merged", "merged"]
+    assert (digest.event_count, digest.title) == (4, "4 new enrollment requests")
+    assert [item["enrollment_id"] for item in digest.meta["items"]] == [1, 2, 3, 3]
+    assert digest.meta["dedupe_keys"] == ["enrollment:1", "enrollment:2"]
+
+
+def test_digest_emails_group_unread_digests_per_user(monkeypatch):
+    sent = []
+    monkeypatch.setattr(digests, "NOTIFY_DIGEST_EMAILS", True)
+    monkeypatch.setattr(digests, "send_email", sent.append)
+    monkeypatch.setattr(digests, "build_digest_email", lambda to, name, items: (to, items))
+    claimed = [
+        SimpleNamespace(user_id=1, title="3 new enrollment requests", body="a", is_read=False),
+        SimpleNamespace(user_id=1, title="2 new enrollment requests", body="b", is_read=False),
+        SimpleNamespace(user_id=2, title="Course enrollment request", body="c", is_read=True),
+    ]
+    session = RecordingSession(
+        results=[SimpleNamespace(all=lambda: claimed)],
+        users=[(1, "m@example.com", "M")],
+    )
+
+    assert digests.send_notification_digests(session, datetime(2026, 10, 19, tzinfo=timezone.utc)) == 1
+    assert sent == [("m@example.com", [("3 new enrollment requests", "a"), ("2 new enrollment requests", "b")])]
+    sql = _sql(session.statements[0])
+    assert "SET emailed_at=" in sql and "FOR UPDATE SKIP LOCKED" in sql
@@ -0,0 +1,58 @@
+import pytest
+from sqlmodel import Session, select
+
+from models import ProfileChange, User, UserProfile
+from users import profiles
+
+
+def test_parse_if_match():
+    assert profiles.parse_if_match(None) is None
+    assert profiles.parse_if_match("*") is None
+    assert profiles.parse_if_match('"3", W/"4", "5"') == [3, 5]
+    assert profiles.parse_if_match('W/"4"') == []
+
+
+def test_if_match_only_updates_the_current_version(db_engine):
+    with Session(db_engine) as session:
+        session.add(User(id=7, email="ann@example.com", status="active"))
+        session.commit()
+
+        # No profile yet: nothing can match, and nothing is created.
+        with pytest.raises(profiles.PreconditionFailed):
+            profiles.upsert_profile(session, 7, {"bio": "hi"}, if_match=[1], audit=False)
+        assert session.get(UserProfile, 7) is None
+
+        session.add(UserProfile(user_id=7, first_name="Ann", bio="old"))
+        session.commit()
+
+        with pytest.raises(profiles.PreconditionFailed):
+            profiles.upsert_profile(session, 7, {"bio": "stale"}, if_match=[0, 2], audit=False)
+        row = profiles.upsert_profile(session, 7, {"bio": "new"}, if_match=[0, 1], audit=False)
+        assert (row.version, row.first_name, row.bio) == (2, "Ann", "new")
+        assert profiles.etag(row) == '"2"'
+
+        # The old ETag is now stale; an empty write with the new one is a no-op.
+        with pytest.raises(profiles.PreconditionFailed):
+            profiles.upsert_profile(session, 7, {"bio": "lost"}, if_match=[1], audit=False)
+        assert profiles.upsert_profile(session, 7, {}, if_match=[2], audit=False).version == 2
+
+
+def test_upsert_creates_updates_and_audits_in_one_statement(pg_engine):
+    with Session(pg_engine) as session:
+        session.add(User(id=7, email="ann@example.com", status="active"))
+        session.commit()
+
+        assert profiles.get_or_create_profile(session, 7).version == 1
+        row = profiles.upsert_profile(session, 7, {"first_name": "Ann", "bio": None}, actor_id=7)
+        assert (row.version, row.first_name) == (2, "Ann")
+        row = profiles.upsert_profile(session, 7, {"bio": "hi"}, actor_id=7, if_match=[2])
+        assert row.version == 3
+        with pytest.raises(profiles.PreconditionFailed):
+            profiles.upsert_profile(session, 7, {"bio": "lost"}, actor_id=7, if_match=[2])
+
+        audit = session.exec(select(ProfileChange).order_by(ProfileChange.version)).all()
+        # bio None -> None isn't a change; the failed write left no entry.
+        assert [(c.version, c.changed_by, c.changes) for c in audit] == [
+            (2, 7, {"first_name": {"old": None, "new": "Ann"}}),
+            (3, 7, {"bio": {"old": None, "new": "hi"}}),
+        ]
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pydantic import ValidationError
+from sqlmodel import Session, select
+
+from courses import progress
+from models import Course, CourseEnrollment, LearningEvent, User
+from schemas import LearningStatementIn
+
+T0 = datetime(2026, 10, 1, 9, tzinfo=timezone.utc)
+
+
+def at(minutes):
+    return T0 + timedelta(minutes=minutes)
+
+
+def test_statement_accepts_xapi_verb_iris_and_bounds_progress():
+    s = LearningStatementIn(verb="http://adlnet.gov/expapi/verbs/Completed", course_id=3)
+    assert s.verb == "completed"
+    assert LearningStatementIn(verb="progressed", course_id=3, progress=42.5).progress == 42.5
+    with pytest.raises(ValidationError):
+        LearningStatementIn(verb="passed", course_id=3)
+    with pytest.raises(ValidationError):
+        LearningStatementIn(verb="progressed", course_id=3, progress=120)
+
+
+def test_record_events_appends_rows_with_clamped_timestamps(db_engine):
+    future = datetime.now(timezone.utc) + timedelta(days=1)
+    past = datetime(2026, 1, 1)  # naive: taken as UTC
+
+    with Session(db_engine) as session:
+        n = progress.record_events(session, 7, [
+            LearningStatementIn(verb="started", course_id=1, timestamp=past),
+            LearningStatementIn(verb="progressed", course_id=1, progress=50, timestamp=future),
+        ])
+        assert progress.record_events(session, 7, []) == 0
+        rows = session.exec(select(LearningEvent).order_by(LearningEvent.id)).all()
+
+    assert n == 2
+    assert [(r.user_id, r.verb, r.progress) for r in rows] == [(7, "started", None), (7, "progressed", 50)]
+    assert rows[0].occurred_at.replace(tzinfo=timezone.utc) == past.replace(tzinfo=timezone.utc)
+    assert rows[1].occurred_at.replace(tzinfo=timezone.utc) < future
+
+
+def test_fold_merges_monotonically_and_drops_unenrolled_events(pg_engine, monkeypatch):
+    monkeypatch.setattr(progress, "PROGRESS_FOLD_BATCH", 3)
+    with Session(pg_engine) as session:
+        session.add(User(id=7, email="ann@example.com", status="active"))
+        session.add_all(Course(id=i, name=f"c{i}") for i in (1, 2, 3, 4))
+        session.flush()
+        session.add_all(
+            [
+                CourseEnrollment(id=1, employee_id=7, course_id=1, status="approved", progress_percent=60,
+                                 started_at=at(10), last_activity_at=at(10)),
+                CourseEnrollment(id=2, employee_id=7, course_id=2, status="assigned"),
+                CourseEnrollment(id=3, employee_id=7, course_id=3, status="pending"),
+            ]
+        )
+        session.commit()
+        session.add_all(
+            LearningEvent(user_id=7, course_id=course, verb=verb, progress=pct, occurred_at=at(minute))
+            for course, verb, pct, minute in [
+                (1, "progressed", 40, 20),      # late: can't move progress back
+                (1, "started", None, 5),        # earlier start wins
+                (2, "progressed", 35.9, 1),
+                (2, "progressed", 100, 3),      # reaching 100% completes
+                (2, "completed", None, 9),      # a later completion keeps the first
+                (3, "completed", None, 1),      # pending enrollment: dropped
+                (4, "started", None, 1),        # no enrollment: dropped
+            ]
+        )
+        session.commit()
+
+        assert progress.fold_learning_events(session, datetime.now(timezone.utc)) == 7
+
+        rows = {e.id: e for e in session.exec(select(CourseEnrollment)).all()}
+        assert session.exec(select(LearningEvent)).all() == []
+
+    first, second, pending = rows[1], rows[2], rows[3]
+    assert (first.progress_percent, first.started_at, first.last_activity_at) == (60, at(5), at(20))
+    assert first.completed_at is None
+    assert (second.progress_percent, second.started_at, second.completed_at) == (100, at(1), at(3))
+    assert second.last_activity_at == at(9)
+    assert (pending.progress_percent, pending.completed_at) == (0, None)
+
+
+def test_batch_size_is_capped_by_the_body_schema(client, db_engine):
+    from auth.deps import get_current_user  # needs DATABASE_URL, set by the client fixture
+    from routers.progress import PROGRESS_MAX_BATCH, get_session
+
+    with Session(db_engine) as session:
+        client.app.dependency_overrides[get_session] = lambda: session
+        client.app.dependency_overrides[get_current_user] = lambda: User(id=7, email="ann@example.com", role="employee")
+        try:
+            statement = {"verb": "started", "course_id": 1}
+            resp = client.post("/api/v1/progress/events", json=[statement] * (PROGRESS_MAX_BATCH + 1))
+            assert resp.status_code == 422
+            assert resp.json()["detail"][0]["type"] == "too_long"
+
+            resp = client.post("/api/v1/progress/events", json=[statement] * 2)
+            assert resp.status_code == 202 and resp.json()["accepted"] == 2
+        finally:
+            client.app.dependency_overrides.clear()
@@ -0,0 +1,77 @@
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from ratelimit import deps
+from ratelimit.backends import Limit, MemoryBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_limit_parse():
+    limit = Limit.parse("10/60")
+    assert limit.capacity == 10
+    assert limit.period == 60
+    assert limit.rate == 10 / 60
+
+
+def test_memory_bucket_refills():
+    clock = FakeClock()
+    backend = MemoryBackend(clock=clock)
+    limit = Limit(capacity=2, period=10)
+
+    assert backend.hit("k", limit) == (True, 0)
+    assert backend.hit("k", limit) == (True, 0)
+    allowed, retry_after = backend.hit("k", limit)
+    assert allowed is False
+    assert retry_after == 5
+
+    clock.now += 5
+    assert backend.hit("k", limit) == (True, 0)
+    assert backend.hit("other", limit) == (True, 0)
+
+
+def test_pruning_keeps_buckets_with_longer_periods():
+    clock = FakeClock()
+    backend = MemoryBackend(clock=clock, max_keys=2, prune_interval=30)
+    login, invite = Limit(capacity=5, period=60), Limit(capacity=1, period=3600)
+
+    assert backend.hit("invite:a", invite) == (True, 0)
+    backend.hit("login:a", login)
+    clock.now += 120
+    backend.hit("login:b", login)               # over the cap: prunes login:a only
+
+    assert sorted(backend._buckets) == ["invite:a", "login:b"]
+    assert backend.hit("invite:a", invite)[0] is False
+
+    # Within the interval, going over the cap again doesn't rescan.
+    clock.now += 10
+    backend.hit("login:c", login)
+    assert len(backend._buckets) == 3
+    clock.now += 110
+    backend.hit("login:d", login)
+    assert sorted(backend._buckets) == ["invite:a", "login:d"]
+
+
+def test_dependency_rejects_with_retry_after(monkeypatch):
+    monkeypatch.setattr(deps, "_backend", MemoryBackend())
+    monkeypatch.setitem(deps.DEFAULT_LIMITS, "test", ("100/60", "2/60"))
+
+    app = FastAPI()
+
+    @app.post("/login", dependencies=[Depends(deps.rate_limit("test", account_field="username"))])
+    def login():
+        return {"ok": True}
+
+    client = TestClient(app)
+    for _ in range(2):
+        assert client.post("/login", data={"username": "A@example.com"}).status_code == 200
+    resp = client.post("/login", data={"username": "a@example.com"})
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+    assert client.post("/login", data={"username": "b@example.com"}).status_code == 200
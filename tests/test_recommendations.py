@@ -0,0 +1,118 @@
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlmodel import Session
+
+from courses.catalog import Catalog
+from courses.recommendations import CourseVectors, RecommendationIndex
+from models import Course, CourseEnrollment, User
+
+
+CATALOG = [
+    (1, ["Python", "SQL"], ["Analytics"]),
+    (2, ["python"], []),
+    (3, ["SQL"], ["Analytics"]),
+    (4, ["Negotiation"], ["Leadership"]),
+    (5, [], []),
+]
+
+
+def make_index():
+    idx = RecommendationIndex()
+    idx.vectors = CourseVectors.build(CATALOG)
+    with idx._lock:
+        idx._rebuild_popularity_locked()
+    return idx
+
+
+def test_vectors_are_normalised_and_matvec_matches_dense():
+    vectors = CourseVectors.build(CATALOG)
+    dense = np.zeros((len(CATALOG), len(vectors.terms)))
+    for row in range(len(CATALOG)):
+        vectors.add_row(dense[row], row, 1.0)
+
+    norms = np.linalg.norm(dense, axis=1)
+    assert np.allclose(norms[:4], 1.0) and norms[4] == 0
+    assert "skill:python" in vectors.terms  # case-folded, deduplicated
+
+    query = np.arange(len(vectors.terms), dtype=np.float32)
+    assert np.allclose(vectors.matvec(query), dense @ query)
+
+
+def test_recommends_overlap_and_excludes_own_courses():
+    idx = make_index()
+    idx.note_enrollment(7, 2)
+
+    recs = idx.recommend(7, peer_ids=[], k=3)
+
+    ids = [r.course_id for r in recs]
+    assert 2 not in ids
+    assert ids[0] == 1
+    assert recs[0].matched == ["skill:python"]
+
+
+def test_team_enrollments_count_and_popularity_breaks_ties():
+    idx = make_index()
+    idx.note_enrollment(8, 4)   # teammate
+    idx.note_enrollment(9, 3)
+    idx.note_enrollment(10, 3)
+
+    recs = idx.recommend(7, peer_ids=[8], k=2)
+    assert [r.course_id for r in recs] == [4, 3]
+
+    # No history at all: popularity alone decides.
+    assert idx.recommend(11, peer_ids=[], k=1)[0].course_id == 3
+
+
+def test_note_enrollment_is_idempotent_and_limits_k():
+    idx = make_index()
+    idx.note_enrollment(7, 1)
+    idx.note_enrollment(7, 1)
+    assert idx._counts[1] == 1
+    assert len(idx.recommend(7, peer_ids=[], k=50)) == 4
+
+
+def test_forget_enrollment_undoes_note():
+    idx = make_index()
+    idx.note_enrollment(7, 3)
+    idx.note_enrollment(8, 3)
+    idx.forget_enrollment(7, 3)
+    idx.forget_enrollment(7, 3)
+
+    assert idx._counts[3] == 1 and idx._popularity[idx.vectors.rows[3]] == 1
+    assert 3 in [r.course_id for r in idx.recommend(7, peer_ids=[], k=5)]
+
+
+def test_refresh_loads_in_batches_and_skips_rejections(db_engine, monkeypatch):
+    monkeypatch.setattr("courses.recommendations.RECOMMENDATION_LOAD_BATCH", 2)
+    with Session(db_engine) as session:
+        session.add_all(User(id=i, email=f"u{i}@example.com") for i in (7, 8))
+        session.add_all(
+            Course(id=cid, name=f"c{cid}", skills=skills, competencies=comps) for cid, skills, comps in CATALOG
+        )
+        session.flush()
+        session.add_all(
+            [
+                CourseEnrollment(id=1, employee_id=7, course_id=1),
+                CourseEnrollment(id=2, employee_id=7, course_id=2, status="rejected"),
+                CourseEnrollment(id=3, employee_id=8, course_id=3),
+                CourseEnrollment(id=4, employee_id=8, course_id=4, status="approved"),
+            ]
+        )
+        session.commit()
+
+        idx = RecommendationIndex(catalog=Catalog())
+        assert not idx.ready and idx.recommend(7, peer_ids=[]) == []
+        idx.refresh(session)
+
+        assert idx.ready
+        assert idx._enrolled == {7: {1}, 8: {3, 4}}
+        assert idx._enrollment_watermark == 4
+
+        # Rejected later (by another worker): the next refresh drops it.
+        row = session.get(CourseEnrollment, 3)
+        row.status, row.rejected_at = "rejected", datetime.now(timezone.utc)
+        session.commit()
+        idx.refresh(session)
+
+    assert idx._enrolled[8] == {4} and idx._counts[3] == 0
@@ -0,0 +1,23 @@
+from security import create_access_token
+
+
+def test_server_timing_header(client):
+    resp = client.get("/health")
+    assert resp.status_code == 200
+    timing = resp.headers["server-timing"]
+    assert "total;dur=" in timing
+    assert 'db;dur=0.00;desc="queries=0 rows=0"' in timing
+
+
+def test_profile_requires_admin(client):
+    token = create_access_token(1, "employee")
+    resp = client.get("/health?profile=1", headers={"Authorization": f"Bearer {token}"})
+    assert resp.json() == {"status": "ok"}
+
+
+def test_profile_for_admin(client):
+    token = create_access_token(1, "admin")
+    resp = client.get("/health", headers={"Authorization": f"Bearer {token}", "X-Profile": "1"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert resp.text.startswith("# ")
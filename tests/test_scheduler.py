@@ -0,0 +1,179 @@
+import asyncio
+import threading
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session, select
+
+from models import Course, CourseEnrollment, Notification, User
+from scheduler.core import Job, Scheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def __call__(self):
+        return self.now
+
+
+class FakeLeader:
+    def __init__(self, leading=True):
+        self.leading = leading
+
+    def is_leader(self):
+        return self.leading
+
+    def release(self):
+        pass
+
+
+def make_scheduler(jobs, clock, leader=None):
+    return Scheduler(jobs, session_factory=lambda: nullcontext(None), leader=leader or FakeLeader(), clock=clock)
+
+
+def test_jobs_run_on_their_interval():
+    clock = FakeClock()
+    calls = []
+
+    def expire(session, now, last_run):
+        calls.append((now, last_run))
+        return 3
+
+    scheduler = make_scheduler([Job("expire", timedelta(minutes=1), expire)], clock)
+
+    [result] = scheduler.tick()
+    assert result.ok and result.rows == 3 and result.seconds >= 0
+    assert scheduler.tick() == []
+
+    clock.now += timedelta(seconds=59)
+    assert scheduler.tick() == []
+    assert scheduler.seconds_until_next(poll=30) == 1
+
+    clock.now += timedelta(seconds=1)
+    assert len(scheduler.tick()) == 1
+    assert calls == [
+        (datetime(2026, 1, 1, tzinfo=timezone.utc), None),
+        (clock.now, datetime(2026, 1, 1, tzinfo=timezone.utc)),
+    ]
+
+
+def test_failing_job_does_not_block_others():
+    clock = FakeClock()
+
+    def broken(session, now, last_run):
+        raise RuntimeError("boom")
+
+    scheduler = make_scheduler(
+        [Job("broken", timedelta(minutes=1), broken), Job("ok", timedelta(minutes=1), lambda s, n, l: 1)],
+        clock,
+    )
+    failed, ok = scheduler.tick()
+    assert failed.error == "boom" and not failed.ok
+    assert ok.ok and ok.rows == 1
+    # A failed run doesn't advance last_run, so the next pass covers the gap.
+    assert "broken" not in scheduler.last_run
+
+
+def test_only_the_leader_runs_jobs():
+    clock = FakeClock()
+    leader = FakeLeader(leading=False)
+    scheduler = make_scheduler([Job("expire", timedelta(minutes=1), lambda s, n, l: 1)], clock, leader)
+
+    assert scheduler.tick() == []
+    assert scheduler.seconds_until_next(poll=15) == 15
+
+    leader.leading = True
+    assert [r.name for r in scheduler.tick()] == ["expire"]
+
+
+def test_a_slow_lane_does_not_hold_up_the_default_lane():
+    started = threading.Event()
+    released = threading.Event()
+
+    def export(session, now, last_run):
+        started.set()
+        return int(released.wait(5))
+
+    def fold(session, now, last_run):
+        # Only reachable while `export` is still running on its own lane.
+        assert started.wait(5)
+        released.set()
+        return 1
+
+    scheduler = make_scheduler(
+        [Job("export", timedelta(hours=1), export, lane="exports"), Job("fold", timedelta(hours=1), fold)],
+        FakeClock(),
+    )
+    assert scheduler.lanes == ["exports", "default"]
+
+    async def run():
+        task = asyncio.create_task(scheduler.run_forever(poll=0.01))
+        while len(scheduler.last_run) < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(asyncio.wait_for(run(), 10))
+    assert [r.name for r in scheduler.tick("default")] == []
+
+
+NOW = datetime(2026, 10, 19, 12, tzinfo=timezone.utc)
+
+
+def test_enrollment_jobs_flag_and_remind_once(client, pg_engine):
+    from scheduler import jobs  # needs DATABASE_URL, set by the client fixture
+
+    soon, later, past = NOW + timedelta(hours=10), NOW + timedelta(days=10), NOW - timedelta(hours=1)
+    with Session(pg_engine) as session:
+        session.add(User(id=1, email="ann@example.com", status="active"))
+        session.add_all(Course(id=i, name="SQL Basics" if i == 2 else f"c{i}") for i in range(1, 8))
+        session.flush()
+        session.add_all(
+            CourseEnrollment(id=i, employee_id=1, course_id=i, status=status, deadline=deadline, completed_at=done)
+            for i, status, deadline, done in [
+                (1, "approved", past, None),        # overdue
+                (2, "assigned", soon, None),        # due soon: reminded
+                (3, "approved", soon, NOW),         # completed: skipped
+                (4, "approved", past, NOW),         # completed: skipped
+                (5, "pending", past, None),         # not open: skipped
+                (6, "approved", later, None),       # beyond the reminder horizon
+                (7, "approved", None, None),        # no deadline
+            ]
+        )
+        session.commit()
+
+        assert jobs.flag_overdue_enrollments(session, NOW) == 1
+        assert jobs.flag_overdue_enrollments(session, NOW + timedelta(minutes=5)) == 0
+        assert jobs.send_deadline_reminders(session, NOW) == 1
+        assert jobs.send_deadline_reminders(session, NOW + timedelta(minutes=15)) == 0
+
+        rows = {e.id: e for e in session.exec(select(CourseEnrollment)).all()}
+        [reminder] = session.exec(select(Notification)).all()
+
+    assert [i for i, e in rows.items() if e.overdue_at is not None] == [1]
+    assert rows[1].overdue_at == NOW
+    assert [i for i, e in rows.items() if e.reminder_sent_at is not None] == [2]
+    assert (reminder.user_id, reminder.type, reminder.dedupe_key) == (1, "deadline_reminder", "enrollment:2")
+    assert reminder.body.startswith("SQL Basics is due on")
+
+
+def test_status_jobs_only_touch_drifted_users(client, pg_engine):
+    from scheduler import jobs  # needs DATABASE_URL, set by the client fixture
+
+    with Session(pg_engine) as session:
+        session.add_all(
+            [
+                User(id=1, email="new@example.com", status="pending", is_active=False,
+                     invite_expires_at=NOW + timedelta(days=1)),
+                User(id=2, email="late@example.com", status="pending", is_active=False,
+                     invite_expires_at=NOW - timedelta(minutes=1)),
+                User(id=3, email="gone@example.com", status="active", password_hash="x", is_active=False),
+            ]
+        )
+        session.commit()
+
+        assert jobs._expire_invites(session, NOW, NOW - timedelta(minutes=5)) == 1
+        assert jobs._expire_invites(session, NOW, NOW) == 0
+        assert jobs._reconcile_statuses(session, NOW, None) == 1
+        assert jobs._reconcile_statuses(session, NOW, NOW) == 0
+        assert dict(session.exec(select(User.id, User.status)).all()) == {1: "pending", 2: "inactive", 3: "inactive"}
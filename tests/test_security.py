@@ -40,3 +40,25 @@ def test_refresh_token_payload():
     )
     assert payload["sub"] == "456"
     assert payload["role"] == "manager"
+
+
+def test_refresh_token_carries_session_claims():
+    token = create_refresh_token(789, "employee", jti="j-1", family="f-1")
+    payload = jwt.decode(
+        token,
+        JWT_SECRET,
+        algorithms=["HS256"],
+        audience="refresh",
+        issuer=JWT_ISSUER,
+    )
+    assert payload["jti"] == "j-1"
+    assert payload["fam"] == "f-1"
+    access = jwt.decode(
+        create_access_token(789, "employee", family="f-1"),
+        JWT_SECRET,
+        algorithms=["HS256"],
+        audience="access",
+        issuer=JWT_ISSUER,
+    )
+    assert access["fam"] == "f-1"
+    assert "jti" not in access
@@ -0,0 +1,71 @@
+import gzip
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from assets.static import IMMUTABLE, REVALIDATE, AssetStore, StaticAssets
+
+
+def make_client(tmp_path, hot_max_bytes=1024 * 1024):
+    (tmp_path / "app.js").write_text("console.log('hello');\n" * 200)
+    (tmp_path / "logo.bin").write_bytes(bytes(range(256)) * 4)
+    store = AssetStore(str(tmp_path), hot_max_bytes=hot_max_bytes)
+    app = FastAPI()
+    app.mount("/static", StaticAssets(store), name="static")
+    return store, TestClient(app)
+
+
+def test_fingerprinted_url_is_immutable_and_precompressed(tmp_path):
+    store, client = make_client(tmp_path)
+    url = store.url("app.js")
+    assert url.startswith("/static/app.") and url.endswith(".js")
+
+    resp = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["cache-control"] == IMMUTABLE
+    assert resp.headers["content-encoding"] == "gzip"
+    assert resp.headers["vary"] == "Accept-Encoding"
+    assert resp.text == (tmp_path / "app.js").read_text()
+
+    plain = client.get("/static/app.js", headers={"Accept-Encoding": "identity"})
+    assert plain.headers["cache-control"] == REVALIDATE
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["etag"] != resp.headers["etag"]
+
+    again = client.get("/static/app.js", headers={"Accept-Encoding": "identity", "If-None-Match": plain.headers["etag"]})
+    assert again.status_code == 304
+    assert client.get("/static/missing.js").status_code == 404
+
+
+def test_ranges_in_memory_and_from_disk(tmp_path):
+    for hot_max in (1024 * 1024, 0):
+        store, client = make_client(tmp_path, hot_max_bytes=hot_max)
+        resp = client.get("/static/logo.bin", headers={"Range": "bytes=10-19"})
+        assert resp.status_code == 206
+        assert resp.content == bytes(range(10, 20))
+        assert resp.headers["content-range"] == "bytes 10-19/1024"
+
+        assert client.get("/static/logo.bin", headers={"Range": "bytes=5000-"}).status_code == 416
+        stale = client.get("/static/logo.bin", headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+        assert stale.status_code == 200 and len(stale.content) == 1024
+
+
+def test_prebuilt_variant_is_preferred(tmp_path):
+    (tmp_path / "app.js.gz").write_bytes(b"")  # older than app.js once rewritten below
+    store, client = make_client(tmp_path)
+    (tmp_path / "app.js.gz").write_bytes(gzip.compress(b"prebuilt"))
+    store.scan()
+    resp = client.get("/static/app.js", headers={"Accept-Encoding": "gzip"})
+    assert resp.text == "prebuilt"
+
+
+def test_user_uploads_are_not_scanned(tmp_path):
+    (tmp_path / "uploads").mkdir()
+    (tmp_path / "uploads" / "avatar.png").write_bytes(b"\x89PNG" * 10)
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "site.css").write_text("body{}")
+
+    store = AssetStore(str(tmp_path))
+
+    assert sorted(store.assets) == ["css/site.css"]
+    assert store.lookup("uploads/avatar.png") == (None, False)
@@ -0,0 +1,136 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+import users.deletion as deletion
+from models import (
+    AuthSession,
+    Course,
+    CourseEnrollment,
+    EmployeeManager,
+    IdempotencyKey,
+    Notification,
+    ProfileChange,
+    User,
+    UserProfile,
+)
+
+NOW = datetime(2026, 10, 19, 12, tzinfo=timezone.utc)
+BOSS = 2
+
+
+@pytest.fixture
+def session(db_engine):
+    with Session(db_engine) as session:
+        session.add_all(
+            [
+                User(id=1, email="root@example.com", role="admin", status="active"),
+                User(id=BOSS, email="boss@example.com", role="manager", status="active", invited_by=1),
+                User(id=3, email="ann@example.com", status="active", invited_by=BOSS),
+                User(id=4, email="bob@example.com", status="active", invited_by=BOSS),
+            ]
+        )
+        session.flush()
+        session.add_all(Course(id=i, name=f"c{i}", assigned_by_manager_id=BOSS) for i in (10, 11, 12))
+        session.flush()
+        session.add_all(EmployeeManager(employee_id=i, manager_id=BOSS) for i in (3, 4))
+        session.add_all(
+            [
+                # The manager's own history...
+                CourseEnrollment(employee_id=BOSS, course_id=10, status="approved"),
+                CourseEnrollment(employee_id=BOSS, course_id=11, status="pending"),
+                # ...and decisions on their reports' enrollments, which stay.
+                CourseEnrollment(employee_id=3, course_id=10, status="approved", approved_by=BOSS),
+                CourseEnrollment(employee_id=4, course_id=12, status="assigned", approved_by=BOSS),
+            ]
+        )
+        session.add_all(Notification(user_id=BOSS, title="t", body="b", type="x") for _ in range(5))
+        session.add(UserProfile(user_id=BOSS, first_name="Boss"))
+        session.add(ProfileChange(user_id=BOSS, changed_by=BOSS, version=1, changes={}))
+        session.add(ProfileChange(user_id=3, changed_by=BOSS, version=1, changes={}))
+        session.add(
+            AuthSession(jti=uuid.uuid4(), family_id=uuid.uuid4(), user_id=BOSS, expires_at=NOW + timedelta(days=1))
+        )
+        session.add(IdempotencyKey(user_id=BOSS, key="k", fingerprint=b"f", expires_at=NOW))
+        session.commit()
+        yield session
+
+
+def references(session, user_id):
+    """Rows still pointing at `user_id`, per referencing column."""
+    columns = [column for _, column in deletion.DEPENDENT_ROWS + deletion.NULLED_REFERENCES]
+    counts = {
+        f"{c.class_.__tablename__}.{c.key}": session.exec(select(func.count()).where(c == user_id)).one()
+        for c in columns
+    }
+    return {name: n for name, n in counts.items() if n}
+
+
+def test_admins_are_counted(session):
+    assert deletion.count_active_admins(session) == 1
+    assert deletion.is_last_admin(session, session.get(User, 1))
+
+
+def test_delete_user_leaves_no_orphans(session):
+    counts = deletion.delete_user(session, BOSS, batch_size=2)
+
+    assert counts["users"] == 1
+    assert counts["notifications"] == 5 and counts["course_enrollments"] == 2
+    assert counts["course_enrollments.approved_by"] == 2
+    assert references(session, BOSS) == {}
+    # Their reports and the reports' history are kept, just unmanaged.
+    assert session.exec(select(func.count()).select_from(CourseEnrollment)).one() == 2
+    assert {u.id for u in session.exec(select(User)).all()} == {1, 3, 4}
+    assert session.exec(select(EmployeeManager)).all() == []
+    assert session.exec(select(ProfileChange.user_id, ProfileChange.changed_by)).all() == [(3, None)]
+
+
+def test_an_interrupted_delete_resumes_and_repeats_idempotently(session, monkeypatch):
+    real = deletion._delete_rows
+
+    def dies_on_enrollments(session, key, column, user_id, batch_size):
+        if column is CourseEnrollment.employee_id:
+            raise RuntimeError("worker killed")
+        return real(session, key, column, user_id, batch_size)
+
+    monkeypatch.setattr(deletion, "_delete_rows", dies_on_enrollments)
+    with pytest.raises(RuntimeError):
+        deletion.delete_user(session, BOSS, batch_size=2)
+    session.rollback()
+    assert session.get(User, BOSS) is not None
+    monkeypatch.setattr(deletion, "_delete_rows", real)
+
+    counts = deletion.delete_user(session, BOSS, batch_size=2)
+
+    assert "notifications" not in counts               # gone in the first run
+    assert counts["course_enrollments"] == 2 and counts["users"] == 1
+    assert references(session, BOSS) == {}
+    assert deletion.delete_user(session, BOSS) == {"users": 0}
+
+
+def test_bulk_job_skips_the_last_admin_and_resumes_from_position(session):
+    job = deletion.create_job(session, "delete", [3, 1, 3, 4], created_by=1)
+    assert job.user_ids == [3, 1, 4]
+
+    assert deletion.run_job_step(session, job) == 1
+    assert (job.position, job.done) == (1, 1)
+
+    # A restart picks the same job up at `position`.
+    assert deletion.process_user_jobs(session, NOW) == 2
+    session.refresh(job)
+    assert (job.status, job.position, job.done, job.skipped) == ("done", 3, 2, 1)
+    assert {u.id for u in session.exec(select(User)).all()} == {1, BOSS}
+
+
+def test_deactivation_runs_in_chunks(session, monkeypatch):
+    monkeypatch.setattr(deletion, "USER_DEACTIVATE_BATCH", 2)
+    job = deletion.create_job(session, "deactivate", [3, 4, BOSS], created_by=1)
+
+    assert [deletion.run_job_step(session, job) for _ in range(3)] == [2, 1, 0]
+
+    assert (job.position, job.done, job.skipped) == (3, 3, 0)
+    assert all(not session.get(User, i).is_active for i in (3, 4, BOSS))
+    assert session.exec(select(AuthSession.revoked_at)).one() is not None
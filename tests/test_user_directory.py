@@ -0,0 +1,94 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session
+
+from models import EmployeeManager, User, UserProfile
+from users.directory import InvalidCursor, decode_cursor, directory_query, encode_cursor
+
+
+def compiled(stmt):
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_cursor_round_trips_and_rejects_garbage():
+    assert decode_cursor(encode_cursor(42)) == (42, None)
+    assert decode_cursor(encode_cursor(7, Decimal("0.8333"))) == (7, Decimal("0.8333"))
+    for bad in ("", "not-base64!", encode_cursor(1)[:-2] + "xx"):
+        with pytest.raises(InvalidCursor):
+            decode_cursor(bad)
+
+
+def test_search_is_ranked_trigram_match_keyed_on_score_and_id():
+    sql = compiled(directory_query("postgresql", 50, q="jon", role="employee", cursor=encode_cursor(9, Decimal("0.5"))))
+
+    # One indexable SELECT per table, UNIONed, instead of an OR across the join.
+    assert "users.id IN (SELECT users.id" in sql and "UNION SELECT user_profiles.user_id" in sql
+    assert "CAST(users.email AS TEXT) ILIKE" in sql
+    assert "<%% user_profiles.last_name" in sql
+    assert "word_similarity" in sql
+    assert "ORDER BY round(" in sql and "DESC, users.id" in sql
+    assert "users.id > " in sql
+    # Column-projected: no password hash or invite token leaves the database.
+    assert "password_hash" not in sql and "invite_token" not in sql
+
+    with pytest.raises(InvalidCursor):
+        directory_query("postgresql", 50, q="jon", cursor=encode_cursor(9))
+
+
+@pytest.fixture
+def directory(client, db_engine):
+    """GET /api/v1/users/directory as an admin, against a seeded database."""
+    from routers.users import get_session, require_admin_user
+
+    with Session(db_engine) as session:
+        session.add_all(
+            [
+                User(id=1, email="root@example.com", name="Root", role="admin", status="active"),
+                User(id=2, email="boss@example.com", name="Dana Boss", role="manager", status="active"),
+                User(id=3, email="a.jones@example.com", role="employee", status="active"),
+                User(id=4, email="bob@example.com", name="Bob", role="employee", status="active"),
+                User(id=5, email="carl@example.com", name="50% Carl", role="employee", status="pending"),
+            ]
+        )
+        session.flush()
+        session.add(UserProfile(user_id=4, first_name="Robert", last_name="Jonesy"))
+        session.add_all(EmployeeManager(employee_id=i, manager_id=2) for i in (3, 4))
+        session.commit()
+
+        client.app.dependency_overrides[get_session] = lambda: session
+        client.app.dependency_overrides[require_admin_user] = lambda: session.get(User, 1)
+        try:
+            yield lambda **params: client.get("/api/v1/users/directory", params=params)
+        finally:
+            client.app.dependency_overrides.clear()
+
+
+def ids(response):
+    assert response.status_code == 200, response.text
+    return [item["id"] for item in response.json()["items"]]
+
+
+def test_search_matches_user_and_profile_columns(directory):
+    # "jones" is in user 3's email and user 4's profile last name.
+    assert ids(directory(q="JONES")) == [3, 4]
+    assert ids(directory(q="robert")) == [4]
+    assert ids(directory(q="50%")) == [5]          # wildcards are literal
+    assert ids(directory(q="jones", manager_id=2, status="active")) == [3, 4]
+    assert ids(directory(q="nobody")) == []
+
+    item = directory(q="robert").json()["items"][0]
+    assert (item["first_name"], item["last_name"], item["manager_id"]) == ("Robert", "Jonesy", 2)
+    assert "password_hash" not in item
+
+
+def test_pages_follow_the_cursor_to_the_end(directory):
+    first = directory(limit=2, role="employee").json()
+    assert [i["id"] for i in first["items"]] == [3, 4]
+    assert decode_cursor(first["next_cursor"]) == (4, None)
+
+    last = directory(limit=2, role="employee", cursor=first["next_cursor"]).json()
+    assert ([i["id"] for i in last["items"]], last["next_cursor"]) == ([5], None)
+
+    assert directory(cursor="not-a-cursor").status_code == 400
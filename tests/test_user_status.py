@@ -1,7 +1,9 @@
 from datetime import datetime, timedelta, timezone
 
+from sqlmodel import Session, select
+
 from models import User
-from users.status import derive_status
+from users.status import derive_status, expire_invites, reconcile_statuses, status_expr
 
 
 def test_derive_status_pending():
@@ -35,3 +37,34 @@ def test_derive_status_active():
         is_active=True,
     )
     assert derive_status(user) == "active"
+
+
+def test_sql_status_agrees_with_derive_status_and_only_drifted_rows_change(pg_engine):
+    now = datetime.now(timezone.utc)
+    cases = {
+        # id: (password_hash, is_active, invite_expires_at, stored status)
+        1: (None, False, now + timedelta(days=1), "pending"),   # valid invite
+        2: (None, False, now - timedelta(days=1), "pending"),   # expired invite
+        3: ("hash", False, None, "active"),                     # deactivated
+        4: ("hash", True, None, "active"),                      # active
+        5: (None, True, None, "active"),                        # active, no password
+    }
+    users = [
+        User(id=i, email=f"u{i}@example.com", password_hash=pw, is_active=active, invite_expires_at=expires, status=s)
+        for i, (pw, active, expires, s) in cases.items()
+    ]
+    expected = {u.id: derive_status(u) for u in users}
+    assert expected == {1: "pending", 2: "inactive", 3: "inactive", 4: "active", 5: "inactive"}
+
+    with Session(pg_engine) as session:
+        session.add_all(users)
+        session.commit()
+
+        assert dict(session.execute(select(User.id, status_expr(now))).all()) == expected
+
+        # Only the expired invite flips; reconciling fixes the other two drifted rows, then nothing.
+        assert expire_invites(session, since=None, now=now) == 1
+        assert session.execute(select(User.status).where(User.id == 2)).scalar() == "inactive"
+        assert reconcile_statuses(session, batch_size=2, now=now) == 2
+        assert reconcile_statuses(session, now=now) == 0
+        assert dict(session.execute(select(User.id, User.status)).all()) == expected
@@ -0,0 +1,265 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session, select
+
+import webhooks.worker as worker
+from models import WebhookDelivery, WebhookEndpoint
+from webhooks.events import enqueue_query
+from webhooks.signing import sign, verify
+
+NOW = datetime(2026, 10, 19, 12, tzinfo=timezone.utc)
+
+
+class StubReceiver:
+    """A local HTTP receiver answering with scripted status codes."""
+
+    def __init__(self, statuses=(200,), delay=0.0, headers=None):
+        self.statuses = list(statuses)
+        self.delay = delay
+        self.headers = headers or {}
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                with stub.lock:
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                    stub.requests.append((dict(self.headers), body))
+                    code = stub.statuses.pop(0) if len(stub.statuses) > 1 else stub.statuses[0]
+                time.sleep(stub.delay)
+                with stub.lock:
+                    stub.in_flight -= 1
+                self.send_response(code)
+                for key, value in stub.headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/hook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def receiver():
+    stubs = []
+
+    def make(**kwargs):
+        stubs.append(StubReceiver(**kwargs))
+        return stubs[-1]
+
+    yield make
+    for stub in stubs:
+        stub.close()
+
+
+def endpoint(url, **values):
+    defaults = dict(id=1, url=url, secret="s3cret", event_types=["enrollment.approved"], max_concurrency=4, batch_size=1)
+    return WebhookEndpoint(**{**defaults, **values})
+
+
+def delivery(i, attempts=0):
+    return SimpleNamespace(
+        id=i, event_id=f"ev{i}", attempts=attempts, payload={"id": f"ev{i}", "type": "enrollment.approved"}
+    )
+
+
+async def _send(ep, rows):
+    async with httpx.AsyncClient(timeout=5) as client:
+        return await worker.send(client, ep, rows)
+
+
+class InMemoryWorker(worker.WebhookWorker):
+    """Claims from a list instead of the database and keeps what it records."""
+
+    def __init__(self, rows, **kwargs):
+        super().__init__(session_factory=None, clock=lambda: NOW, **kwargs)
+        self.rows = list(rows)
+        self.recorded = []
+
+    def claim(self, endpoint, now, lease, limit):
+        claimed, self.rows = self.rows[:limit], self.rows[limit:]
+        return claimed
+
+    def record(self, endpoint, updates, breaker, now, lease):
+        self.recorded.append((updates, breaker.failures))
+
+
+def test_signatures_verify_and_reject_tampering_and_replays():
+    header = sign("s3cret", b'{"a":1}', timestamp=1_000)
+    assert verify("s3cret", b'{"a":1}', header, now=1_010)
+    assert not verify("s3cret", b'{"a":2}', header, now=1_010)
+    assert not verify("other", b'{"a":1}', header, now=1_010)
+    assert not verify("s3cret", b'{"a":1}', header, now=2_000)
+    assert not verify("s3cret", b'{"a":1}', "garbage")
+
+
+def test_single_and_batched_events_are_signed_posts(receiver):
+    stub = receiver()
+
+    assert asyncio.run(_send(endpoint(stub.url), [delivery(1)])).ok
+    assert asyncio.run(_send(endpoint(stub.url, batch_size=10), [delivery(2), delivery(3)])).ok
+
+    (single_headers, single), (batch_headers, batch) = stub.requests
+    assert json.loads(single) == {"id": "ev1", "type": "enrollment.approved"}
+    assert [e["id"] for e in json.loads(batch)["events"]] == ["ev2", "ev3"]
+    assert batch_headers["Webhook-Id"] == "ev2,ev3"
+    assert verify("s3cret", single, single_headers["Webhook-Signature"])
+    assert verify("s3cret", batch, batch_headers["Webhook-Signature"])
+
+
+def test_failures_are_classified(receiver):
+    busy = receiver(statuses=[503], headers={"Retry-After": "120"})
+    rejected = receiver(statuses=[400])
+
+    result = asyncio.run(_send(endpoint(busy.url), [delivery(1)]))
+    assert result.retryable and result.retry_after == 120
+    assert not asyncio.run(_send(endpoint(rejected.url), [delivery(1)])).retryable
+    refused = asyncio.run(_send(endpoint("http://127.0.0.1:9/hook"), [delivery(1)]))
+    assert refused.status_code is None and refused.retryable
+
+
+def test_outcomes_back_off_then_give_up(monkeypatch):
+    monkeypatch.setattr(worker, "WEBHOOK_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(worker, "backoff", lambda attempts: 10.0 * attempts)
+    busy = worker.SendResult(status_code=503, retry_after=60)
+
+    (ok,) = worker.outcome_rows([delivery(1)], worker.SendResult(status_code=204), NOW)
+    (retry,) = worker.outcome_rows([delivery(2, attempts=1)], busy, NOW)
+    (dead,) = worker.outcome_rows([delivery(3, attempts=2)], busy, NOW)
+    (rejected,) = worker.outcome_rows([delivery(4)], worker.SendResult(status_code=410), NOW)
+
+    assert ok["status"] == "delivered" and ok["attempts"] == 1
+    assert retry["status"] == "pending" and retry["next_attempt_at"] == NOW + timedelta(seconds=60)
+    assert dead["status"] == "failed" and dead["attempts"] == 3
+    assert rejected["status"] == "failed"
+
+
+def test_backoff_grows_and_is_capped(monkeypatch):
+    monkeypatch.setattr(worker, "WEBHOOK_BACKOFF_MAX_SECONDS", 100)
+    delays = [worker.backoff(n, rng=lambda: 1.0) for n in range(1, 6)]
+    assert delays == [10, 20, 40, 80, 100]
+    assert worker.backoff(1, rng=lambda: 0.0) == 5
+
+
+def test_drain_respects_the_endpoint_concurrency_limit(receiver):
+    stub = receiver(delay=0.05)
+    w = InMemoryWorker([delivery(i) for i in range(12)])
+
+    async def run():
+        async with httpx.AsyncClient() as client:
+            return await w.drain(client, endpoint(stub.url, max_concurrency=2))
+
+    assert asyncio.run(run()) == 12
+    assert stub.max_in_flight == 2
+    # One wave of max_concurrency * batch_size rows per claim, so a round
+    # always finishes inside its lease.
+    assert [len(updates) for updates, _ in w.recorded] == [2] * 6
+    assert all(u["status"] == "delivered" for updates, _ in w.recorded for u in updates)
+
+
+def test_claims_are_capped_by_the_claim_limit(receiver):
+    stub = receiver()
+    w = InMemoryWorker([delivery(i) for i in range(12)], claim_limit=5)
+
+    async def run():
+        async with httpx.AsyncClient() as client:
+            return await w.drain(client, endpoint(stub.url, max_concurrency=4, batch_size=3))
+
+    assert asyncio.run(run()) == 12
+    assert [len(updates) for updates, _ in w.recorded] == [5, 5, 2]
+
+
+def test_breaker_opens_and_leaves_the_rest_queued(receiver, monkeypatch):
+    monkeypatch.setattr(worker, "WEBHOOK_BREAKER_THRESHOLD", 3)
+    stub = receiver(statuses=[503])
+    w = InMemoryWorker([delivery(i) for i in range(10)])
+
+    async def run():
+        async with httpx.AsyncClient() as client:
+            return await w.drain(client, endpoint(stub.url, max_concurrency=1))
+
+    assert asyncio.run(run()) == 3
+    assert len(stub.requests) == 3 and w.recorded[-1][1] == 3
+    assert [u["status"] for updates, _ in w.recorded for u in updates] == ["pending"] * 3
+    assert len(w.rows) == 7
+
+
+def test_half_open_circuit_sends_one_probe_first(receiver, monkeypatch):
+    monkeypatch.setattr(worker, "WEBHOOK_BREAKER_THRESHOLD", 3)
+    stub = receiver()
+    w = InMemoryWorker([delivery(i) for i in range(4)])
+
+    async def run():
+        async with httpx.AsyncClient() as client:
+            return await w.drain(client, endpoint(stub.url, consecutive_failures=3))
+
+    assert asyncio.run(run()) == 4
+    assert [len(updates) for updates, _ in w.recorded] == [1, 3]
+    assert w.recorded[-1][1] == 0
+
+
+def test_events_fan_out_to_subscribed_endpoints_in_one_statement():
+    stmt = enqueue_query("enrollment.approved", {"enrollment_id": 4}, NOW)
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert sql.startswith("INSERT INTO webhook_deliveries (endpoint_id, event_id, event_type, payload")
+    assert "SELECT webhook_endpoints.id" in sql
+    assert "webhook_endpoints.event_types @> " in sql
+
+
+def test_two_workers_sharing_a_queue_never_both_own_a_row(db_engine):
+    with Session(db_engine) as session:
+        session.add(endpoint("http://receiver.test/hook"))
+        session.flush()
+        session.add_all(
+            WebhookDelivery(
+                endpoint_id=1, event_id=f"ev{i}", event_type="enrollment.approved", payload={}, next_attempt_at=NOW
+            )
+            for i in range(6)
+        )
+        session.commit()
+    first = worker.WebhookWorker(lambda: Session(db_engine))
+    second = worker.WebhookWorker(lambda: Session(db_engine))
+    ep = endpoint("http://receiver.test/hook")
+
+    first_lease = NOW + timedelta(seconds=worker.WEBHOOK_LEASE_SECONDS)
+    claimed = first.claim(ep, NOW, first_lease, 4)
+    # While leased, the other process skips those rows.
+    assert [row.id for row in second.claim(ep, NOW, first_lease, 10)] == [5, 6]
+
+    # The first worker overruns its lease; the second re-claims and delivers.
+    later = first_lease + timedelta(seconds=1)
+    second_lease = later + timedelta(seconds=worker.WEBHOOK_LEASE_SECONDS)
+    reclaimed = second.claim(ep, later, second_lease, 4)
+    assert [row.id for row in reclaimed] == [1, 2, 3, 4]
+    delivered = worker.outcome_rows(reclaimed, worker.SendResult(status_code=204), later)
+    second.record(ep, delivered, worker._Breaker(0), later, second_lease)
+
+    # The stale outcome must not overwrite the new owner's.
+    stale = worker.outcome_rows(claimed, worker.SendResult(status_code=503), later)
+    first.record(ep, stale, worker._Breaker(1), later, first_lease)
+
+    with Session(db_engine) as session:
+        rows = session.exec(select(WebhookDelivery).where(WebhookDelivery.id <= 4)).all()
+    assert {(row.status, row.attempts, row.last_status_code) for row in rows} == {("delivered", 1, 204)}
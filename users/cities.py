@@ -0,0 +1,107 @@
+# app/users/cities.py
+"""City autocomplete for the profile form.
+
+On Postgres a search is one prefix query on lower(name), served by the
+text_pattern_ops indexes from migration 0015 and ranked by population, so
+a country with thousands of imported cities costs a handful of index
+rows, not the whole list.
+
+Other dialects (the SQLite test engine) get CityIndex instead: the cities
+table kept in memory as one array sorted by lower-cased name, where the
+rows matching a prefix are the contiguous slice between two bisects. It is
+rebuilt from the table at most every CITY_INDEX_TTL_SECONDS; cities only
+change when the GeoNames seeder runs.
+"""
+import bisect
+import heapq
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from models import City
+
+CITY_INDEX_TTL_SECONDS = float(os.getenv("CITY_INDEX_TTL_SECONDS", "300"))
+CITY_SEARCH_MAX_LIMIT = 50
+
+
+@dataclass(frozen=True)
+class CityHit:
+    id: int
+    country_id: int
+    name: str
+    population: int
+
+
+def _key(name: str) -> str:
+    return name.strip().lower()
+
+
+def _rank(city) -> tuple:
+    return (-(city.population or 0), city.name, city.id)
+
+
+class CityIndex:
+    def __init__(self, rows: Iterable = ()):
+        entries = sorted(
+            ((_key(r.name), CityHit(r.id, r.country_id, r.name, r.population or 0)) for r in rows),
+            key=lambda e: (e[0], e[1].id),
+        )
+        self.keys = [k for k, _ in entries]
+        self.cities = [c for _, c in entries]
+
+    def search(self, q: str, country_id: Optional[int] = None, limit: int = 10) -> list[CityHit]:
+        prefix = _key(q)
+        if not prefix:
+            return []
+        lo = bisect.bisect_left(self.keys, prefix)
+        # Every key starting with `prefix` sorts below prefix + U+10FFFF.
+        hi = bisect.bisect_left(self.keys, prefix + "\U0010ffff", lo)
+        hits = self.cities[lo:hi]
+        if country_id is not None:
+            hits = [c for c in hits if c.country_id == country_id]
+        return heapq.nsmallest(limit, hits, key=_rank)
+
+
+class CityIndexCache:
+    def __init__(self, ttl: float = CITY_INDEX_TTL_SECONDS, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self.index = CityIndex()
+        self._built_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def get(self, session: Session) -> CityIndex:
+        if self.clock() - self._built_at > self.ttl:
+            with self._lock:
+                if self.clock() - self._built_at > self.ttl:
+                    self.index = CityIndex(session.exec(select(City)).all())
+                    self._built_at = self.clock()
+        return self.index
+
+
+city_index = CityIndexCache()
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_query(q: str, country_id: Optional[int], limit: int):
+    stmt = select(City).where(func.lower(City.name).like(_escape_like(_key(q)) + "%", escape="\\"))
+    if country_id is not None:
+        stmt = stmt.where(City.country_id == country_id)
+    return stmt.order_by(City.population.desc(), City.name, City.id).limit(limit)
+
+
+def search_cities(session: Session, q: str, country_id: Optional[int] = None, limit: int = 10) -> list:
+    """Cities whose name starts with `q` (case-insensitive), most populous first."""
+    if not _key(q):
+        return []
+    if session.get_bind().dialect.name == "postgresql":
+        return session.exec(search_query(q, country_id, limit)).all()
+    return city_index.get(session).search(q, country_id, limit)
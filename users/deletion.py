@@ -0,0 +1,250 @@
+# app/users/deletion.py
+"""User deactivation and hard deletion, single and in bulk.
+
+Deleting a user means first removing (or un-pointing) every row that
+references it. Each dependent table is cleared in chunks of
+USER_DELETE_BATCH rows, one short transaction per chunk, so no statement
+holds row locks on a large slice of a hot table (enrollments,
+notifications) while a user with a long history is removed. Every step
+only touches rows that still reference the user, so re-running a
+deletion that died half way just finishes it.
+
+Bulk requests are stored as user_bulk_jobs rows and worked through by the
+process_user_jobs scheduler job, USER_JOB_BUDGET_SECONDS per tick. The
+job's `position` is advanced after each finished user (or chunk of
+deactivations), which is what makes a job resumable after a restart and
+what the progress endpoint reports.
+
+Neither path removes or deactivates the last active admin.
+"""
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, update
+from sqlmodel import Session, select
+
+from auth.sessions import revoke_users_sessions
+from courses.catalog import catalog
+from models import (
+    AuthSession,
+    Course,
+    CourseEnrollment,
+    EmployeeManager,
+    IdempotencyKey,
+    LearningEvent,
+    Notification,
+    ProfileChange,
+    User,
+    UserBulkJob,
+    UserDependent,
+    UserPersonalEmail,
+    UserProfile,
+)
+from observability.metrics import USER_JOB_USERS
+
+logger = logging.getLogger(__name__)
+
+USER_DELETE_BATCH = int(os.getenv("USER_DELETE_BATCH", "1000"))
+USER_DEACTIVATE_BATCH = int(os.getenv("USER_DEACTIVATE_BATCH", "500"))
+USER_JOB_BUDGET_SECONDS = float(os.getenv("USER_JOB_BUDGET_SECONDS", "20"))
+
+# (chunk key, column pointing at the user); rows are deleted, children first.
+DEPENDENT_ROWS = [
+    (Notification.id, Notification.user_id),
+    (LearningEvent.id, LearningEvent.user_id),
+    (CourseEnrollment.id, CourseEnrollment.employee_id),
+    (EmployeeManager.employee_id, EmployeeManager.manager_id),     # their reports become unmanaged
+    (EmployeeManager.employee_id, EmployeeManager.employee_id),
+    (ProfileChange.id, ProfileChange.user_id),
+    (UserPersonalEmail.id, UserPersonalEmail.user_id),
+    (UserDependent.id, UserDependent.user_id),
+    (UserProfile.user_id, UserProfile.user_id),
+    (AuthSession.id, AuthSession.user_id),
+    (IdempotencyKey.key, IdempotencyKey.user_id),
+]
+
+# (chunk key, column); references to the user that are kept but cleared.
+NULLED_REFERENCES = [
+    (CourseEnrollment.id, CourseEnrollment.approved_by),
+    (Course.id, Course.assigned_by_manager_id),
+    (ProfileChange.id, ProfileChange.changed_by),
+    (User.id, User.invited_by),
+]
+
+
+def count_active_admins(session: Session) -> int:
+    return session.exec(
+        select(func.count()).select_from(User).where(User.role == "admin", User.is_active == True)  # noqa: E712
+    ).one()
+
+
+def is_last_admin(session: Session, user: User) -> bool:
+    return user.role == "admin" and user.is_active and count_active_admins(session) <= 1
+
+
+def _chunk(key, column, user_id: int, batch_size: int):
+    return select(key).where(column == user_id).limit(batch_size)
+
+
+def _delete_rows(session: Session, key, column, user_id: int, batch_size: int) -> int:
+    table = key.class_
+    removed = 0
+    while True:
+        result = session.execute(
+            delete(table).where(column == user_id, key.in_(_chunk(key, column, user_id, batch_size)))
+        )
+        session.commit()
+        removed += result.rowcount
+        if result.rowcount < batch_size:
+            return removed
+
+
+def _clear_references(session: Session, key, column, user_id: int, batch_size: int) -> int:
+    table = key.class_
+    cleared = 0
+    while True:
+        result = session.execute(
+            update(table)
+            .where(key.in_(_chunk(key, column, user_id, batch_size)))
+            .values({column.key: None})
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+        cleared += result.rowcount
+        if result.rowcount < batch_size:
+            return cleared
+
+
+def delete_user(session: Session, user_id: int, batch_size: int = USER_DELETE_BATCH) -> dict[str, int]:
+    """Remove `user_id` and everything that references it, a chunk at a time.
+
+    Returns rows removed (or cleared) per table; safe to call again after a
+    partial run. The caller checks permissions and the last-admin rule.
+    """
+    counts: dict[str, int] = {}
+    # Revoked first so the in-process revocation cache learns the families.
+    revoke_users_sessions(session, [user_id])
+    for key, column in NULLED_REFERENCES:
+        n = _clear_references(session, key, column, user_id, batch_size)
+        if n:
+            counts[f"{column.class_.__tablename__}.{column.key}"] = n
+            if column.class_ is Course:
+                catalog.invalidate()
+    for key, column in DEPENDENT_ROWS:
+        n = _delete_rows(session, key, column, user_id, batch_size)
+        if n:
+            name = column.class_.__tablename__
+            counts[name] = counts.get(name, 0) + n
+    result = session.execute(delete(User).where(User.id == user_id))
+    session.commit()
+    counts["users"] = result.rowcount
+    return counts
+
+
+def deactivate_users(session: Session, user_ids: list[int]) -> int:
+    """Deactivate `user_ids` (open invites included) and revoke their sessions."""
+    result = session.execute(
+        update(User)
+        .where(User.id.in_(user_ids), (User.is_active == True) | (User.status == "pending"))  # noqa: E712
+        .values(is_active=False, status="inactive", invite_token_hash=None, invite_expires_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    session.commit()
+    revoke_users_sessions(session, user_ids)
+    return result.rowcount
+
+
+# --- Bulk jobs ---------------------------------------------------------------
+
+def create_job(session: Session, action: str, user_ids: Iterable[int], created_by: Optional[int]) -> UserBulkJob:
+    ids = list(dict.fromkeys(user_ids))     # de-duplicated, order kept
+    job = UserBulkJob(action=action, user_ids=ids, created_by=created_by)
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+def _protected(session: Session, user_ids: list[int]) -> set[int]:
+    """Active admins in `user_ids` that must be kept so one active admin remains."""
+    admins = session.exec(
+        select(User.id).where(User.id.in_(user_ids), User.role == "admin", User.is_active == True)  # noqa: E712
+    ).all()
+    if not admins:
+        return set()
+    spare = count_active_admins(session) - 1
+    return set(sorted(admins)[spare:]) if spare < len(admins) else set()
+
+
+def _advance(session: Session, job: UserBulkJob, finished: int, done: int) -> None:
+    job.position += finished
+    job.done += done
+    job.skipped += finished - done
+    job.updated_at = datetime.now(timezone.utc)
+    session.add(job)
+    session.commit()
+    USER_JOB_USERS.labels(action=job.action, outcome="done").inc(done)
+    USER_JOB_USERS.labels(action=job.action, outcome="skipped").inc(finished - done)
+
+
+def run_job_step(session: Session, job: UserBulkJob) -> int:
+    """Finish the next user (delete) or chunk of users (deactivate); returns how many."""
+    if job.action == "delete":
+        chunk = job.user_ids[job.position:job.position + 1]
+    else:
+        chunk = job.user_ids[job.position:job.position + USER_DEACTIVATE_BATCH]
+    if not chunk:
+        return 0
+    keep = _protected(session, chunk)
+    targets = [i for i in chunk if i not in keep]
+    if job.action == "delete":
+        done = sum(delete_user(session, i).get("users", 0) for i in targets)
+    else:
+        done = deactivate_users(session, targets) if targets else 0
+    _advance(session, job, len(chunk), done)
+    return len(chunk)
+
+
+def process_user_jobs(
+    session: Session,
+    now: datetime,
+    last_run: Optional[datetime] = None,
+    budget: float = USER_JOB_BUDGET_SECONDS,
+) -> int:
+    """Work through queued bulk jobs, oldest first, for at most `budget` seconds."""
+    deadline = time.monotonic() + budget
+    handled = 0
+    while time.monotonic() < deadline:
+        job = session.exec(
+            select(UserBulkJob).where(UserBulkJob.status.in_(("queued", "running"))).order_by(UserBulkJob.id)
+        ).first()
+        if job is None:
+            break
+        if job.status == "queued":
+            job.status = "running"
+            session.add(job)
+            session.commit()
+        try:
+            while time.monotonic() < deadline:
+                n = run_job_step(session, job)
+                handled += n
+                if n == 0:
+                    job.status = "done"
+                    job.finished_at = datetime.now(timezone.utc)
+                    session.add(job)
+                    session.commit()
+                    logger.info("user job %s: %s %d, skipped %d", job.id, job.action, job.done, job.skipped)
+                    break
+        except Exception as e:
+            session.rollback()
+            # Left resumable at `position`; failed so it isn't retried every tick.
+            job.status = "failed"
+            job.error = str(e)[:500]
+            job.updated_at = datetime.now(timezone.utc)
+            session.add(job)
+            session.commit()
+            logger.exception("user job %s failed at position %d", job.id, job.position)
+    return handled
@@ -0,0 +1,137 @@
+# app/users/directory.py
+"""Admin user directory: filtered, searchable, keyset-paginated.
+
+Rows are column-projected (users + profile names + manager id) rather
+than full User objects, and pages are keyed on the last row seen instead
+of OFFSET, so page N costs the same as page 1.
+
+Search on Postgres matches `q` as a substring (ILIKE) or a fuzzy word
+(`q <% column`, pg_trgm word similarity) against email, name and the
+profile's first/last name; both operators are served by the trigram GIN
+indexes from migration 0014. An OR spanning users and user_profiles
+can't use those indexes after the join, so matching ids are collected
+with one SELECT per table (each a BitmapOr over that table's indexes)
+and UNIONed; only those users are joined and scored. Results are ranked
+by best word similarity, rounded so the (score, id) keyset compares
+exactly. Other dialects (the SQLite test database) get case-insensitive
+substring matching in id order.
+"""
+import base64
+import binascii
+import json
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import Numeric, Text, and_, cast, func, literal, or_, select, union
+from sqlmodel import Session
+
+from models import EmployeeManager, User, UserProfile
+
+DIRECTORY_MAX_LIMIT = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(last_id: int, score: Optional[Decimal] = None) -> str:
+    payload = {"id": last_id} if score is None else {"id": last_id, "s": str(score)}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> tuple[int, Optional[Decimal]]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        score = payload.get("s")
+        return int(payload["id"]), None if score is None else Decimal(score)
+    except (binascii.Error, ValueError, TypeError, KeyError, ArithmeticError, AttributeError):
+        raise InvalidCursor("Invalid cursor") from None
+
+
+def _user_columns():
+    return [cast(User.email, Text), User.name]
+
+
+def _profile_columns():
+    return [UserProfile.first_name, UserProfile.last_name]
+
+
+def _matching_ids(match):
+    """Ids of users where `match(column)` holds for any searched column."""
+    return union(
+        select(User.id).where(or_(*(match(c) for c in _user_columns()))),
+        select(UserProfile.user_id).where(or_(*(match(c) for c in _profile_columns()))),
+    )
+
+
+def directory_query(
+    dialect: str,
+    limit: int,
+    q: Optional[str] = None,
+    role: Optional[str] = None,
+    status: Optional[str] = None,
+    manager_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+):
+    """SELECT for one page; fetches limit + 1 rows so the caller can tell if more follow."""
+    stmt = (
+        select(
+            User.id,
+            User.email,
+            User.name,
+            User.role,
+            User.status,
+            User.is_active,
+            User.created_at,
+            UserProfile.first_name,
+            UserProfile.last_name,
+            EmployeeManager.manager_id,
+        )
+        .select_from(User)
+        .outerjoin(UserProfile, UserProfile.user_id == User.id)
+        .outerjoin(EmployeeManager, EmployeeManager.employee_id == User.id)
+    )
+    if role is not None:
+        stmt = stmt.where(User.role == role)
+    if status is not None:
+        stmt = stmt.where(User.status == status)
+    if manager_id is not None:
+        stmt = stmt.where(EmployeeManager.manager_id == manager_id)
+
+    after_id, after_score = decode_cursor(cursor) if cursor else (None, None)
+    q = (q or "").strip()
+
+    if q and dialect == "postgresql":
+        pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        term = literal(q, Text)
+        stmt = stmt.where(User.id.in_(_matching_ids(lambda c: or_(c.ilike(pattern), term.op("<%")(c)))))
+        columns = _user_columns() + _profile_columns()
+        score = func.round(
+            cast(func.greatest(*(func.coalesce(func.word_similarity(term, c), 0) for c in columns)), Numeric), 4
+        )
+        stmt = stmt.add_columns(score.label("score"))
+        if after_id is not None:
+            if after_score is None:
+                raise InvalidCursor("Cursor does not belong to a search")
+            stmt = stmt.where(or_(score < after_score, and_(score == after_score, User.id > after_id)))
+        return stmt.order_by(score.desc(), User.id).limit(limit + 1)
+
+    if q:
+        needle = q.lower()
+        stmt = stmt.where(User.id.in_(_matching_ids(lambda c: func.lower(c).contains(needle, autoescape=True))))
+    if after_id is not None:
+        stmt = stmt.where(User.id > after_id)
+    return stmt.order_by(User.id).limit(limit + 1)
+
+
+def directory_page(session: Session, limit: int, **filters) -> tuple[list, Optional[str]]:
+    """(rows, next_cursor) for one page; next_cursor is None on the last page."""
+    dialect = session.get_bind().dialect.name
+    rows = session.execute(directory_query(dialect, limit, **filters)).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]._mapping
+    return rows, encode_cursor(last["id"], last.get("score"))
@@ -0,0 +1,247 @@
+# app/users/export.py
+"""Personal-data exports (data-subject access requests).
+
+An export is a zip with one folder per user:
+
+    user-<id>/user.json             account (no password or invite hashes)
+    user-<id>/profile.json
+    user-<id>/personal_emails.csv
+    user-<id>/dependents.csv
+    user-<id>/enrollments.csv       with the course name
+    user-<id>/notifications.csv     metadata as a JSON column
+    manifest.json                   users, files and row counts
+
+Requests only queue a data_exports row; the process_data_exports scheduler
+job builds the file. Rows are fetched with yield_per (a server-side cursor
+on Postgres) and written straight into zip entries opened for writing, so
+memory stays flat however much history a user has or how many users one
+export covers. The zip is written as a .part file and renamed when
+complete; a job that dies half way is rebuilt from scratch on its next
+run. Each tick starts new exports for at most EXPORT_JOB_BUDGET_SECONDS
+(one already started is finished, since a half-built zip can't be
+resumed; schemas.EXPORT_MAX_USERS bounds how long that takes), on a
+scheduler lane of its own, so a long queue holds up neither other jobs
+nor, for long, other exports. Finished files
+are deleted after EXPORT_TTL_HOURS; one that disappears before then is
+expired when a download finds it missing.
+"""
+import csv
+import io
+import json
+import logging
+import os
+import time
+import uuid
+import zipfile
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, Optional
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from models import (
+    Course,
+    CourseEnrollment,
+    DataExport,
+    EmployeeManager,
+    Notification,
+    User,
+    UserDependent,
+    UserPersonalEmail,
+    UserProfile,
+)
+
+logger = logging.getLogger(__name__)
+
+EXPORT_ROOT = os.getenv("EXPORT_ROOT", "var/exports")
+EXPORT_TTL_HOURS = float(os.getenv("EXPORT_TTL_HOURS", "72"))
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "1000"))
+EXPORT_JOB_BUDGET_SECONDS = float(os.getenv("EXPORT_JOB_BUDGET_SECONDS", "20"))
+
+# Never leave the database, even to their owner.
+SECRET_USER_FIELDS = {"password_hash", "invite_token_hash"}
+
+USER_COLUMNS = [c for c in User.__table__.columns if c.key not in SECRET_USER_FIELDS]
+PROFILE_COLUMNS = list(UserProfile.__table__.columns)
+EMAIL_COLUMNS = list(UserPersonalEmail.__table__.columns)
+DEPENDENT_COLUMNS = list(UserDependent.__table__.columns)
+NOTIFICATION_COLUMNS = list(Notification.__table__.columns)
+ENROLLMENT_COLUMNS = list(CourseEnrollment.__table__.columns)
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def _csv_value(value):
+    value = _plain(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"))
+    return "" if value is None else value
+
+
+def _stream(session: Session, stmt):
+    return session.exec(stmt.execution_options(yield_per=EXPORT_FETCH_SIZE))
+
+
+def _write_json(zf: zipfile.ZipFile, name: str, payload) -> None:
+    with zf.open(name, "w") as raw:
+        raw.write(json.dumps(payload, indent=2, default=_plain).encode())
+
+
+def _write_csv(zf: zipfile.ZipFile, name: str, header: list[str], rows: Iterable) -> int:
+    count = 0
+    with zf.open(name, "w", force_zip64=True) as raw, io.TextIOWrapper(raw, encoding="utf-8", newline="") as text:
+        writer = csv.writer(text)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow([_csv_value(v) for v in row])
+            count += 1
+    return count
+
+
+def write_user(zf: zipfile.ZipFile, session: Session, user_id: int) -> Optional[dict[str, int]]:
+    """Add one user's folder to `zf`; None if the user doesn't exist."""
+    account = session.exec(
+        select(*USER_COLUMNS, EmployeeManager.manager_id)
+        .select_from(User)
+        .outerjoin(EmployeeManager, EmployeeManager.employee_id == User.id)
+        .where(User.id == user_id)
+    ).first()
+    if account is None:
+        return None
+    folder = f"user-{user_id}"
+    _write_json(zf, f"{folder}/user.json", dict(account._mapping))
+
+    profile = session.exec(select(*PROFILE_COLUMNS).where(UserProfile.user_id == user_id)).first()
+    _write_json(zf, f"{folder}/profile.json", dict(profile._mapping) if profile else None)
+
+    counts = {}
+    for name, columns, model, owner in (
+        ("personal_emails", EMAIL_COLUMNS, UserPersonalEmail, UserPersonalEmail.user_id),
+        ("dependents", DEPENDENT_COLUMNS, UserDependent, UserDependent.user_id),
+        ("notifications", NOTIFICATION_COLUMNS, Notification, Notification.user_id),
+    ):
+        stmt = select(*columns).where(owner == user_id).order_by(model.id)
+        counts[name] = _write_csv(zf, f"{folder}/{name}.csv", [c.name for c in columns], _stream(session, stmt))
+
+    stmt = (
+        select(*ENROLLMENT_COLUMNS, Course.name.label("course_name"))
+        .join(Course, Course.id == CourseEnrollment.course_id)
+        .where(CourseEnrollment.employee_id == user_id)
+        .order_by(CourseEnrollment.id)
+    )
+    header = [c.name for c in ENROLLMENT_COLUMNS] + ["course_name"]
+    counts["enrollments"] = _write_csv(zf, f"{folder}/enrollments.csv", header, _stream(session, stmt))
+    return counts
+
+
+def export_path(export: DataExport) -> Path:
+    return Path(EXPORT_ROOT) / export.file_name
+
+
+def build_export(session: Session, export: DataExport, on_user=None) -> int:
+    """Write the zip for `export` and return its size in bytes."""
+    path = export_path(export)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    part = path.with_suffix(".part")
+    manifest = {"export_id": export.id, "generated_at": datetime.now(timezone.utc), "users": {}}
+    with zipfile.ZipFile(part, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+        for user_id in export.user_ids:
+            manifest["users"][str(user_id)] = write_user(zf, session, user_id)
+            session.rollback()          # end the read transaction between users
+            if on_user:
+                on_user(user_id)
+        _write_json(zf, "manifest.json", manifest)
+    os.replace(part, path)
+    return path.stat().st_size
+
+
+def create_export(session: Session, user_ids: Iterable[int], created_by: Optional[int]) -> DataExport:
+    export = DataExport(
+        user_ids=list(dict.fromkeys(user_ids)),
+        created_by=created_by,
+        file_name=f"export-{uuid.uuid4().hex}.zip",
+    )
+    session.add(export)
+    session.commit()
+    session.refresh(export)
+    return export
+
+
+def _finish(session: Session, export: DataExport, **values) -> None:
+    for key, value in values.items():
+        setattr(export, key, value)
+    session.add(export)
+    session.commit()
+
+
+def expire_export(session: Session, export: DataExport) -> None:
+    export_path(export).unlink(missing_ok=True)
+    _finish(session, export, status="expired")
+
+
+def purge_expired(session: Session, now: datetime) -> int:
+    expired = session.exec(
+        select(DataExport).where(DataExport.status == "done", DataExport.expires_at < now)
+    ).all()
+    for export in expired:
+        expire_export(session, export)
+    return len(expired)
+
+
+def process_data_exports(
+    session: Session,
+    now: datetime,
+    last_run: Optional[datetime] = None,
+    budget: float = EXPORT_JOB_BUDGET_SECONDS,
+) -> int:
+    """Build queued exports, oldest first, for at most `budget` seconds, then drop the expired ones."""
+    deadline = time.monotonic() + budget
+    built = 0
+    while time.monotonic() < deadline:
+        export = session.exec(
+            select(DataExport).where(DataExport.status.in_(("queued", "running"))).order_by(DataExport.id)
+        ).first()
+        if export is None:
+            break
+        _finish(session, export, status="running", position=0)
+
+        def advance(user_id: int) -> None:
+            export.position += 1
+            _finish(session, export)
+
+        try:
+            size = build_export(session, export, on_user=advance)
+        except Exception as e:
+            session.rollback()
+            export_path(export).with_suffix(".part").unlink(missing_ok=True)
+            _finish(session, export, status="failed", error=str(e)[:500])
+            logger.exception("data export %s failed", export.id)
+            continue
+        finished = datetime.now(timezone.utc)
+        _finish(
+            session,
+            export,
+            status="done",
+            size_bytes=size,
+            finished_at=finished,
+            expires_at=finished + timedelta(hours=EXPORT_TTL_HOURS),
+        )
+        logger.info("data export %s: %d users, %d bytes", export.id, len(export.user_ids), size)
+        built += 1
+    return built + purge_expired(session, now)
+
+
+def pending_for(session: Session, user_id: int) -> int:
+    """Exports `user_id` requested that haven't finished yet."""
+    return session.exec(
+        select(func.count())
+        .select_from(DataExport)
+        .where(DataExport.created_by == user_id, DataExport.status.in_(("queued", "running")))
+    ).one()
@@ -0,0 +1,391 @@
+# app/users/hris.py
+"""Full-snapshot user provisioning from the HRIS export.
+
+The HRIS sends everyone who should have an account (CSV or JSONL rows of
+email, name, role, manager_email, active). A sync:
+
+1. parses the snapshot, collecting per-line errors instead of failing;
+2. loads the current users + manager links in one column-projected query;
+3. fingerprints both sides (a hash of the normalised row) and diffs them
+   in memory, so the ~all unchanged rows cost one dict lookup and one
+   bytes comparison each;
+4. applies the plan with batched statements: multi-row INSERTs for new
+   users, executemany UPDATEs for changed ones, one UPDATE per id chunk
+   for (de)activations and a DELETE + INSERT per chunk for manager links,
+   all in one transaction.
+
+Accounts are created active but without a password or invite, so they
+can be enrolled and assigned yet cannot log in until invited through
+/auth/invite. Users missing from the snapshot (or sent with active=false)
+are deactivated, open invites included, and their sessions revoked;
+active=false rows for emails with no account are skipped, never created.
+Admin accounts are never touched by a sync, and a plan that would
+deactivate more than HRIS_SYNC_MAX_DEACTIVATE_RATIO of the provisioned
+users is refused unless forced: a truncated export must not offboard the
+company.
+"""
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import IO, Iterable, Iterator, Optional
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlmodel import Session
+
+from auth.sessions import revoke_users_sessions
+from models import EmployeeManager, User
+from users.status import status_expr
+
+logger = logging.getLogger(__name__)
+
+HRIS_SYNC_BATCH = int(os.getenv("HRIS_SYNC_BATCH", "5000"))
+HRIS_SYNC_MAX_DEACTIVATE_RATIO = float(os.getenv("HRIS_SYNC_MAX_DEACTIVATE_RATIO", "0.2"))
+HRIS_ROLES = ("employee", "manager")
+REPORT_SAMPLE = 20
+
+users_table = User.__table__
+links_table = EmployeeManager.__table__
+
+
+class SyncRefused(Exception):
+    """The plan trips a safety limit; re-run with force to apply it anyway."""
+
+
+@dataclass(frozen=True)
+class HrisRecord:
+    email: str
+    name: Optional[str]
+    role: str
+    manager_email: Optional[str]
+    active: bool
+
+    @property
+    def key(self) -> str:
+        return self.email.lower()
+
+    def fingerprint(self) -> bytes:
+        return fingerprint(self.key, self.name, self.role, self.manager_email, self.active)
+
+
+def fingerprint(email: str, name: Optional[str], role: str, manager_email: Optional[str], active: bool) -> bytes:
+    raw = "\x1f".join((email, name or "", role, (manager_email or "").lower(), "1" if active else "0"))
+    return hashlib.blake2b(raw.encode(), digest_size=16).digest()
+
+
+@dataclass
+class SnapshotError:
+    line: Optional[int]
+    email: Optional[str]
+    error: str
+
+
+@dataclass
+class CurrentUser:
+    id: int
+    email: str
+    name: Optional[str]
+    role: str
+    is_active: bool
+    status: str
+    manager_id: Optional[int]
+
+    @property
+    def present(self) -> bool:
+        """Counts as provisioned: active, or holding an open invite."""
+        return self.is_active or self.status == "pending"
+
+
+# --- Parsing -----------------------------------------------------------------
+
+def _truthy(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() not in ("0", "false", "no", "n", "inactive", "terminated")
+
+
+def _text(raw: dict, field: str) -> str:
+    """The stripped string in `field` ("" if absent); JSONL can hold any type."""
+    value = raw.get(field)
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be a string")
+    return value.strip()
+
+
+def _record(raw: dict) -> HrisRecord:
+    email = _text(raw, "email")
+    if not email or "@" not in email:
+        raise ValueError("missing or invalid email")
+    role = (_text(raw, "role") or "employee").lower()
+    if role not in HRIS_ROLES:
+        raise ValueError(f"role must be one of {', '.join(HRIS_ROLES)}")
+    manager_email = _text(raw, "manager_email") or None
+    if manager_email and manager_email.lower() == email.lower():
+        raise ValueError("user cannot manage themselves")
+    active = raw.get("active")
+    return HrisRecord(
+        email=email,
+        name=_text(raw, "name") or None,
+        role=role,
+        manager_email=manager_email,
+        active=True if active in (None, "") else _truthy(active),
+    )
+
+
+def _raw_rows(stream: IO[str], fmt: str) -> Iterator[tuple[int, object]]:
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, {k.strip().lower(): v for k, v in row.items() if k}
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError:
+                    yield line_no, None
+    else:
+        raise ValueError(f"unsupported snapshot format {fmt!r}")
+
+
+def parse_snapshot(stream: IO[str], fmt: str) -> tuple[dict[str, HrisRecord], list[SnapshotError]]:
+    """Records keyed by lower-cased email, plus the lines that were skipped."""
+    records: dict[str, HrisRecord] = {}
+    errors: list[SnapshotError] = []
+    for line, raw in _raw_rows(stream, fmt):
+        if not isinstance(raw, dict):
+            errors.append(SnapshotError(line, None, "not a JSON object"))
+            continue
+        try:
+            record = _record(raw)
+        except ValueError as e:
+            email = raw.get("email")
+            errors.append(SnapshotError(line, email if isinstance(email, str) else None, str(e)))
+            continue
+        if record.key in records:
+            errors.append(SnapshotError(line, record.email, "duplicate email; first occurrence kept"))
+            continue
+        records[record.key] = record
+    return records, errors
+
+
+def open_snapshot(binary: IO[bytes]) -> IO[str]:
+    return io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
+
+
+# --- Diff --------------------------------------------------------------------
+
+def load_current(session: Session) -> dict[str, CurrentUser]:
+    rows = session.execute(
+        select(
+            User.id,
+            User.email,
+            User.name,
+            User.role,
+            User.is_active,
+            User.status,
+            EmployeeManager.manager_id,
+        )
+        .select_from(User)
+        .outerjoin(EmployeeManager, EmployeeManager.employee_id == User.id)
+    ).all()
+    return {r[1].lower(): CurrentUser(*r) for r in rows}
+
+
+@dataclass
+class SyncPlan:
+    create: list[HrisRecord] = field(default_factory=list)
+    update: list[tuple[int, HrisRecord]] = field(default_factory=list)      # name/role changed
+    deactivate: list[int] = field(default_factory=list)
+    reactivate: list[int] = field(default_factory=list)
+    # employee email -> manager email (None: remove the link)
+    managers: dict[str, Optional[str]] = field(default_factory=dict)
+    unchanged: int = 0
+    skipped_admins: int = 0
+    skipped_inactive: int = 0                                              # active=false, no account
+    managed: int = 0                                                       # present non-admin users now
+    errors: list[SnapshotError] = field(default_factory=list)
+
+    def report(self, applied: bool) -> dict:
+        return {
+            "applied": applied,
+            "created": len(self.create),
+            "updated": len(self.update),
+            "deactivated": len(self.deactivate),
+            "reactivated": len(self.reactivate),
+            "manager_changes": len(self.managers),
+            "unchanged": self.unchanged,
+            "skipped_admins": self.skipped_admins,
+            "skipped_inactive": self.skipped_inactive,
+            "errors": [vars(e) for e in self.errors],
+            "samples": {
+                "created": [r.email for r in self.create[:REPORT_SAMPLE]],
+                "updated": [r.email for _, r in self.update[:REPORT_SAMPLE]],
+                "deactivated": self.deactivate[:REPORT_SAMPLE],
+                "manager_changes": [
+                    {"email": e, "manager_email": m} for e, m in list(self.managers.items())[:REPORT_SAMPLE]
+                ],
+            },
+        }
+
+
+def plan_sync(
+    snapshot: dict[str, HrisRecord],
+    current: dict[str, CurrentUser],
+    errors: Iterable[SnapshotError] = (),
+) -> SyncPlan:
+    plan = SyncPlan(errors=list(errors))
+    email_of = {u.id: key for key, u in current.items()}
+    roles_after = {key: u.role for key, u in current.items()}
+    roles_after.update(
+        {
+            key: r.role
+            for key, r in snapshot.items()
+            if (key in current or r.active) and current.get(key, r).role != "admin"
+        }
+    )
+
+    for key, record in snapshot.items():
+        user = current.get(key)
+        if user is not None and user.role == "admin":
+            plan.skipped_admins += 1
+            continue
+        if user is None and not record.active:
+            # A leaver we never provisioned; creating them would hand out an
+            # active account until the next sync.
+            plan.skipped_inactive += 1
+            continue
+
+        manager_key = record.manager_email.lower() if record.manager_email else None
+        if manager_key and roles_after.get(manager_key) not in ("manager", "admin"):
+            plan.errors.append(SnapshotError(None, record.email, f"manager {record.manager_email} is not a manager"))
+            manager_key = None if user is None or user.manager_id is None else email_of[user.manager_id]
+
+        if user is None:
+            plan.create.append(record)
+            if manager_key:
+                plan.managers[key] = manager_key
+            continue
+
+        current_manager = email_of.get(user.manager_id)
+        if fingerprint(key, user.name, user.role, current_manager, user.present) == record.fingerprint():
+            plan.unchanged += 1
+            continue
+        if (user.name, user.role) != (record.name, record.role):
+            plan.update.append((user.id, record))
+        if record.active and not user.present:
+            plan.reactivate.append(user.id)
+        elif not record.active and user.present:
+            plan.deactivate.append(user.id)
+        if manager_key != current_manager:
+            plan.managers[key] = manager_key
+
+    for key, user in current.items():
+        if user.role == "admin":
+            continue
+        if user.present:
+            plan.managed += 1
+        if key not in snapshot and user.present:
+            plan.deactivate.append(user.id)
+    return plan
+
+
+def check_limits(plan: SyncPlan, max_ratio: float = HRIS_SYNC_MAX_DEACTIVATE_RATIO) -> None:
+    limit = int(plan.managed * max_ratio)
+    if plan.managed and len(plan.deactivate) > limit:
+        raise SyncRefused(
+            f"plan deactivates {len(plan.deactivate)} of {plan.managed} provisioned users (limit {limit}); "
+            "check the snapshot or force the sync"
+        )
+
+
+# --- Apply -------------------------------------------------------------------
+
+def _chunks(items: list, size: int = HRIS_SYNC_BATCH) -> Iterator[list]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def apply_plan(session: Session, plan: SyncPlan, actor_id: Optional[int] = None) -> None:
+    now = datetime.now(timezone.utc)
+    ids: dict[str, int] = {
+        email.lower(): id_ for id_, email in session.execute(select(User.id, User.email)).all()
+    }
+
+    for batch in _chunks(plan.create):
+        rows = [
+            {
+                "email": r.email,
+                "name": r.name,
+                "role": r.role,
+                "status": "inactive",    # derive_status() of an active user with no password
+                "is_active": True,
+                "invited_by": actor_id,
+            }
+            for r in batch
+        ]
+        stmt = insert(users_table).returning(users_table.c.id, sort_by_parameter_order=True)
+        for record, (user_id,) in zip(batch, session.execute(stmt, rows).all()):
+            ids[record.key] = user_id
+
+    if plan.update:
+        stmt = (
+            update(users_table)
+            .where(users_table.c.id == bindparam("user_id"))
+            .values(name=bindparam("new_name"), role=bindparam("new_role"))
+        )
+        for batch in _chunks(plan.update):
+            session.execute(stmt, [{"user_id": i, "new_name": r.name, "new_role": r.role} for i, r in batch])
+
+    for batch in _chunks(plan.deactivate):
+        session.execute(
+            update(User)
+            .where(User.id.in_(batch))
+            .values(is_active=False, status="inactive", invite_token_hash=None, invite_expires_at=None)
+        )
+    for batch in _chunks(plan.reactivate):
+        session.execute(update(User).where(User.id.in_(batch)).values(is_active=True, status=status_expr(now)))
+
+    links = [(ids[e], ids[m] if m else None) for e, m in plan.managers.items()]
+    for batch in _chunks(links):
+        session.execute(delete(EmployeeManager).where(EmployeeManager.employee_id.in_([e for e, _ in batch])))
+        pairs = [{"employee_id": e, "manager_id": m} for e, m in batch if m is not None]
+        if pairs:
+            session.execute(insert(links_table), pairs)
+
+    session.commit()
+    if plan.deactivate:
+        revoke_users_sessions(session, plan.deactivate)
+    logger.info(
+        "hris sync: %d created, %d updated, %d deactivated, %d reactivated, %d manager changes",
+        len(plan.create), len(plan.update), len(plan.deactivate), len(plan.reactivate), len(plan.managers),
+    )
+
+
+def sync_snapshot(
+    session: Session,
+    stream: IO[str],
+    fmt: str,
+    dry_run: bool = True,
+    force: bool = False,
+    actor_id: Optional[int] = None,
+) -> dict:
+    """Diff the snapshot against the database and, unless dry_run, apply it.
+
+    Raises SyncRefused (before writing anything) when the plan trips the
+    deactivation limit and `force` is not set.
+    """
+    snapshot, errors = parse_snapshot(stream, fmt)
+    plan = plan_sync(snapshot, load_current(session), errors)
+    if dry_run:
+        return plan.report(applied=False)
+    if not force:
+        check_limits(plan)
+    apply_plan(session, plan, actor_id)
+    return plan.report(applied=True)
@@ -0,0 +1,141 @@
+# app/users/profiles.py
+"""Profile writes as one INSERT ... ON CONFLICT (user_id) DO UPDATE statement.
+
+Every write bumps user_profiles.version, which the API exposes as the ETag.
+A write carrying If-Match is a plain UPDATE ... WHERE version IN (...)
+instead: it only applies while the stored version is still one of the
+given ones (checked under the row lock), so two clients editing the same
+profile can't silently overwrite each other, and it never creates a
+profile that doesn't exist yet (no current version can match).
+
+With PROFILE_AUDIT on, the same statement also appends the changed fields
+(old and new values) to profile_changes: a `prev` CTE reads the row as it
+was before the statement, the upsert CTE returns it as it is after, and the
+audit insert diffs the two. Postgres runs all three on one snapshot, in one
+round trip.
+"""
+import os
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import case, func, literal, select, true, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session
+
+from models import ProfileChange, UserProfile
+
+PROFILE_AUDIT = os.getenv("PROFILE_AUDIT", "true").lower() in ("1", "true", "yes")
+
+profiles = UserProfile.__table__
+changes_table = ProfileChange.__table__
+
+# Columns a client (or the avatar pipeline) may write.
+WRITABLE = [
+    c.name for c in profiles.columns
+    if c.name not in ("user_id", "version", "created_at", "updated_at")
+]
+
+
+class PreconditionFailed(Exception):
+    """If-Match named a version that is no longer current."""
+
+
+def etag(profile: Any) -> str:
+    return f'"{profile.version}"'
+
+
+def parse_if_match(header: Optional[str]) -> Optional[list[int]]:
+    """Versions named by an If-Match header; None when the write is unconditional."""
+    if header is None or header.strip() == "*":
+        return None
+    versions = []
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            continue  # If-Match uses strong comparison only
+        try:
+            versions.append(int(tag.strip('"')))
+        except ValueError:
+            pass
+    return versions
+
+
+def _audit_cte(upserted, prev, actor_id: Optional[int], fields: Iterable[str]):
+    empty = func.jsonb_build_object()
+    changes = None
+    for name in fields:
+        part = case(
+            (
+                prev.c[name].is_distinct_from(upserted.c[name]),
+                func.jsonb_build_object(
+                    name, func.jsonb_build_object("old", prev.c[name], "new", upserted.c[name])
+                ),
+            ),
+            else_=empty,
+        )
+        changes = part if changes is None else changes.op("||")(part)
+    diff = (
+        select(upserted.c.user_id, upserted.c.version, changes.label("changes"))
+        .select_from(upserted.outerjoin(prev, true()))
+        .subquery("diff")
+    )
+    rows = select(diff.c.user_id, literal(actor_id), diff.c.version, diff.c.changes).where(diff.c.changes != empty)
+    return (
+        changes_table.insert()
+        .from_select(["user_id", "changed_by", "version", "changes"], rows)
+        .cte("audit")
+    )
+
+
+def upsert_profile(
+    session: Session,
+    user_id: int,
+    data: dict[str, Any],
+    actor_id: Optional[int] = None,
+    if_match: Optional[list[int]] = None,
+    audit: bool = PROFILE_AUDIT,
+):
+    """Create or partially update the profile of `user_id`; returns the new row.
+
+    Only keys in `data` are written. An empty `data` creates the profile if
+    missing and otherwise returns it unchanged (no version bump). Raises
+    PreconditionFailed when `if_match` doesn't name the current version,
+    including when there is no profile yet.
+    """
+    unknown = set(data) - set(WRITABLE)
+    if unknown:
+        raise ValueError(f"Not writable: {sorted(unknown)}")
+
+    if if_match is not None:
+        stmt = update(profiles).where(profiles.c.user_id == user_id, profiles.c.version.in_(if_match))
+        if data:
+            stmt = stmt.values(**data, version=profiles.c.version + 1, updated_at=func.now())
+        else:
+            stmt = stmt.values(user_id=profiles.c.user_id)
+    else:
+        stmt = insert(profiles).values(user_id=user_id, **data)
+        if data:
+            set_ = {name: stmt.excluded[name] for name in data}
+            set_.update(version=profiles.c.version + 1, updated_at=func.now())
+        else:
+            # No-op update so RETURNING yields the existing row as well.
+            set_ = {"user_id": stmt.excluded.user_id}
+        stmt = stmt.on_conflict_do_update(index_elements=[profiles.c.user_id], set_=set_)
+
+    if not (audit and data):
+        row = session.execute(stmt.returning(*profiles.c)).first()
+    else:
+        prev = select(*[profiles.c[name] for name in data]).where(profiles.c.user_id == user_id).cte("prev")
+        upserted = stmt.returning(*profiles.c).cte("upserted")
+        audit_cte = _audit_cte(upserted, prev, actor_id, data)
+        row = session.execute(select(*upserted.c).add_cte(audit_cte)).first()
+    session.commit()
+
+    if row is None:
+        raise PreconditionFailed()
+    return row
+
+
+def get_or_create_profile(session: Session, user_id: int):
+    """The common case is one primary-key read; a missing profile is created race-free."""
+    row = session.execute(select(*profiles.c).where(profiles.c.user_id == user_id)).first()
+    return row if row is not None else upsert_profile(session, user_id, {})
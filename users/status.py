@@ -1,6 +1,10 @@
-# app/users/status.py
 from datetime import datetime, timezone
-from models import User
+from typing import Optional
+
+from sqlalchemy import and_, case, cast, func, select, update
+from sqlmodel import Session
+
+from models import User, pg_user_status
 
 def derive_status(u: User) -> str:
     now = datetime.now(timezone.utc)
@@ -15,3 +19,56 @@ def derive_status(u: User) -> str:
         return "active"
     # Fallback
     return "inactive"
+
+def status_expr(now: datetime):
+    """SQL twin of derive_status(); keep the two in sync."""
+    return cast(
+        case(
+            (
+                and_(
+                    User.password_hash.is_(None),
+                    User.invite_expires_at.is_not(None),
+                    User.invite_expires_at > now,
+                ),
+                "pending",
+            ),
+            (User.is_active.is_(False), "inactive"),
+            (User.password_hash.is_not(None), "active"),
+            else_="inactive",
+        ),
+        pg_user_status,
+    )
+
+def expire_invites(session: Session, since: Optional[datetime], now: Optional[datetime] = None) -> int:
+    """Flip invites that expired in (since, now] from pending to inactive.
+
+    Bounded on invite_expires_at so it is a range scan on
+    idx_users_invite_expires_at rather than a pass over all users.
+    """
+    now = now or datetime.now(timezone.utc)
+    conditions = [User.invite_expires_at <= now, User.status == "pending"]
+    if since is not None:
+        conditions.append(User.invite_expires_at > since)
+    result = session.execute(update(User).where(*conditions).values(status=status_expr(now)))
+    session.commit()
+    return result.rowcount
+
+def reconcile_statuses(session: Session, batch_size: int = 50_000, now: Optional[datetime] = None) -> int:
+    """Rewrite users.status wherever it drifted from derive_status().
+
+    One UPDATE per id range of `batch_size`, each committed on its own, so
+    row locks are only held for one chunk at a time.
+    """
+    now = now or datetime.now(timezone.utc)
+    max_id = session.execute(select(func.max(User.id))).scalar() or 0
+    expr = status_expr(now)
+    changed = 0
+    for lo in range(0, max_id + 1, batch_size):
+        result = session.execute(
+            update(User)
+            .where(User.id >= lo, User.id < lo + batch_size, User.status != expr)
+            .values(status=expr)
+        )
+        session.commit()
+        changed += result.rowcount
+    return changed
@@ -0,0 +1,63 @@
+# app/webhooks/events.py
+"""Enrollment events for webhook subscribers.
+
+Routes call enqueue() inside the transaction that changes the enrollment,
+so an event exists exactly when the change it describes was committed
+(an outbox): one INSERT ... SELECT writes a webhook_deliveries row for
+every active endpoint subscribed to the event type and nothing at all
+when there are none. Sending happens later, off the request path, in
+webhooks/worker.py.
+"""
+import uuid
+from datetime import datetime, timezone
+from typing import Optional, get_args
+
+from sqlalchemy import insert, literal, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import Session
+
+from models import CourseEnrollment, WebhookDelivery, WebhookEndpoint
+from schemas import WebhookEventType
+
+EVENT_TYPES = get_args(WebhookEventType)
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def enrollment_data(enrollment: CourseEnrollment, actor_id: Optional[int] = None) -> dict:
+    return {
+        "enrollment_id": enrollment.id,
+        "employee_id": enrollment.employee_id,
+        "course_id": enrollment.course_id,
+        "status": enrollment.status,
+        "deadline": _iso(enrollment.deadline),
+        "actor_id": actor_id,
+    }
+
+
+def enqueue_query(event_type: str, data: dict, now: datetime):
+    event = {
+        "id": uuid.uuid4().hex,
+        "type": event_type,
+        "created_at": now.isoformat(),
+        "data": data,
+    }
+    subscribers = select(
+        WebhookEndpoint.id,
+        literal(event["id"]),
+        literal(event_type),
+        literal(event, JSONB),
+    ).where(
+        WebhookEndpoint.is_active == True,  # noqa: E712
+        WebhookEndpoint.event_types.contains([event_type]),
+    )
+    return insert(WebhookDelivery).from_select(
+        ["endpoint_id", "event_id", "event_type", "payload"], subscribers
+    )
+
+
+def enqueue(session: Session, event_type: str, data: dict, now: Optional[datetime] = None) -> None:
+    """Queue `event_type` for its subscribers (not committed)."""
+    session.execute(enqueue_query(event_type, data, now or datetime.now(timezone.utc)))
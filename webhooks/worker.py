@@ -0,0 +1,344 @@
+# app/webhooks/worker.py
+"""Webhook delivery worker.
+
+Runs as a background task in every API worker (started from main.py, like
+the catalog refresher). Each poll finds endpoints with due deliveries and
+starts one drain task per endpoint that isn't already being drained, so a
+slow or dead receiver only ever holds up its own queue.
+
+A drain works in rounds. Each round claims one wave of due rows for its
+endpoint -- max_concurrency * batch_size, capped at WEBHOOK_CLAIM_LIMIT --
+with FOR UPDATE SKIP LOCKED, leasing them by pushing next_attempt_at
+WEBHOOK_LEASE_SECONDS ahead so other processes skip them and a crashed
+worker's rows come back on their own. The wave is posted in parallel
+through one shared httpx.AsyncClient, so a round takes at most
+WEBHOOK_TIMEOUT_SECONDS and finishes well inside its lease. Outcomes are
+recorded in one bulk UPDATE guarded by the lease timestamp: if the lease
+did run out and another process re-claimed a row, that process owns it
+and the stale outcome is dropped.
+
+- Concurrency: at most endpoint.max_concurrency requests in flight per
+  endpoint in each process.
+- Batching: endpoints with batch_size > 1 receive {"events": [...]} of up
+  to batch_size events per request; the batch succeeds or fails as a whole.
+- Retries: 5xx, 408, 425, 429 and network errors are retried with
+  exponential backoff and jitter (Retry-After is honoured when longer),
+  up to WEBHOOK_MAX_ATTEMPTS; any other 4xx fails the event for good.
+- Circuit breaker: after WEBHOOK_BREAKER_THRESHOLD consecutive failed
+  requests the endpoint is skipped for WEBHOOK_BREAKER_COOLDOWN_SECONDS
+  and its remaining rows stay queued without using an attempt. After the
+  cooldown a single request probes the endpoint; success closes the
+  circuit, failure re-opens it. The state lives on the endpoint row, so
+  every process sees it.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+
+import httpx
+from sqlalchemy import exists, or_, update
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+
+from models import WebhookDelivery, WebhookEndpoint
+from observability.metrics import WEBHOOK_CIRCUIT_OPENED, WEBHOOK_DELIVERIES, WEBHOOK_REQUEST_SECONDS
+from .signing import SIGNATURE_HEADER, sign
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_POLL_SECONDS = float(os.getenv("WEBHOOK_POLL_SECONDS", "2"))
+WEBHOOK_TIMEOUT_SECONDS = float(os.getenv("WEBHOOK_TIMEOUT_SECONDS", "10"))
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "100"))
+WEBHOOK_CLAIM_LIMIT = int(os.getenv("WEBHOOK_CLAIM_LIMIT", "500"))
+WEBHOOK_LEASE_SECONDS = float(os.getenv("WEBHOOK_LEASE_SECONDS", "120"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "12"))
+WEBHOOK_BACKOFF_BASE_SECONDS = float(os.getenv("WEBHOOK_BACKOFF_BASE_SECONDS", "10"))
+WEBHOOK_BACKOFF_MAX_SECONDS = float(os.getenv("WEBHOOK_BACKOFF_MAX_SECONDS", "21600"))
+WEBHOOK_BREAKER_THRESHOLD = int(os.getenv("WEBHOOK_BREAKER_THRESHOLD", "5"))
+WEBHOOK_BREAKER_COOLDOWN_SECONDS = float(os.getenv("WEBHOOK_BREAKER_COOLDOWN_SECONDS", "300"))
+
+RETRY_STATUSES = {408, 425, 429}
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass
+class SendResult:
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+    retry_after: Optional[float] = None     # seconds, from the receiver
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code is not None and 200 <= self.status_code < 300
+
+    @property
+    def retryable(self) -> bool:
+        code = self.status_code
+        return not self.ok and (code is None or code >= 500 or code in RETRY_STATUSES)
+
+
+def backoff(attempts: int, rng: Callable[[], float] = random.random) -> float:
+    """Seconds before retry number `attempts`; jittered so an outage's
+    backlog doesn't come back as one burst."""
+    delay = min(WEBHOOK_BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), WEBHOOK_BACKOFF_MAX_SECONDS)
+    return delay * (0.5 + rng() / 2)
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - utcnow()).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def encode(endpoint: WebhookEndpoint, rows: list) -> bytes:
+    events = [row.payload for row in rows]
+    payload = {"events": events} if endpoint.batch_size > 1 else events[0]
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+async def send(client: httpx.AsyncClient, endpoint: WebhookEndpoint, rows: list) -> SendResult:
+    """POST one event (or one batch) to `endpoint`."""
+    body = encode(endpoint, rows)
+    headers = {
+        "Content-Type": "application/json",
+        "Webhook-Id": ",".join(row.event_id for row in rows),
+        SIGNATURE_HEADER: sign(endpoint.secret, body),
+    }
+    started = time.perf_counter()
+    try:
+        response = await client.post(endpoint.url, content=body, headers=headers)
+    except httpx.HTTPError as e:
+        return SendResult(error=f"{type(e).__name__}: {e}"[:500])
+    finally:
+        WEBHOOK_REQUEST_SECONDS.observe(time.perf_counter() - started)
+    result = SendResult(status_code=response.status_code)
+    if not result.ok:
+        result.error = response.text[:500] or f"HTTP {response.status_code}"
+        result.retry_after = _retry_after(response.headers.get("Retry-After"))
+    return result
+
+
+def outcome_rows(rows: list, result: SendResult, now: datetime) -> list[dict]:
+    """Bulk-UPDATE parameters recording `result` for every row it covered."""
+    out = []
+    for row in rows:
+        attempts = row.attempts + 1
+        values = {
+            "id": row.id,
+            "attempts": attempts,
+            "last_status_code": result.status_code,
+            "last_error": result.error,
+        }
+        if result.ok:
+            values.update(status="delivered", delivered_at=now)
+        elif result.retryable and attempts < WEBHOOK_MAX_ATTEMPTS:
+            delay = max(backoff(attempts), result.retry_after or 0.0)
+            values.update(status="pending", next_attempt_at=now + timedelta(seconds=delay))
+        else:
+            values.update(status="failed")
+        out.append(values)
+    return out
+
+
+class _Breaker:
+    """Consecutive failed requests to one endpoint during a drain."""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+
+    @property
+    def open(self) -> bool:
+        return self.failures >= WEBHOOK_BREAKER_THRESHOLD
+
+    def record(self, result: SendResult) -> None:
+        # A 4xx means the receiver is up and answering; only retryable errors count.
+        self.failures = self.failures + 1 if result.retryable else 0
+
+
+class WebhookWorker:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        clock: Callable[[], datetime] = utcnow,
+        claim_limit: int = WEBHOOK_CLAIM_LIMIT,
+    ):
+        self.session_factory = session_factory
+        self.clock = clock
+        self.claim_limit = claim_limit
+        self._limits: dict[int, tuple[int, asyncio.Semaphore]] = {}
+        self._draining: dict[int, asyncio.Task] = {}
+
+    # --- Database side (run in the threadpool) ---------------------------
+
+    def due_endpoints(self, now: datetime) -> list[WebhookEndpoint]:
+        due = exists().where(
+            WebhookDelivery.endpoint_id == WebhookEndpoint.id,
+            WebhookDelivery.status == "pending",
+            WebhookDelivery.next_attempt_at <= now,
+        )
+        with self.session_factory() as session:
+            endpoints = session.exec(
+                select(WebhookEndpoint).where(
+                    WebhookEndpoint.is_active == True,  # noqa: E712
+                    or_(WebhookEndpoint.circuit_open_until.is_(None), WebhookEndpoint.circuit_open_until <= now),
+                    due,
+                )
+            ).all()
+            session.expunge_all()
+        return list(endpoints)
+
+    def claim(self, endpoint: WebhookEndpoint, now: datetime, lease: datetime, limit: int) -> list:
+        batch = (
+            select(WebhookDelivery.id)
+            .where(
+                WebhookDelivery.endpoint_id == endpoint.id,
+                WebhookDelivery.status == "pending",
+                WebhookDelivery.next_attempt_at <= now,
+            )
+            .order_by(WebhookDelivery.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        with self.session_factory() as session:
+            rows = session.execute(
+                update(WebhookDelivery)
+                .where(WebhookDelivery.id.in_(batch))
+                .values(next_attempt_at=lease)
+                .returning(
+                    WebhookDelivery.id,
+                    WebhookDelivery.event_id,
+                    WebhookDelivery.payload,
+                    WebhookDelivery.attempts,
+                )
+            ).all()
+            session.commit()
+        return sorted(rows, key=lambda row: row.id)
+
+    def record(
+        self,
+        endpoint: WebhookEndpoint,
+        updates: list[dict],
+        breaker: _Breaker,
+        now: datetime,
+        lease: datetime,
+    ) -> None:
+        open_until = now + timedelta(seconds=WEBHOOK_BREAKER_COOLDOWN_SECONDS) if breaker.open else None
+        with self.session_factory() as session:
+            if updates:
+                # Only rows still carrying our lease; a row re-claimed after it
+                # ran out belongs to the other process now.
+                session.execute(
+                    update(WebhookDelivery)
+                    .where(WebhookDelivery.status == "pending", WebhookDelivery.next_attempt_at == lease)
+                    .execution_options(synchronize_session=None),
+                    updates,
+                )
+            session.execute(
+                update(WebhookEndpoint)
+                .where(WebhookEndpoint.id == endpoint.id)
+                .values(consecutive_failures=breaker.failures, circuit_open_until=open_until)
+            )
+            session.commit()
+
+    # --- Delivery ---------------------------------------------------------
+
+    def _limit(self, endpoint: WebhookEndpoint) -> asyncio.Semaphore:
+        size, limit = self._limits.get(endpoint.id, (None, None))
+        if size != endpoint.max_concurrency:
+            limit = asyncio.Semaphore(endpoint.max_concurrency)
+            self._limits[endpoint.id] = (endpoint.max_concurrency, limit)
+        return limit
+
+    async def drain(self, client: httpx.AsyncClient, endpoint: WebhookEndpoint) -> int:
+        """Deliver `endpoint`'s due rows until none are left or its circuit opens."""
+        limit = self._limit(endpoint)
+        breaker = _Breaker(endpoint.consecutive_failures)
+        # Half-open: a circuit that was open gets one probe request first.
+        probing = breaker.open
+        handled = 0
+        step = max(endpoint.batch_size, 1)
+        wave = min(self.claim_limit, endpoint.max_concurrency * step)
+        while True:
+            now = self.clock()
+            lease = now + timedelta(seconds=WEBHOOK_LEASE_SECONDS)
+            size = 1 if probing else wave
+            rows = await run_in_threadpool(self.claim, endpoint, now, lease, size)
+            if not rows:
+                break
+            batches = [rows[i:i + step] for i in range(0, len(rows), step)]
+            updates: list[dict] = []
+
+            async def deliver(batch: list) -> None:
+                async with limit:
+                    result = await send(client, endpoint, batch)
+                breaker.record(result)
+                updates.extend(outcome_rows(batch, result, self.clock()))
+
+            await asyncio.gather(*(deliver(batch) for batch in batches))
+            await run_in_threadpool(self.record, endpoint, updates, breaker, self.clock(), lease)
+            for values in updates:
+                outcome = values["status"]
+                WEBHOOK_DELIVERIES.labels(outcome="retry" if outcome == "pending" else outcome).inc()
+            handled += len(updates)
+            if breaker.open:
+                WEBHOOK_CIRCUIT_OPENED.inc()
+                logger.warning("webhook endpoint %s: circuit open after %d failures", endpoint.id, breaker.failures)
+                break
+            if len(rows) < size and not probing:
+                break
+            probing = False
+        return handled
+
+    async def poll(self, client: httpx.AsyncClient) -> list[asyncio.Task]:
+        """Start a drain for every due endpoint that isn't already draining."""
+        endpoints = await run_in_threadpool(self.due_endpoints, self.clock())
+        started = []
+        for endpoint in endpoints:
+            if endpoint.id in self._draining:
+                continue
+            task = asyncio.create_task(self._drain_logged(client, endpoint))
+            self._draining[endpoint.id] = task
+            task.add_done_callback(lambda _, endpoint_id=endpoint.id: self._draining.pop(endpoint_id, None))
+            started.append(task)
+        return started
+
+    async def _drain_logged(self, client: httpx.AsyncClient, endpoint: WebhookEndpoint) -> None:
+        try:
+            await self.drain(client, endpoint)
+        except Exception:
+            # Claimed rows come back when their lease runs out.
+            logger.exception("webhook endpoint %s: drain failed", endpoint.id)
+
+    async def run_forever(self, poll: float = WEBHOOK_POLL_SECONDS) -> None:
+        """Poll and deliver until cancelled."""
+        limits = httpx.Limits(max_connections=WEBHOOK_MAX_CONNECTIONS, max_keepalive_connections=WEBHOOK_MAX_CONNECTIONS)
+        async with httpx.AsyncClient(timeout=WEBHOOK_TIMEOUT_SECONDS, limits=limits) as client:
+            try:
+                while True:
+                    try:
+                        await self.poll(client)
+                    except Exception:
+                        logger.exception("webhook poll failed")
+                    await asyncio.sleep(poll)
+            finally:
+                for task in list(self._draining.values()):
+                    task.cancel()
+                await asyncio.gather(*self._draining.values(), return_exceptions=True)